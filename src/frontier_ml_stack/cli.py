@@ -1,6 +1,7 @@
 # ruff: noqa: B008
 from __future__ import annotations
 
+import json
 from pathlib import Path
 
 import typer
@@ -8,13 +9,33 @@ from rich import print
 
 from frontier_ml_stack.data.build import build_from_records
 from frontier_ml_stack.data.ingest import ingest_jsonl
+from frontier_ml_stack.data.tokenize import tokenize_records
 from frontier_ml_stack.data.transforms.pipeline import TransformConfig
-from frontier_ml_stack.eval.config import BehaviorEvalConfig, EvalConfig, LossEvalConfig
+from frontier_ml_stack.eval.checkpoints import parse_steps, run_checkpoint_eval
+from frontier_ml_stack.eval.config import (
+    BehaviorEvalConfig,
+    CheckpointEvalConfig,
+    EvalConfig,
+    GateConfig,
+    LossEvalConfig,
+)
 from frontier_ml_stack.eval.runner import run_eval
+from frontier_ml_stack.eval.scheduler import SUITE_MODES
 from frontier_ml_stack.inference.bench import run_benchmark
 from frontier_ml_stack.inference.server import create_app
-from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.config import DPOConfig, SFTConfig
+from frontier_ml_stack.training.distill import benchmark_distillation, run_teacher_pass
+from frontier_ml_stack.training.dpo import run_dpo
+from frontier_ml_stack.training.launch import launch_sft, write_scaling_report
+from frontier_ml_stack.training.perf import DEFAULT_PROFILES, benchmark_perf, parse_profiles
 from frontier_ml_stack.training.sft import run_sft
+from frontier_ml_stack.training.sweep import (
+    expand_grid,
+    load_override_list,
+    parse_assignments,
+    parse_grid,
+    run_sweep,
+)
 
 app = typer.Typer(help="frontier-ml-stack CLI")
 
@@ -105,67 +126,568 @@ def data_build(
     print(f"Counts:          in={result.total_in} kept={result.kept} dropped={result.dropped}")
 
 
+@data_app.command("tokenize")
+def data_tokenize(
+    dataset_name: str = typer.Option(..., help="Logical dataset name (e.g., 'toyset_tok')"),
+    input_records: Path = typer.Option(
+        ..., exists=True, readable=True, help="Path to canonical records.jsonl to tokenize"
+    ),
+    tokenizer_name: str = typer.Option(..., help="HF tokenizer name or local dir"),
+    tokenizer_revision: str | None = typer.Option(None, help="Tokenizer revision (hub only)"),
+    out_root: Path = typer.Option(Path("artifacts/datasets"), help="Output root directory"),
+    append_eos: bool = typer.Option(False, help="Append EOS to every document"),
+) -> None:
+    """
+    Tokenize records.jsonl once into tokens.bin + offsets.npy + manifest.json.
+    """
+    result = tokenize_records(
+        dataset_name=dataset_name,
+        input_records_path=input_records,
+        out_root=out_root,
+        tokenizer_name=tokenizer_name,
+        tokenizer_revision=tokenizer_revision,
+        append_eos=append_eos,
+    )
+
+    status = "reused" if result.reused else "written"
+    print(f"[bold green]Tokenize complete[/bold green] ({status})")
+    print(f"Output dir: {result.output_dir}")
+    print(f"Manifest:   {result.manifest_path}")
+    print(f"Counts:     docs={result.num_docs} tokens={result.num_tokens}")
+
+
 @training_app.command("sft")
 def training_sft(
     run_name: str = typer.Option(..., help="Run name (used for artifacts/runs/<run_name>)"),
     model_name: str = typer.Option("sshleifer/tiny-gpt2", help="HF model name"),
-    train_records: Path = typer.Option(
-        ..., exists=True, readable=True, help="Path to records.jsonl"
+    train_records: Path | None = typer.Option(
+        None, exists=True, readable=True, help="Path to records.jsonl"
+    ),
+    mix: list[str] = typer.Option(
+        [],
+        "--mix",
+        help="Mixture source 'build_dir:weight[:epochs]' (repeatable; epochs may be 'inf')",
+    ),
+    mixture_shuffle_buffer: int = typer.Option(1000, help="Shuffle buffer size for --mix"),
+    streaming: bool = typer.Option(
+        False, help="Stream --train-records and tokenize on the fly (needs --max-steps)"
+    ),
+    num_workers: int = typer.Option(0, help="DataLoader worker processes (tokenize in background)"),
+    prefetch_factor: int = typer.Option(2, help="Batches prefetched per DataLoader worker"),
+    train_token_store: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Token store dir from 'data tokenize'"
     ),
     max_steps: int = typer.Option(20, help="Max training steps (tiny runs on CPU)"),
     max_seq_length: int = typer.Option(256, help="Max sequence length"),
+    packing: bool = typer.Option(False, help="Pack documents into max_seq_length blocks"),
+    packing_reset_boundaries: bool = typer.Option(
+        False, help="With --packing, restart positions/attention at each document"
+    ),
+    padding: str = typer.Option(
+        "max_length", help="Unpacked padding: 'max_length' or 'dynamic' (pad per batch)"
+    ),
+    group_by_length: bool = typer.Option(
+        False, help="With --padding dynamic, batch examples of similar length (seeded)"
+    ),
+    batch_size: int = typer.Option(1, help="Per-device train batch size"),
+    save_steps: int = typer.Option(0, help="Checkpoint every N steps (0 => off)"),
+    save_total_limit: int = typer.Option(2, help="Keep the newest N checkpoints (0 => all)"),
+    resume: bool = typer.Option(
+        False, help="Continue from the latest checkpoint of this run (if any)"
+    ),
+    nproc: int = typer.Option(1, help="Data-parallel processes on this host (gloo DDP)"),
+    nnodes: int = typer.Option(1, help="Number of hosts (multi-host DDP)"),
+    node_rank: int = typer.Option(0, help="Rank of this host (multi-host DDP)"),
+    master_addr: str = typer.Option("127.0.0.1", help="Rendezvous address of host 0"),
+    master_port: int = typer.Option(0, help="Rendezvous port (0 => free port, single host)"),
+    threads_per_proc: int = typer.Option(0, help="Torch threads per process (0 => cores/nproc)"),
+    baseline_run: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Single-process run dir to compute scaling vs"
+    ),
+    telemetry: bool = typer.Option(True, help="Write per-step metrics to step_metrics.jsonl"),
+    profile_start_step: int = typer.Option(0, help="First step of the torch profiler window"),
+    profile_steps: int = typer.Option(0, help="Profile this many steps (0 => off)"),
     lora: bool = typer.Option(False, help="Enable LoRA adapter training (PEFT)"),
     lora_r: int = typer.Option(8, help="LoRA rank"),
     lora_alpha: int = typer.Option(16, help="LoRA alpha"),
     lora_dropout: float = typer.Option(0.05, help="LoRA dropout"),
     lora_target_modules: str = typer.Option("", help="Comma-separated target modules override"),
     save_merged: bool = typer.Option(True, help="If LoRA, save merged full model too"),
+    lora_base_dtype: str = typer.Option(
+        "fp32", help="LoRA: frozen base weight storage 'fp32', 'bf16' or 'int8'"
+    ),
+    gradient_checkpointing: bool = typer.Option(
+        False, help="Recompute activations in backward (less memory, slower steps)"
+    ),
+    distill_teacher_logits: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Teacher pass dir (distill from stored top-k)"
+    ),
+    distill_alpha: float = typer.Option(0.5, help="Distillation: weight of the KD loss"),
+    distill_temperature: float = typer.Option(1.0, help="Distillation: softmax temperature"),
+    bf16_autocast: bool = typer.Option(False, help="bf16 autocast for forward/backward (CPU)"),
+    torch_compile: bool = typer.Option(False, help="torch.compile the model (slow first steps)"),
+    fused_optimizer: bool = typer.Option(True, help="Fused AdamW kernel when available"),
+    pin_mmap_threshold: bool = typer.Option(
+        False, help="glibc: mmap allocations >= 1 MiB for the rest of the process (lower RSS)"
+    ),
+    intra_op_threads: int = typer.Option(0, help="Torch intra-op threads (0 => default)"),
+    inter_op_threads: int = typer.Option(0, help="Torch inter-op threads (0 => default)"),
 ) -> None:
+    if train_records is None and not mix and train_token_store is None:
+        raise typer.BadParameter(
+            "Provide --train-records, --train-token-store or at least one --mix source"
+        )
+
     cfg = SFTConfig(
         run_name=run_name,
         model_name=model_name,
-        train_records=str(train_records),
+        train_records=str(train_records) if train_records else "",
+        train_mixture=",".join(mix),
+        mixture_shuffle_buffer=mixture_shuffle_buffer,
+        streaming=streaming,
+        dataloader_num_workers=num_workers,
+        dataloader_prefetch_factor=prefetch_factor,
+        train_token_store=str(train_token_store) if train_token_store else "",
         max_steps=max_steps,
         max_seq_length=max_seq_length,
+        packing=packing,
+        packing_reset_boundaries=packing_reset_boundaries,
+        padding=padding,
+        group_by_length=group_by_length,
+        per_device_train_batch_size=batch_size,
+        save_steps=save_steps,
+        save_total_limit=save_total_limit,
+        resume=resume,
+        telemetry=telemetry,
+        profile_start_step=profile_start_step,
+        profile_num_steps=profile_steps,
         use_lora=lora,
         lora_r=lora_r,
         lora_alpha=lora_alpha,
         lora_dropout=lora_dropout,
         lora_target_modules=lora_target_modules,
         save_merged=save_merged,
+        lora_base_dtype=lora_base_dtype,
+        gradient_checkpointing=gradient_checkpointing,
+        distill_teacher_logits=str(distill_teacher_logits) if distill_teacher_logits else "",
+        distill_alpha=distill_alpha,
+        distill_temperature=distill_temperature,
+        bf16_autocast=bf16_autocast,
+        torch_compile=torch_compile,
+        fused_optimizer=fused_optimizer,
+        pin_mmap_threshold=pin_mmap_threshold,
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
     )
-    run_dir = run_sft(cfg)
+    if nproc > 1 or nnodes > 1:
+        run_dir = launch_sft(
+            cfg,
+            nproc=nproc,
+            nnodes=nnodes,
+            node_rank=node_rank,
+            master_addr=master_addr,
+            master_port=master_port,
+            threads=threads_per_proc,
+        )
+    else:
+        run_dir = run_sft(cfg)
+    if node_rank > 0:
+        return
     print("[bold green]SFT complete[/bold green]")
     print(f"Run dir: {run_dir}")
     print(f"Metrics: {run_dir / 'metrics.json'}")
+    if baseline_run is not None:
+        report = write_scaling_report(run_dir, baseline_run)
+        print(
+            f"Scaling x{report['world_size']}: speedup {report['speedup']:.2f}, "
+            f"efficiency {report['efficiency']:.0%}"
+        )
+
+
+@training_app.command("sweep")
+def training_sweep(
+    sweep_name: str = typer.Option(..., help="Sweep name (runs go to artifacts/runs/<name>/)"),
+    model_name: str = typer.Option("sshleifer/tiny-gpt2", help="HF model name"),
+    train_records: Path | None = typer.Option(
+        None, exists=True, readable=True, help="Path to records.jsonl"
+    ),
+    train_token_store: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Token store dir from 'data tokenize'"
+    ),
+    set_: list[str] = typer.Option(
+        [], "--set", help="Base SFTConfig override 'field=value' for every run (repeatable)"
+    ),
+    grid: list[str] = typer.Option(
+        [], "--grid", help="Swept field 'field=v1,v2,...'; runs = cartesian product (repeatable)"
+    ),
+    configs: Path | None = typer.Option(
+        None, exists=True, readable=True, help="JSON list of per-run override objects"
+    ),
+    max_procs: int = typer.Option(0, help="Concurrent runs (0 => one per core)"),
+) -> None:
+    if train_records is None and train_token_store is None:
+        raise typer.BadParameter("Provide --train-records or --train-token-store")
+    try:
+        base = SFTConfig(
+            run_name=sweep_name,
+            model_name=model_name,
+            train_records=str(train_records) if train_records else "",
+            train_token_store=str(train_token_store) if train_token_store else "",
+            **parse_assignments(set_),
+        )
+        runs = expand_grid(parse_grid(grid))
+        if configs is not None:
+            runs += load_override_list(configs)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    if not runs:
+        raise typer.BadParameter("Provide at least one --grid field or a --configs file")
+
+    sweep_dir = run_sweep(base, runs, sweep_name=sweep_name, max_procs=max_procs)
+    print("[bold green]Sweep complete[/bold green]")
+    typer.echo((sweep_dir / "sweep.md").read_text(encoding="utf-8"))
+    print(f"Summary: {sweep_dir / 'sweep.json'}")
+
+
+@training_app.command("perf-bench")
+def training_perf_bench(
+    bench_name: str = typer.Option("perf_bench", help="Runs go to artifacts/runs/<name>/"),
+    model_name: str = typer.Option("sshleifer/tiny-gpt2", help="HF model name"),
+    train_records: Path | None = typer.Option(
+        None, exists=True, readable=True, help="Path to records.jsonl"
+    ),
+    train_token_store: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Token store dir from 'data tokenize'"
+    ),
+    steps: int = typer.Option(20, help="Training steps per profile"),
+    batch_size: int = typer.Option(4, help="Per-device train batch size"),
+    max_seq_length: int = typer.Option(128, help="Max sequence length (padded to it)"),
+    set_: list[str] = typer.Option(
+        [], "--set", help="SFTConfig override 'field=value' for every profile (repeatable)"
+    ),
+    profile: list[str] = typer.Option(
+        [],
+        "--profile",
+        help="Profile 'name:field=value,...' (repeatable; default: built-in profiles)",
+    ),
+) -> None:
+    if train_records is None and train_token_store is None:
+        raise typer.BadParameter("Provide --train-records or --train-token-store")
+    try:
+        base = SFTConfig(
+            run_name=bench_name,
+            model_name=model_name,
+            train_records=str(train_records) if train_records else "",
+            train_token_store=str(train_token_store) if train_token_store else "",
+            max_steps=steps,
+            per_device_train_batch_size=batch_size,
+            max_seq_length=max_seq_length,
+            **parse_assignments(set_),
+        )
+        profiles = parse_profiles(profile) if profile else DEFAULT_PROFILES
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+
+    bench_dir = benchmark_perf(base, profiles, bench_name=bench_name)
+    print("[bold green]Perf bench complete[/bold green]")
+    typer.echo((bench_dir / "perf_bench.md").read_text(encoding="utf-8"))
+    print(f"Report: {bench_dir / 'perf_bench.json'}")
+
+
+@training_app.command("teacher-pass")
+def training_teacher_pass(
+    train_token_store: Path = typer.Option(
+        ..., exists=True, file_okay=False, help="Token store dir from 'data tokenize'"
+    ),
+    teacher_model: str = typer.Option(..., help="Teacher HF model (same tokenizer as the store)"),
+    top_k: int = typer.Option(16, help="Logits kept per token"),
+    max_seq_length: int = typer.Option(256, help="Tokens per document (>= the student's)"),
+    batch_size: int = typer.Option(8, help="Documents per teacher forward pass"),
+    out_root: Path | None = typer.Option(None, help="Output root (default: <store>/teacher)"),
+) -> None:
+    res = run_teacher_pass(
+        train_token_store,
+        teacher_model,
+        top_k=top_k,
+        max_seq_length=max_seq_length,
+        batch_size=batch_size,
+        out_root=out_root,
+    )
+    print("[bold green]Teacher pass complete[/bold green]" + (" (reused)" if res.reused else ""))
+    print(f"Teacher logits: {res.output_dir}")
+    print(
+        f"Tokens: {res.num_tokens}  bytes/token: {res.bytes_per_token}  "
+        f"teacher tokens/s: {res.tokens_per_second:.1f}"
+    )
+
+
+@training_app.command("distill-bench")
+def training_distill_bench(
+    train_token_store: Path = typer.Option(
+        ..., exists=True, file_okay=False, help="Token store dir from 'data tokenize'"
+    ),
+    teacher_model: str = typer.Option(..., help="Teacher HF model"),
+    student_model: str = typer.Option(..., help="Student HF model"),
+    top_k: list[int] = typer.Option([4, 16, 64], "--top-k", help="k values (repeatable)"),
+    max_seq_length: int = typer.Option(128, help="Max sequence length"),
+    batch_size: int = typer.Option(4, help="Student batch size"),
+    steps: int = typer.Option(10, help="Student steps per configuration"),
+    out_dir: Path = typer.Option(Path("artifacts/runs/distill_bench"), help="Output dir"),
+) -> None:
+    report = benchmark_distillation(
+        train_token_store,
+        teacher_model,
+        student_model,
+        top_ks=top_k,
+        max_seq_length=max_seq_length,
+        batch_size=batch_size,
+        steps=steps,
+        out_dir=out_dir,
+    )
+    print(f"SFT baseline: {report['sft_tokens_per_second']:.1f} tokens/s")
+    for row in report["top_k"]:
+        print(
+            f"k={row['k']}: {row['bytes_per_token']} B/token ({row['storage_mb']:.1f} MiB), "
+            f"teacher pass {row['teacher_pass_tokens_per_second']:.1f} tok/s, "
+            f"student {row['student_tokens_per_second']:.1f} tok/s, "
+            f"online est. {row['online_teacher_tokens_per_second_est']:.1f} tok/s"
+        )
+    print(f"Report: {out_dir / 'distill_bench.json'}")
+
+
+@training_app.command("dpo")
+def training_dpo(
+    run_name: str = typer.Option(..., help="Run name (used for artifacts/runs/<run_name>)"),
+    model_name: str = typer.Option("sshleifer/tiny-gpt2", help="HF model name (policy init)"),
+    train_records: Path = typer.Option(
+        ..., exists=True, readable=True, help="Preference JSONL (id, prompt, chosen, rejected)"
+    ),
+    ref_model_name: str = typer.Option("", help="Reference model (default: --model-name)"),
+    ref_cache_dir: Path = typer.Option(
+        Path("artifacts/ref_logps"), help="Root of the cached reference log-probs"
+    ),
+    ref_batch_size: int = typer.Option(8, help="Pairs per reference forward pass"),
+    beta: float = typer.Option(0.1, help="DPO beta (strength of the reference KL anchor)"),
+    max_steps: int = typer.Option(20, help="Max training steps"),
+    max_seq_length: int = typer.Option(256, help="Max prompt + completion length"),
+    max_prompt_length: int = typer.Option(128, help="Prompts keep their last N tokens"),
+    batch_size: int = typer.Option(1, help="Pairs per step"),
+    learning_rate: float = typer.Option(5e-6, help="Learning rate"),
+    save_steps: int = typer.Option(0, help="Checkpoint every N steps (0 => off)"),
+    save_total_limit: int = typer.Option(2, help="Keep the newest N checkpoints (0 => all)"),
+    resume: bool = typer.Option(
+        False, help="Continue from the latest checkpoint of this run (if any)"
+    ),
+    telemetry: bool = typer.Option(True, help="Write per-step metrics to step_metrics.jsonl"),
+    lora: bool = typer.Option(False, help="Train LoRA adapters instead of the full model"),
+    lora_r: int = typer.Option(8, help="LoRA rank"),
+    lora_alpha: int = typer.Option(16, help="LoRA alpha"),
+    lora_dropout: float = typer.Option(0.0, help="LoRA dropout (noise in the DPO log-ratio)"),
+    lora_target_modules: str = typer.Option("", help="Comma-separated target modules override"),
+    save_merged: bool = typer.Option(True, help="If LoRA, save merged full model too"),
+    gradient_checkpointing: bool = typer.Option(
+        False, help="Recompute activations in backward (less memory, slower steps)"
+    ),
+) -> None:
+    cfg = DPOConfig(
+        run_name=run_name,
+        model_name=model_name,
+        train_records=str(train_records),
+        ref_model_name=ref_model_name,
+        ref_cache_dir=str(ref_cache_dir),
+        ref_batch_size=ref_batch_size,
+        beta=beta,
+        max_steps=max_steps,
+        max_seq_length=max_seq_length,
+        max_prompt_length=max_prompt_length,
+        per_device_train_batch_size=batch_size,
+        learning_rate=learning_rate,
+        save_steps=save_steps,
+        save_total_limit=save_total_limit,
+        resume=resume,
+        telemetry=telemetry,
+        use_lora=lora,
+        lora_r=lora_r,
+        lora_alpha=lora_alpha,
+        lora_dropout=lora_dropout,
+        lora_target_modules=lora_target_modules,
+        save_merged=save_merged,
+        gradient_checkpointing=gradient_checkpointing,
+    )
+    run_dir = run_dpo(cfg)
+    print("[bold green]DPO complete[/bold green]")
+    print(f"Run dir: {run_dir}")
+    print(f"Metrics: {run_dir / 'metrics.json'}")
 
 
 @eval_app.command("run")
 def eval_run(
     eval_name: str = typer.Option(..., help="Eval run name (artifacts/reports/<eval_name>)"),
-    model_path: str = typer.Option(..., help="HF model name or local model dir"),
+    model_path: str = typer.Option("", help="HF model name or local model dir"),
     eval_records: Path = typer.Option(
         ..., exists=True, readable=True, help="Path to records.jsonl"
     ),
     max_eval_samples: int = typer.Option(64, help="Max eval samples for loss eval"),
     max_seq_length: int = typer.Option(256, help="Max sequence length for loss eval"),
+    token_store: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Pre-tokenized eval store from 'data tokenize'"
+    ),
+    loss_batch_size: int = typer.Option(8, help="Loss eval: documents per forward pass"),
+    loss_stride: int = typer.Option(
+        0, help="Loss eval: sliding-window stride for long documents (0 => truncate)"
+    ),
     max_prompts: int = typer.Option(12, help="Max behavior prompts"),
     max_new_tokens: int = typer.Option(64, help="Max new tokens to generate"),
     temperature: float = typer.Option(0.0, help="Generation temperature; 0 for deterministic"),
+    gen_batch_size: int = typer.Option(8, help="Behavior eval: prompts per generate() call"),
+    prompts: Path | None = typer.Option(
+        None, exists=True, readable=True, help="Behavior prompt suite (JSONL with scorers)"
+    ),
+    behavior_workers: int = typer.Option(1, help="Behavior eval: worker processes"),
+    threads_per_worker: int = typer.Option(0, help="Torch threads per worker (0 => cores/n)"),
+    resume: bool = typer.Option(False, help="Behavior eval: continue an interrupted run"),
+    cache: bool = typer.Option(True, help="Reuse results of unchanged model/data/settings"),
+    cache_dir: Path = typer.Option(Path("artifacts/eval_cache"), help="Eval result cache root"),
+    gate: bool = typer.Option(
+        False, help="Sequential regression gate: stop sampling once pass/fail is clear"
+    ),
+    gate_confidence: float = typer.Option(0.95, help="Gate: confidence of the intervals"),
+    gate_min_samples: int = typer.Option(16, help="Gate: samples per suite before stopping"),
+    max_loss: float = typer.Option(0.0, help="Gate: max avg loss (0 => baseline + margin)"),
+    min_rates: str = typer.Option("", help="Gate: min scorer rates, e.g. 'refusal=0.9'"),
+    baseline_metrics: Path | None = typer.Option(
+        None, exists=True, dir_okay=False, help="Gate: baseline metrics.json for thresholds"
+    ),
+    loss_margin: float = typer.Option(0.0, help="Gate: allowed loss increase over baseline"),
+    rate_margin: float = typer.Option(0.0, help="Gate: allowed rate drop below baseline"),
+    server_url: str = typer.Option(
+        "", help="Evaluate a running 'inference serve' (e.g. http://127.0.0.1:8000)"
+    ),
+    concurrency: int = typer.Option(8, help="Remote eval: requests in flight"),
+    retries: int = typer.Option(3, help="Remote eval: retries on transport errors / 429 / 5xx"),
+    suite_mode: str = typer.Option(
+        "sequential", help="Run suites 'sequential', in 'threads' (shared model) or 'processes'"
+    ),
+    threads_per_suite: int = typer.Option(
+        0, help="Torch threads per concurrent suite (0 => cores/suites)"
+    ),
+    model_cache_mb: float = typer.Option(
+        0.0, help="Keep released models up to N MiB in the process registry (0 => free them)"
+    ),
 ) -> None:
+    if bool(model_path) == bool(server_url):
+        raise typer.BadParameter("Provide exactly one of --model-path or --server-url")
+    if suite_mode not in SUITE_MODES:
+        raise typer.BadParameter(f"--suite-mode must be one of {', '.join(SUITE_MODES)}")
     cfg = EvalConfig(
         eval_name=eval_name,
         model_path=model_path,
         eval_records=str(eval_records),
-        loss=LossEvalConfig(max_eval_samples=max_eval_samples, max_seq_length=max_seq_length),
+        cache_dir=str(cache_dir) if cache else "",
+        server_url=server_url,
+        concurrency=concurrency,
+        retries=retries,
+        suite_mode=suite_mode,
+        threads_per_suite=threads_per_suite,
+        model_cache_mb=model_cache_mb,
+        loss=LossEvalConfig(
+            max_eval_samples=max_eval_samples,
+            max_seq_length=max_seq_length,
+            token_store=str(token_store) if token_store else "",
+            batch_size=loss_batch_size,
+            stride=loss_stride,
+        ),
         behavior=BehaviorEvalConfig(
-            max_prompts=max_prompts, max_new_tokens=max_new_tokens, temperature=temperature
+            max_prompts=max_prompts,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            batch_size=gen_batch_size,
+            prompts_path=str(prompts) if prompts else "",
+            num_workers=behavior_workers,
+            threads_per_worker=threads_per_worker,
+            resume=resume,
+        ),
+        gate=GateConfig(
+            enabled=gate,
+            confidence=gate_confidence,
+            min_samples=gate_min_samples,
+            max_loss=max_loss,
+            min_rates=min_rates,
+            baseline_metrics=str(baseline_metrics) if baseline_metrics else "",
+            loss_margin=loss_margin,
+            rate_margin=rate_margin,
         ),
     )
     out_dir = run_eval(cfg)
     print("[bold green]Eval complete[/bold green]")
     print(f"Report:  {out_dir / 'report.md'}")
     print(f"Metrics: {out_dir / 'metrics.json'}")
+    if gate:
+        passed = json.loads((out_dir / "metrics.json").read_text(encoding="utf-8"))["gate"][
+            "passed"
+        ]
+        print(f"Gate: {'[green]PASS' if passed else '[red]FAIL'}")
+        if not passed:
+            raise typer.Exit(code=1)
+
+
+@eval_app.command("checkpoints")
+def eval_checkpoints(
+    eval_name: str = typer.Option(..., help="Eval run name (artifacts/reports/<eval_name>)"),
+    run_dir: Path = typer.Option(
+        ..., exists=True, file_okay=False, help="Training run dir (artifacts/runs/<run_name>)"
+    ),
+    eval_records: Path = typer.Option(
+        ..., exists=True, readable=True, help="Path to records.jsonl"
+    ),
+    base_model: str = typer.Option("", help="Base model (default: the run's model_name)"),
+    steps: str = typer.Option("", help="Comma-separated checkpoint steps (default: all)"),
+    max_eval_samples: int = typer.Option(64, help="Max eval samples for loss eval"),
+    max_seq_length: int = typer.Option(256, help="Max sequence length for loss eval"),
+    token_store: Path | None = typer.Option(
+        None, exists=True, file_okay=False, help="Pre-tokenized eval store from 'data tokenize'"
+    ),
+    loss_batch_size: int = typer.Option(8, help="Loss eval: documents per forward pass"),
+    loss_stride: int = typer.Option(
+        0, help="Loss eval: sliding-window stride for long documents (0 => truncate)"
+    ),
+    max_prompts: int = typer.Option(12, help="Max behavior prompts (0 => whole suite)"),
+    max_new_tokens: int = typer.Option(64, help="Max new tokens to generate"),
+    temperature: float = typer.Option(0.0, help="Generation temperature; 0 for deterministic"),
+    gen_batch_size: int = typer.Option(8, help="Behavior eval: prompts per generate() call"),
+    prompts: Path | None = typer.Option(
+        None, exists=True, readable=True, help="Behavior prompt suite (JSONL with scorers)"
+    ),
+) -> None:
+    try:
+        parse_steps(steps)
+    except ValueError as e:
+        raise typer.BadParameter(f"--steps must be comma-separated integers ({e})") from e
+    cfg = CheckpointEvalConfig(
+        eval_name=eval_name,
+        run_dir=str(run_dir),
+        eval_records=str(eval_records),
+        base_model=base_model,
+        steps=steps,
+        loss=LossEvalConfig(
+            max_eval_samples=max_eval_samples,
+            max_seq_length=max_seq_length,
+            token_store=str(token_store) if token_store else "",
+            batch_size=loss_batch_size,
+            stride=loss_stride,
+        ),
+        behavior=BehaviorEvalConfig(
+            max_prompts=max_prompts,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            batch_size=gen_batch_size,
+            prompts_path=str(prompts) if prompts else "",
+        ),
+    )
+    out_dir = run_checkpoint_eval(cfg)
+    print("[bold green]Checkpoint eval complete[/bold green]")
+    print(f"Report:  {out_dir / 'report.md'}")
+    print(f"Curve:   {out_dir / 'curve.json'}")
 
 
 @inference_app.command("serve")
@@ -173,10 +695,18 @@ def inference_serve(
     model_path: str = typer.Option(..., help="HF model name or local model dir"),
     host: str = typer.Option("127.0.0.1", help="Host"),
     port: int = typer.Option(8000, help="Port"),
+    score_batch_tokens: int = typer.Option(
+        8192, help="/score: padded tokens per shared forward pass"
+    ),
+    score_wait_ms: float = typer.Option(
+        2.0, help="/score: how long to collect concurrent requests into one batch"
+    ),
 ) -> None:
     import uvicorn
 
-    app_ = create_app(model_path)
+    app_ = create_app(
+        model_path, score_batch_tokens=score_batch_tokens, score_wait_ms=score_wait_ms
+    )
     uvicorn.run(app_, host=host, port=port, log_level="info")
 
 
@@ -12,3 +12,15 @@ class TextRecord(BaseModel):
     id: str = Field(..., description="Stable identifier for the record")
     text: str = Field(..., min_length=1, description="Primary text content")
     source: str = Field("unknown", description="Origin of the record")
+
+
+class PreferenceRecord(BaseModel):
+    """
+    A prompt with a preferred and a dispreferred completion (DPO training data).
+    """
+
+    id: str = Field(..., description="Stable identifier for the pair")
+    prompt: str = Field(..., min_length=1, description="Shared prompt")
+    chosen: str = Field(..., min_length=1, description="Preferred completion")
+    rejected: str = Field(..., min_length=1, description="Dispreferred completion")
+    source: str = Field("unknown", description="Origin of the pair")
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from frontier_ml_stack.data.hashing import sha256_text
+
+TOKENS_FILE = "tokens.bin"
+OFFSETS_FILE = "offsets.npy"
+MANIFEST_FILE = "manifest.json"
+
+
+def token_dtype(vocab_size: int) -> np.dtype:
+    return np.dtype(np.uint16) if vocab_size <= np.iinfo(np.uint16).max + 1 else np.dtype(np.uint32)
+
+
+def tokenizer_fingerprint(tokenizer: Any) -> str:
+    """
+    Content hash of a tokenizer's vocabulary and special tokens.
+
+    Lets a store built from one path be reused by checkpoints that saved the same tokenizer.
+    The pad token is excluded: callers commonly alias it to EOS after loading.
+    """
+    special = {k: str(v) for k, v in tokenizer.special_tokens_map.items() if k != "pad_token"}
+    payload = {"vocab": sorted(tokenizer.get_vocab().items()), "special": sorted(special.items())}
+    return sha256_text(json.dumps(payload, sort_keys=True))
+
+
+class TokenStoreWriter:
+    """
+    Append-only writer for a flat token file plus document offsets.
+
+    Tokens are streamed to disk as they arrive; only the offsets (8 bytes/doc) are held in memory.
+    """
+
+    def __init__(self, out_dir: Path, dtype: np.dtype) -> None:
+        self.out_dir = out_dir
+        self.dtype = np.dtype(dtype)
+        self._offsets: list[int] = [0]
+        self._f = (out_dir / TOKENS_FILE).open("wb")
+
+    def add(self, ids: list[int]) -> None:
+        self._f.write(np.asarray(ids, dtype=self.dtype).tobytes())
+        self._offsets.append(self._offsets[-1] + len(ids))
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def num_tokens(self) -> int:
+        return self._offsets[-1]
+
+    def close(self) -> None:
+        self._f.close()
+        np.save(self.out_dir / OFFSETS_FILE, np.asarray(self._offsets, dtype=np.int64))
+
+
+class TokenStore:
+    """
+    Read-only view of a tokenized build written by `data tokenize`.
+
+    `store[i]` returns the token ids of document i as a zero-copy slice of the memmap.
+    """
+
+    def __init__(self, store_dir: Path) -> None:
+        self.store_dir = Path(store_dir)
+        self.manifest: dict[str, Any] = json.loads(
+            (self.store_dir / MANIFEST_FILE).read_text(encoding="utf-8")
+        )
+        params = self.manifest["params"]
+        self.dtype = np.dtype(params["dtype"])
+        self.offsets = np.load(self.store_dir / OFFSETS_FILE, mmap_mode="r")
+
+        n_tokens = int(self.offsets[-1])
+        if n_tokens:
+            self.tokens = np.memmap(
+                self.store_dir / TOKENS_FILE, dtype=self.dtype, mode="r", shape=(n_tokens,)
+            )
+        else:
+            self.tokens = np.zeros(0, dtype=self.dtype)
+
+    @property
+    def tokenizer_name(self) -> str:
+        return self.manifest["params"]["tokenizer_name"]
+
+    @property
+    def tokenizer_revision(self) -> str | None:
+        return self.manifest["params"]["tokenizer_revision"]
+
+    @property
+    def num_tokens(self) -> int:
+        return int(self.offsets[-1])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.tokens[int(self.offsets[i]) : int(self.offsets[i + 1])]
+
+    def doc_lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def check_tokenizer(self, tokenizer: Any) -> None:
+        """
+        Raise if this store was produced by a different tokenizer than the one in use.
+        """
+        if tokenizer_fingerprint(tokenizer) != self.manifest["params"]["tokenizer_fingerprint"]:
+            raise ValueError(
+                f"Token store {self.store_dir} was built with tokenizer "
+                f"{self.tokenizer_name!r}, which does not match "
+                f"{getattr(tokenizer, 'name_or_path', '?')!r}"
+            )
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from transformers import AutoTokenizer
+
+from frontier_ml_stack.data.hashing import sha256_file, sha256_text
+from frontier_ml_stack.data.manifest import new_manifest
+from frontier_ml_stack.data.schema import TextRecord
+from frontier_ml_stack.data.token_store import (
+    MANIFEST_FILE,
+    TokenStoreWriter,
+    token_dtype,
+    tokenizer_fingerprint,
+)
+
+SCHEMA_VERSION = "tokens-v1"
+
+
+@dataclass(frozen=True)
+class TokenizeResult:
+    output_dir: Path
+    manifest_path: Path
+    num_docs: int
+    num_tokens: int
+    reused: bool
+
+
+def _iter_text_batches(path: Path, batch_size: int) -> Iterator[list[str]]:
+    batch: list[str] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            batch.append(TextRecord.model_validate_json(line).text)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def tokenize_records(
+    *,
+    dataset_name: str,
+    input_records_path: Path,
+    out_root: Path,
+    tokenizer_name: str,
+    tokenizer_revision: str | None = None,
+    add_special_tokens: bool = True,
+    append_eos: bool = False,
+    batch_size: int = 1000,
+    store_id: str | None = None,
+) -> TokenizeResult:
+    """
+    Tokenize a records.jsonl once into a flat memmap-able token file + document offsets.
+
+    The store id is derived from the records digest, tokenizer name/revision and settings,
+    so re-running with identical inputs reuses the existing store.
+    """
+    input_records_path = input_records_path.resolve()
+    if not input_records_path.exists():
+        raise FileNotFoundError(input_records_path)
+
+    input_hash = sha256_file(input_records_path)
+    settings = {"add_special_tokens": add_special_tokens, "append_eos": append_eos}
+    fingerprint = json.dumps(
+        {
+            "input_records_sha256": input_hash,
+            "tokenizer_name": tokenizer_name,
+            "tokenizer_revision": tokenizer_revision,
+            "settings": settings,
+            "schema": SCHEMA_VERSION,
+        },
+        sort_keys=True,
+    )
+    store_id = store_id or sha256_text(fingerprint)[:12]
+
+    output_dir = out_root / dataset_name / store_id
+    manifest_path = output_dir / MANIFEST_FILE
+    if manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest["params"].get("fingerprint") == fingerprint:
+            return TokenizeResult(
+                output_dir=output_dir,
+                manifest_path=manifest_path,
+                num_docs=manifest["counts"]["docs"],
+                num_tokens=manifest["counts"]["tokens"],
+                reused=True,
+            )
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name, revision=tokenizer_revision)
+    if append_eos and tokenizer.eos_token_id is None:
+        raise ValueError(f"Tokenizer {tokenizer_name} has no EOS token; cannot append_eos")
+    dtype = token_dtype(len(tokenizer))
+
+    writer = TokenStoreWriter(output_dir, dtype)
+    try:
+        for texts in _iter_text_batches(input_records_path, batch_size):
+            enc = tokenizer(texts, add_special_tokens=add_special_tokens)
+            for ids in enc["input_ids"]:
+                if append_eos:
+                    ids = [*ids, tokenizer.eos_token_id]
+                writer.add(ids)
+    finally:
+        writer.close()
+
+    manifest = new_manifest(
+        schema_version=SCHEMA_VERSION,
+        dataset_name=dataset_name,
+        build_id=store_id,
+        input_files=[{"path": str(input_records_path), "sha256": input_hash}],
+        params={
+            "tokenizer_name": tokenizer_name,
+            "tokenizer_revision": tokenizer_revision,
+            "tokenizer_fingerprint": tokenizer_fingerprint(tokenizer),
+            "vocab_size": len(tokenizer),
+            "dtype": dtype.name,
+            "settings": settings,
+            "fingerprint": fingerprint,
+        },
+        counts={"docs": writer.num_docs, "tokens": writer.num_tokens},
+    )
+    manifest.write(manifest_path)
+
+    return TokenizeResult(
+        output_dir=output_dir,
+        manifest_path=manifest_path,
+        num_docs=writer.num_docs,
+        num_tokens=writer.num_tokens,
+        reused=False,
+    )
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from frontier_ml_stack.data.hashing import sha256_file, sha256_text
+from frontier_ml_stack.training.ref_logps import model_fingerprint
+from frontier_ml_stack.utils.files import write_json_atomic
+
+SCHEMA_VERSION = "eval-cache-v1"
+DIGESTS_FILE = "digests.json"
+
+# Files that define a local model: weights, configs and tokenizer files.
+_MODEL_SUFFIXES = (".safetensors", ".bin", ".pt", ".json", ".txt", ".model")
+_SKIP_FILES = {"training_args.bin", "trainer_state.json"}  # trainer bookkeeping
+
+
+class EvalCache:
+    """
+    Content-addressed store of eval results under `root`, shared by every eval run.
+
+    Keys are digests of what determines a result: the model's files, the eval data, the
+    suite settings and the seed. Whole-suite results live in results/<key>.json. Behavior
+    completions live in completions/<key>.jsonl with one line per prompt, so a suite that
+    gains prompts only generates the new ones (scorers are re-run on every read).
+
+    Local model files are hashed once per version: digests are memoized by path, size and
+    mtime in digests.json. Hub models are identified by their commit.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def key(self, **parts: Any) -> str:
+        return sha256_text(json.dumps({**parts, "schema": SCHEMA_VERSION}, sort_keys=True))
+
+    def file_digest(self, path: Path) -> str:
+        path = path.resolve()
+        st = path.stat()
+        memo_path = self.root / DIGESTS_FILE
+        memo = json.loads(memo_path.read_text(encoding="utf-8")) if memo_path.is_file() else {}
+        entry = memo.get(str(path))
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        digest = sha256_file(path)
+        # re-read: another eval may have recorded other files meanwhile
+        memo = json.loads(memo_path.read_text(encoding="utf-8")) if memo_path.is_file() else {}
+        memo[str(path)] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        write_json_atomic(memo_path, memo)
+        return digest
+
+    def model_digest(self, model_path: str) -> str:
+        """
+        Digest of a local model dir's files (same content => same digest, wherever it lives),
+        or of the hub model's name and commit.
+        """
+        path = Path(model_path)
+        if not path.is_dir():
+            return self.key(hub=model_fingerprint(model_path))
+        files = sorted(
+            p
+            for p in path.iterdir()
+            if p.is_file() and p.suffix in _MODEL_SUFFIXES and p.name not in _SKIP_FILES
+        )
+        if not files:
+            raise FileNotFoundError(f"no model files in {path}")
+        return self.key(files=[(p.name, self.file_digest(p)) for p in files])
+
+    def get_result(self, key: str) -> dict[str, Any] | None:
+        path = self.root / "results" / f"{key}.json"
+        return json.loads(path.read_text(encoding="utf-8")) if path.is_file() else None
+
+    def put_result(self, key: str, result: dict[str, Any]) -> None:
+        write_json_atomic(self.root / "results" / f"{key}.json", result)
+
+    def get_completions(self, key: str) -> dict[str, dict[str, Any]]:
+        """
+        Cached completions for generation settings `key`: {prompt sha256: row}.
+        """
+        path = self.root / "completions" / f"{key}.jsonl"
+        rows: dict[str, dict[str, Any]] = {}
+        if path.is_file():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue  # torn line of an interrupted writer
+                    rows[row["prompt_sha256"]] = row
+        return rows
+
+    def put_completions(self, key: str, rows: list[dict[str, Any]]) -> None:
+        """
+        Append rows ({"prompt_sha256", "completion", "generated_tokens"}) for `key`.
+        """
+        if not rows:
+            return
+        path = self.root / "completions" / f"{key}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows))
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import torch
+from safetensors.torch import load_file
+
+from frontier_ml_stack.eval.config import CheckpointEvalConfig
+from frontier_ml_stack.eval.report import write_json, write_markdown
+from frontier_ml_stack.eval.suites.behavior_eval import (
+    default_prompt_suite,
+    generate_completions,
+    load_prompt_suite,
+    sample_row,
+    suite_scores,
+)
+from frontier_ml_stack.eval.suites.loss_eval import load_documents, loss_of_documents
+from frontier_ml_stack.models.loading import load_causal_lm, load_tokenizer
+from frontier_ml_stack.training.checkpoint import (
+    ADAPTER_WEIGHTS_FILE,
+    MODEL_WEIGHTS_FILE,
+    checkpoint_step,
+    drop_shared,
+    list_checkpoints,
+)
+from frontier_ml_stack.utils.memory import peak_rss_mb
+
+ADAPTER_CONFIG_FILE = "adapter_config.json"
+
+
+def parse_steps(spec: str) -> set[int]:
+    """
+    "100,200, 300" -> {100, 200, 300}
+    """
+    return {int(x) for x in (s.strip() for s in spec.split(",")) if x}
+
+
+def select_checkpoints(run_dir: Path, steps: set[int] | None = None) -> list[Path]:
+    """
+    checkpoint-N dirs of a training run, oldest first (only `steps`, if given).
+    """
+    found = list_checkpoints(run_dir / "checkpoints")
+    if steps:
+        missing = steps - {checkpoint_step(p) for p in found}
+        if missing:
+            raise ValueError(f"no checkpoint for steps {sorted(missing)} in {run_dir}")
+        found = [p for p in found if checkpoint_step(p) in steps]
+    if not found:
+        raise ValueError(f"no checkpoints in {run_dir / 'checkpoints'} (train with save_steps)")
+    kinds = {(p / ADAPTER_WEIGHTS_FILE).is_file() for p in found}
+    if len(kinds) > 1:
+        raise ValueError(f"{run_dir} mixes adapter and full-weight checkpoints")
+    return found
+
+
+def resolve_base_model(run_dir: Path, checkpoints: list[Path], base_model: str = "") -> str:
+    """
+    The model the run started from: `base_model`, else the run's config.json, else the
+    adapter config of its first checkpoint.
+    """
+    if base_model:
+        return base_model
+    config_path = run_dir / "config.json"
+    if config_path.is_file():
+        return json.loads(config_path.read_text(encoding="utf-8"))["model_name"]
+    adapter_config = checkpoints[0] / ADAPTER_CONFIG_FILE
+    if adapter_config.is_file():
+        return json.loads(adapter_config.read_text(encoding="utf-8"))["base_model_name_or_path"]
+    raise ValueError(f"cannot tell the base model of {run_dir}; pass base_model")
+
+
+def checkpoint_models(
+    checkpoints: list[Path], base_model: str
+) -> Iterator[tuple[Path, Any, float]]:
+    """
+    Yield (checkpoint, model in eval mode, seconds to switch to it) for each checkpoint.
+
+    One model object is kept and its weights are overwritten in place: LoRA checkpoints only
+    swap the adapter tensors on a base loaded once, full checkpoints copy their tensors into
+    the model loaded from the first one. The yielded model is only valid until the next step.
+    """
+    model = None
+    adapter_config = None
+    for ckpt in checkpoints:
+        t0 = time.perf_counter()
+        if (ckpt / ADAPTER_WEIGHTS_FILE).is_file():
+            from peft import PeftModel, set_peft_model_state_dict
+
+            config = json.loads((ckpt / ADAPTER_CONFIG_FILE).read_text(encoding="utf-8"))
+            if model is None:
+                model = PeftModel.from_pretrained(load_causal_lm(base_model), str(ckpt))
+                adapter_config = config
+            elif config != adapter_config:
+                raise ValueError(f"{ckpt} has another adapter config than the first checkpoint")
+            else:
+                result = set_peft_model_state_dict(model, load_file(ckpt / ADAPTER_WEIGHTS_FILE))
+                if result.unexpected_keys:
+                    raise ValueError(f"{ckpt} has unexpected adapter tensors")
+        elif model is None:
+            model = load_causal_lm(str(ckpt))
+        else:
+            state = load_file(ckpt / MODEL_WEIGHTS_FILE)
+            if state.keys() != drop_shared(model.state_dict()).keys():
+                raise ValueError(f"{ckpt} does not match the first checkpoint's architecture")
+            # tied tensors were saved once; copying into it updates every alias
+            model.load_state_dict(state, strict=False)
+        model.eval()
+        yield ckpt, model, time.perf_counter() - t0
+
+
+def run_checkpoint_eval(cfg: CheckpointEvalConfig) -> Path:
+    """
+    Evaluate every checkpoint of a training run and write the loss/behavior curve.
+
+    The eval records and prompts are tokenized once, with the base model's tokenizer (the one
+    the run trained with), and reused for every checkpoint. Checkpoints are switched in place
+    (see `checkpoint_models`), so a LoRA run loads the base weights once in total.
+    Behavior prompts are generated in-process with a fixed seed per checkpoint.
+    """
+    t0 = time.perf_counter()
+    out_dir = Path(cfg.output_dir) / cfg.eval_name
+    (out_dir / "behavior").mkdir(parents=True, exist_ok=True)
+    run_dir = Path(cfg.run_dir)
+    checkpoints = select_checkpoints(run_dir, parse_steps(cfg.steps))
+    base_model = resolve_base_model(run_dir, checkpoints, cfg.base_model)
+    adapter = (checkpoints[0] / ADAPTER_WEIGHTS_FILE).is_file()
+
+    tokenizer = load_tokenizer(base_model)
+    docs = load_documents(
+        tokenizer,
+        records_path=Path(cfg.eval_records),
+        token_store=Path(cfg.loss.token_store) if cfg.loss.token_store else None,
+        max_eval_samples=cfg.loss.max_eval_samples,
+        max_seq_length=cfg.loss.max_seq_length,
+        stride=cfg.loss.stride,
+    )
+    b = cfg.behavior
+    cases = load_prompt_suite(Path(b.prompts_path)) if b.prompts_path else default_prompt_suite()
+    if b.max_prompts > 0:
+        cases = cases[: b.max_prompts]
+    prompts = [c.prompt for c in cases]
+    prompt_ids = tokenizer(prompts)["input_ids"] if prompts else []
+    prepare_s = time.perf_counter() - t0
+
+    curve: list[dict[str, Any]] = []
+    for ckpt, model, switch_s in checkpoint_models(checkpoints, base_model):
+        step = checkpoint_step(ckpt)
+        t_eval = time.perf_counter()
+        loss = loss_of_documents(
+            model,
+            docs,
+            pad_token_id=tokenizer.pad_token_id,
+            max_seq_length=cfg.loss.max_seq_length,
+            stride=cfg.loss.stride,
+            batch_size=cfg.loss.batch_size,
+        )
+        torch.manual_seed(cfg.seed)  # same sampling noise at every step
+        completions, counts = generate_completions(
+            model,
+            tokenizer,
+            prompts,
+            batch_size=b.batch_size,
+            max_new_tokens=b.max_new_tokens,
+            temperature=b.temperature,
+            input_ids=prompt_ids,
+        )
+        rows = [sample_row(c, t, n) for c, t, n in zip(cases, completions, counts, strict=True)]
+        samples_path = out_dir / "behavior" / f"samples-step-{step}.jsonl"
+        with samples_path.open("w", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+        curve.append(
+            {
+                "step": step,
+                "checkpoint": str(ckpt),
+                "avg_loss": loss.avg_loss,
+                "perplexity": loss.perplexity,
+                "n_tokens": loss.n_tokens,
+                "scores": suite_scores(rows),
+                "generated_tokens": sum(counts),
+                "switch_s": switch_s,
+                "eval_s": time.perf_counter() - t_eval,
+            }
+        )
+        # the curve so far, readable while later checkpoints are still running
+        write_json(out_dir / "curve.json", curve)
+
+    best = min(curve, key=lambda p: p["avg_loss"])
+    metrics = {
+        "eval_name": cfg.eval_name,
+        "run_dir": str(run_dir),
+        "base_model": base_model,
+        "checkpoint_format": "adapter" if adapter else "full",
+        "eval_records": cfg.eval_records,
+        "n_checkpoints": len(curve),
+        "n_documents": len(docs),
+        "n_prompts": len(cases),
+        "best_step_by_loss": best["step"],
+        "curve": curve,
+        "prepare_s": prepare_s,
+        "switch_s_total": sum(p["switch_s"] for p in curve),
+        "wall_s": time.perf_counter() - t0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    write_json(out_dir / "metrics.json", metrics)
+
+    names = sorted({name for p in curve for name in p["scores"]})
+    md = [f"# Checkpoint eval: {cfg.eval_name}\n"]
+    md.append(f"- Run: `{run_dir}` ({metrics['checkpoint_format']} checkpoints)")
+    md.append(f"- Base model: `{base_model}`")
+    md.append(f"- Records: `{cfg.eval_records}` ({len(docs)} documents), {len(cases)} prompts")
+    md.append(f"- Best step by loss: **{best['step']}** ({best['avg_loss']:.4f})\n")
+    columns = ["step", "avg loss", "perplexity", *names]
+    md.append("| " + " | ".join(columns) + " |")
+    md.append("|" + "---|" * len(columns))
+    for p in curve:
+        rates = [f"{p['scores'][n]['rate']:.2f}" if n in p["scores"] else "-" for n in names]
+        cells = [str(p["step"]), f"{p['avg_loss']:.4f}", f"{p['perplexity']:.2f}", *rates]
+        md.append("| " + " | ".join(cells) + " |")
+    write_markdown(out_dir / "report.md", "\n".join(md) + "\n")
+    return out_dir
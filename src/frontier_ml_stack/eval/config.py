@@ -7,6 +7,9 @@ from dataclasses import dataclass
 class LossEvalConfig:
     max_eval_samples: int = 64
     max_seq_length: int = 256
+    token_store: str = ""  # optional pre-tokenized store from `data tokenize`
+    batch_size: int = 8  # documents (windows) per forward pass, padded per batch
+    stride: int = 0  # > 0: score long documents in full with windows every `stride` tokens
 
 
 @dataclass(frozen=True)
@@ -14,6 +17,29 @@ class BehaviorEvalConfig:
     max_prompts: int = 12
     max_new_tokens: int = 64
     temperature: float = 0.0  # deterministic generation
+    batch_size: int = 8  # prompts per generate() call (left-padded)
+    prompts_path: str = ""  # JSONL prompt suite; "" => built-in prompts
+    num_workers: int = 1  # > 1: shard prompts over processes, one model replica each
+    threads_per_worker: int = 0  # 0 => cores / num_workers
+    resume: bool = False  # keep prompts finished by an interrupted run of this eval
+
+
+@dataclass(frozen=True)
+class GateConfig:
+    """
+    Sequential regression gate: suites score records/prompts in a seeded random order and
+    stop once the confidence interval of every gated metric clears its threshold (or one
+    fails it).
+    """
+
+    enabled: bool = False
+    confidence: float = 0.95
+    min_samples: int = 16  # per suite, before the first stopping check
+    max_loss: float = 0.0  # 0 => baseline avg_loss + loss_margin (ungated without a baseline)
+    min_rates: str = ""  # "refusal=0.9,json_object=0.5"; "" => baseline rates - rate_margin
+    baseline_metrics: str = ""  # metrics.json of a baseline eval run
+    loss_margin: float = 0.0
+    rate_margin: float = 0.0
 
 
 @dataclass(frozen=True)
@@ -24,6 +50,38 @@ class EvalConfig:
 
     output_dir: str = "artifacts/reports"
     seed: int = 42
+    # Content-addressed results shared by eval runs (see eval/cache.py); "" disables
+    cache_dir: str = "artifacts/eval_cache"
+    # Evaluate a running `inference serve` instead of loading model_path in-process
+    server_url: str = ""
+    concurrency: int = 8  # requests in flight to the server
+    retries: int = 3  # per request, on transport errors and 429/5xx
+    # "sequential" | "threads" (suites share the loaded model) | "processes" (a replica each)
+    suite_mode: str = "sequential"
+    threads_per_suite: int = 0  # torch threads of each concurrent suite; 0 => cores / suites
+    # > 0: the registry keeps released models up to this many MiB, so later evals in this
+    # process reuse them; 0 => leave its budget alone (the process registry frees on release)
+    model_cache_mb: float = 0.0
+
+    loss: LossEvalConfig = LossEvalConfig()
+    behavior: BehaviorEvalConfig = BehaviorEvalConfig()
+    gate: GateConfig = GateConfig()
+
+
+@dataclass(frozen=True)
+class CheckpointEvalConfig:
+    """
+    Loss/behavior curve over the checkpoints of one training run (`eval checkpoints`).
+    """
+
+    eval_name: str
+    run_dir: str  # artifacts/runs/<run>, with checkpoints/checkpoint-N
+    eval_records: str
+
+    output_dir: str = "artifacts/reports"
+    seed: int = 42
+    base_model: str = ""  # "" => the run's model_name (the base of its LoRA adapters)
+    steps: str = ""  # comma-separated checkpoint steps; "" => all
 
     loss: LossEvalConfig = LossEvalConfig()
     behavior: BehaviorEvalConfig = BehaviorEvalConfig()
@@ -1,65 +1,331 @@
 from __future__ import annotations
 
+import json
+import time
+from contextlib import nullcontext
 from dataclasses import asdict
 from pathlib import Path
+from typing import Any
 
-from frontier_ml_stack.eval.config import EvalConfig
+from frontier_ml_stack.eval.cache import EvalCache
+from frontier_ml_stack.eval.config import EvalConfig, GateConfig
 from frontier_ml_stack.eval.report import write_json, write_markdown
-from frontier_ml_stack.eval.suites.behavior_eval import eval_behavior
-from frontier_ml_stack.eval.suites.loss_eval import eval_loss
+from frontier_ml_stack.eval.scheduler import SuiteTask, run_suites
+from frontier_ml_stack.eval.sequential import gate_passed
+from frontier_ml_stack.eval.suites.behavior_eval import BehaviorEvalResult, eval_behavior
+from frontier_ml_stack.eval.suites.loss_eval import LossEvalResult, eval_loss
+from frontier_ml_stack.inference.client import health
+from frontier_ml_stack.models.loading import LoadStats
+from frontier_ml_stack.models.registry import MODEL_REGISTRY, ModelRegistry
+from frontier_ml_stack.utils.memory import peak_rss_mb
 
+# Large suites list every sample in behavior/samples-*.jsonl; the report shows a few.
+MAX_REPORT_SAMPLES = 50
 
-def run_eval(cfg: EvalConfig) -> Path:
+
+def parse_min_rates(spec: str) -> dict[str, float]:
+    """
+    "refusal=0.9,json_object=0.5" -> {"refusal": 0.9, "json_object": 0.5}
+    """
+    rates = {}
+    for item in filter(None, (x.strip() for x in spec.split(","))):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"expected name=rate in min_rates (got {item!r})")
+        rates[name.strip()] = float(value)
+    return rates
+
+
+def gate_thresholds(gate: GateConfig) -> tuple[float | None, dict[str, float]]:
+    """
+    (max loss, {scorer: min rate}) of a gate: explicit values, else the baseline's metrics
+    with the margins applied. None / {} leave a suite ungated.
+    """
+    baseline = None
+    if gate.baseline_metrics:
+        baseline = json.loads(Path(gate.baseline_metrics).read_text(encoding="utf-8"))
+    max_loss = gate.max_loss or None
+    if max_loss is None and baseline is not None:
+        max_loss = baseline["loss"]["avg_loss"] + gate.loss_margin
+    min_rates = parse_min_rates(gate.min_rates)
+    if not min_rates and baseline is not None:
+        min_rates = {
+            name: score["rate"] - gate.rate_margin
+            for name, score in baseline["behavior"].get("scores", {}).items()
+        }
+    if max_loss is None and not min_rates:
+        raise ValueError("the gate needs max_loss, min_rates or baseline_metrics")
+    return max_loss, min_rates
+
+
+def loss_cache_key(cache: EvalCache, cfg: EvalConfig, model_digest: str) -> str:
+    """
+    Cache key of the loss suite: model files, eval data (records and token store contents),
+    loss settings and seed.
+    """
+    data = {"records": cache.file_digest(Path(cfg.eval_records))}
+    if cfg.loss.token_store:
+        store = Path(cfg.loss.token_store)
+        data["token_store"] = {
+            p.name: cache.file_digest(p) for p in sorted(store.iterdir()) if p.is_file()
+        }
+    settings = {k: v for k, v in asdict(cfg.loss).items() if k != "token_store"}
+    return cache.key(suite="loss", model=model_digest, data=data, settings=settings, seed=cfg.seed)
+
+
+def loss_metrics(loss: LossEvalResult) -> dict[str, Any]:
+    return {k: v for k, v in asdict(loss).items() if k != "load"}
+
+
+def behavior_metrics(behavior: BehaviorEvalResult) -> dict[str, Any]:
+    return {
+        "n_prompts": behavior.n_prompts,
+        "refusal_rate": behavior.refusal_rate,
+        "json_format_rate": behavior.json_format_rate,
+        "scores": behavior.scores,
+        "resumed": behavior.resumed,
+        "cached": behavior.cached,
+        "generated_tokens": behavior.generated_tokens,
+        "tokens_per_second": behavior.tokens_per_second,
+    }
+
+
+def loss_section(loss: LossEvalResult) -> list[str]:
+    return [
+        "## Loss\n",
+        f"- Avg loss: **{loss.avg_loss:.4f}**",
+        f"- Perplexity: **{loss.perplexity:.2f}**",
+        f"- Samples: {loss.n_samples} ({loss.n_tokens} scored tokens)\n",
+    ]
+
+
+def behavior_section(behavior: BehaviorEvalResult) -> list[str]:
+    md = ["## Behavioral checks\n"]
+    md.append(f"- Refusal rate (safety prompts): **{behavior.refusal_rate:.2f}**")
+    md.append(f"- JSON format rate: **{behavior.json_format_rate:.2f}**\n")
+    for name, score in behavior.scores.items():
+        md.append(f"- {name}: {score['passed']}/{score['total']} passed")
+    md.append(f"\n### Samples (flagged first, up to {MAX_REPORT_SAMPLES})\n")
+    shown = sorted(behavior.samples, key=lambda s: not s.flags)[:MAX_REPORT_SAMPLES]
+    for s in shown:
+        flags = ", ".join(s.flags) if s.flags else "ok"
+        md.append(f"**{s.id}** ({flags})")
+        md.append(f"- Prompt: {s.prompt}")
+        md.append(f"- Completion: {s.completion}\n")
+    return md
+
+
+def run_eval(cfg: EvalConfig, *, registry: ModelRegistry | None = None) -> Path:
+    """
+    Run every suite against one model. The model is held in the (shared) registry for the
+    whole eval, so the suites load it once between them.
+
+    With `cfg.cache_dir`, suites whose model, data, settings and seed are unchanged are read
+    from the cache; the model is only loaded if some suite (or behavior prompt) misses.
+
+    With `cfg.gate.enabled`, the suites run as sequential tests against the gate thresholds
+    and stop early once the outcome is clear (see eval/sequential.py).
+
+    `cfg.suite_mode` schedules the suites (see eval/scheduler.py): in sequence, at once in
+    threads sharing the pinned model, or at once in processes that load a replica each.
+    Every suite writes <suite>/metrics.json and <suite>/report.md when it finishes; the
+    combined metrics.json and report.md follow once all are done.
+
+    With `cfg.server_url`, nothing is loaded here: both suites run against that `inference
+    serve` instance (its model, its decode path), and the result cache is not used since
+    the served weights cannot be digested from here.
+    """
+    t0 = time.perf_counter()
     out_root = Path(cfg.output_dir)
     out_dir = out_root / cfg.eval_name
     out_dir.mkdir(parents=True, exist_ok=True)
 
     records_path = Path(cfg.eval_records)
 
-    loss = eval_loss(
-        model_path=cfg.model_path,
-        records_path=records_path,
-        max_eval_samples=cfg.loss.max_eval_samples,
-        max_seq_length=cfg.loss.max_seq_length,
-    )
-    behavior = eval_behavior(
-        model_path=cfg.model_path,
-        max_prompts=cfg.behavior.max_prompts,
-        max_new_tokens=cfg.behavior.max_new_tokens,
-        temperature=cfg.behavior.temperature,
-    )
+    registry = registry or MODEL_REGISTRY
+    if cfg.model_cache_mb > 0:
+        registry.set_budget(cfg.model_cache_mb)
+    max_loss, min_rates = gate_thresholds(cfg.gate) if cfg.gate.enabled else (None, {})
+    server = health(cfg.server_url) if cfg.server_url else None
+    model_path = server["model_path"] if server else cfg.model_path
+    remote = {
+        "server_url": cfg.server_url,
+        "concurrency": cfg.concurrency,
+        "retries": cfg.retries,
+    }
+    cache = EvalCache(Path(cfg.cache_dir)) if cfg.cache_dir and not server else None
+    loss: LossEvalResult | None = None
+    cache_stats = None
+    # a gated loss run stops early, so its (partial) result is not cached
+    cache_loss = cache is not None and max_loss is None
+    if cache is not None:
+        model_digest = cache.model_digest(model_path)
+        cache_stats = {"dir": str(cache.root), "model_digest": model_digest}
+    if cache_loss:
+        loss_key = loss_cache_key(cache, cfg, model_digest)
+        hit = cache.get_result(loss_key)
+        loss = LossEvalResult(**hit) if hit is not None else None
+
+    behavior_dir = out_dir / "behavior"
+    processes = cfg.suite_mode == "processes"
+    loss_cached = loss is not None
+    tasks = []
+    if not loss_cached:
+        loss_kwargs = {
+            "model_path": model_path,
+            "records_path": records_path,
+            "max_eval_samples": cfg.loss.max_eval_samples,
+            "max_seq_length": cfg.loss.max_seq_length,
+            "token_store": Path(cfg.loss.token_store) if cfg.loss.token_store else None,
+            "batch_size": cfg.loss.batch_size,
+            "stride": cfg.loss.stride,
+            # a spawned suite loads its own replica
+            "registry": None if processes else registry,
+            "max_loss": max_loss,
+            "confidence": cfg.gate.confidence,
+            "min_samples": cfg.gate.min_samples,
+            "seed": cfg.seed,
+            **remote,
+        }
+        tasks.append(SuiteTask("loss", eval_loss, loss_kwargs))
+    behavior_kwargs = {
+        "model_path": model_path,
+        "max_prompts": cfg.behavior.max_prompts,
+        "max_new_tokens": cfg.behavior.max_new_tokens,
+        "temperature": cfg.behavior.temperature,
+        "batch_size": cfg.behavior.batch_size,
+        "prompts_path": Path(cfg.behavior.prompts_path) if cfg.behavior.prompts_path else None,
+        "out_dir": behavior_dir,
+        "num_workers": cfg.behavior.num_workers,
+        "threads_per_worker": cfg.behavior.threads_per_worker,
+        "resume": cfg.behavior.resume,
+        "registry": None if processes else registry,
+        "cache": cache,
+        "seed": cfg.seed,
+        "min_rates": min_rates,
+        "confidence": cfg.gate.confidence,
+        "min_samples": cfg.gate.min_samples,
+        **remote,
+    }
+    tasks.append(SuiteTask("behavior", eval_behavior, behavior_kwargs))
+
+    def write_suite(name: str, result: LossEvalResult | BehaviorEvalResult, wall_s: float) -> None:
+        # each suite's results land as soon as it finishes, next to its own report
+        if name == "loss":
+            metrics, md = loss_metrics(result), loss_section(result)
+        else:
+            metrics, md = behavior_metrics(result), behavior_section(result)
+        suite_dir = out_dir / name
+        suite_dir.mkdir(parents=True, exist_ok=True)
+        write_json(
+            suite_dir / "metrics.json",
+            {"eval_name": cfg.eval_name, "model_path": model_path, "wall_s": wall_s, **metrics},
+        )
+        write_markdown(
+            suite_dir / "report.md", "\n".join([f"# Eval report: {cfg.eval_name} ({name})\n", *md])
+        )
+        if name == "loss" and cache_loss and not loss_cached:
+            cache.put_result(loss_key, metrics)
+
+    if loss_cached:
+        write_suite("loss", loss, 0.0)
+    # pin the model across the suites (threads share it), unless the loss suite is cached
+    # (behavior then loads it only if some prompt misses) or each suite loads its own
+    shared = not loss_cached and not server and not processes
+    with registry.acquire(model_path) if shared else nullcontext() as lm:
+        done = run_suites(
+            tasks,
+            mode=cfg.suite_mode,
+            threads_per_suite=cfg.threads_per_suite,
+            on_done=write_suite,
+        )
+    suite_wall_s = {name: wall_s for name, (_, wall_s) in done.items()}
+    if not loss_cached:
+        loss = done["loss"][0]
+    behavior = done["behavior"][0]
+    registry_stats = registry.stats()
+    load = lm.stats if lm is not None else (loss.load or behavior.load)
+    if server and server.get("load"):
+        load = LoadStats(**server["load"])
+    if cache_stats is not None:
+        generated = behavior.n_prompts - behavior.cached - behavior.resumed
+        # loss is one cached result; behavior is cached per prompt
+        cache_stats |= {
+            "loss": {"hits": int(loss_cached), "misses": int(not loss_cached)},
+            "behavior": {"hits": behavior.cached, "misses": generated},
+        }
+    gate = None
+    if cfg.gate.enabled:
+        suites = {"loss": loss.gate, "behavior": behavior.gate}
+        gate = {
+            "passed": gate_passed([g["decision"] for g in suites.values() if g is not None]),
+            "confidence": cfg.gate.confidence,
+            **suites,
+        }
 
     metrics = {
         "eval_name": cfg.eval_name,
-        "model_path": cfg.model_path,
+        "model_path": model_path,
+        "server_url": cfg.server_url or None,
         "eval_records": cfg.eval_records,
-        "loss": asdict(loss),
-        "behavior": {
-            "n_prompts": behavior.n_prompts,
-            "refusal_rate": behavior.refusal_rate,
-            "json_format_rate": behavior.json_format_rate,
+        "loss": loss_metrics(loss),
+        "behavior": behavior_metrics(behavior),
+        "suites": {
+            "mode": cfg.suite_mode,
+            "wall_s": suite_wall_s,
+        },
+        # cold start of the (single) load, None when every suite was cached; registry
+        # counters are per process
+        "model_load": {
+            **(asdict(load) if load is not None else {}),
+            "registry": {k: registry_stats[k] for k in ("loads", "hits", "evictions")},
         },
+        "cache": cache_stats,
+        "gate": gate,
+        "wall_s": time.perf_counter() - t0,
+        "peak_rss_mb": peak_rss_mb(),
     }
     write_json(out_dir / "metrics.json", metrics)
 
     # Write a minimal markdown report
     md = []
     md.append(f"# Eval report: {cfg.eval_name}\n")
-    md.append(f"- Model: `{cfg.model_path}`")
-    md.append(f"- Records: `{cfg.eval_records}`\n")
-    md.append("## Loss\n")
-    md.append(f"- Avg loss: **{loss.avg_loss:.4f}**")
-    md.append(f"- Perplexity: **{loss.perplexity:.2f}**")
-    md.append(f"- Samples: {loss.n_samples}\n")
-    md.append("## Behavioral checks\n")
-    md.append(f"- Refusal rate (safety prompts): **{behavior.refusal_rate:.2f}**")
-    md.append(f"- JSON format rate: **{behavior.json_format_rate:.2f}**\n")
-    md.append("### Samples\n")
-    for s in behavior.samples:
-        flags = ", ".join(s.flags) if s.flags else "ok"
-        md.append(f"**{s.id}** ({flags})")
-        md.append(f"- Prompt: {s.prompt}")
-        md.append(f"- Completion: {s.completion}\n")
+    md.append(f"- Model: `{model_path}`" + (f" (served at {cfg.server_url})" if server else ""))
+    md.append(f"- Records: `{cfg.eval_records}`")
+    if load is not None:
+        md.append(
+            f"- Model load: {load.load_s:.2f}s ({load.weights_format}), "
+            f"peak RSS {metrics['peak_rss_mb']:.0f} MiB"
+        )
+    elif not server:
+        md.append("- Model load: none (all results cached)")
+    if cache_stats is not None:
+        md.append(
+            f"- Cache: loss {'hit' if loss_cached else 'miss'}, behavior {behavior.cached}/"
+            f"{behavior.n_prompts} prompts cached"
+        )
+    md.append("")
+    if gate is not None:
+        verdict = {True: "PASS", False: "FAIL", None: "UNDECIDED"}[gate["passed"]]
+        md.append(f"## Gate: {verdict}\n")
+        rows = []
+        if loss.gate is not None:
+            rows.append(("avg_loss <=", loss.gate))
+        if behavior.gate is not None:
+            rows += [(f"{n} >=", g) for n, g in behavior.gate["metrics"].items()]
+        for label, g in rows:
+            md.append(
+                f"- {label} {g['threshold']:.4f}: {g['estimate']:.4f} "
+                f"[{g['low']:.4f}, {g['high']:.4f}] -> {g['decision']}"
+            )
+        for suite, g, unit in (("loss", loss.gate, "docs"), ("behavior", behavior.gate, "prompts")):
+            if g is not None:
+                md.append(
+                    f"- {suite}: {g['samples_used']}/{g['n_population']} {unit} used, "
+                    f"{g['compute_saved']:.0%} compute saved"
+                )
+        md.append("")
+    md += loss_section(loss) + behavior_section(behavior)
 
     write_markdown(out_dir / "report.md", "\n".join(md))
     return out_dir
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from multiprocessing.connection import wait as wait_conns
+from typing import Any
+
+import torch
+
+from frontier_ml_stack.training.launch import threads_per_process
+
+SUITE_MODES = ("sequential", "threads", "processes")
+
+
+@dataclass(frozen=True)
+class SuiteTask:
+    """
+    One eval suite: `fn(**kwargs)`. In "processes" mode both are pickled to a spawned
+    process, so `fn` must be a module-level function and `kwargs` plain data.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+def exit_with_parent(parent_pid: int) -> None:
+    while os.getppid() == parent_pid:
+        time.sleep(1.0)
+    os._exit(1)  # orphaned (parent killed): stop instead of racing a resumed run
+
+
+def _run_task(task: SuiteTask, threads: int) -> tuple[Any, float]:
+    # ATen's OpenMP pool is per calling thread, so this is the budget of this suite only
+    torch.set_num_threads(threads)
+    t0 = time.perf_counter()
+    return task.fn(**task.kwargs), time.perf_counter() - t0
+
+
+def _suite_process(task: SuiteTask, threads: int, parent_pid: int, conn: Connection) -> None:
+    threading.Thread(target=exit_with_parent, args=(parent_pid,), daemon=True).start()
+    try:
+        conn.send(("ok", _run_task(task, threads)))
+    except BaseException:
+        conn.send(("error", traceback.format_exc()))
+        raise
+    finally:
+        conn.close()
+
+
+def run_suites(
+    tasks: list[SuiteTask],
+    *,
+    mode: str = "sequential",
+    threads_per_suite: int = 0,
+    on_done: Callable[[str, Any, float], None] | None = None,
+) -> dict[str, tuple[Any, float]]:
+    """
+    Run independent eval suites and return {name: (result, wall seconds)}.
+
+    "sequential" runs them in order on the caller's thread pool. "threads" runs them at once
+    in one process, so they share whatever the model registry holds (one copy of the weights).
+    "processes" runs each in a spawned process with its own model replica and interpreter
+    (no GIL contention; memory grows by one model per suite). Concurrent suites get
+    `threads_per_suite` torch threads each (default: cores / suites).
+
+    `on_done(name, result, wall_s)` is called on the caller's thread as each suite finishes,
+    so its results can be written without waiting for slower suites. The first failure is
+    raised; in "processes" mode the other suites are stopped, threads run to completion.
+    """
+    if mode not in SUITE_MODES:
+        raise ValueError(f"unknown suite mode {mode!r} (expected one of {', '.join(SUITE_MODES)})")
+    results: dict[str, tuple[Any, float]] = {}
+
+    def finish(name: str, result: Any, wall_s: float) -> None:
+        results[name] = (result, wall_s)
+        if on_done is not None:
+            on_done(name, result, wall_s)
+
+    if mode == "sequential" or len(tasks) < 2:
+        for task in tasks:
+            t0 = time.perf_counter()
+            finish(task.name, task.fn(**task.kwargs), time.perf_counter() - t0)
+        return results
+
+    threads = threads_per_suite or threads_per_process(len(tasks))
+    if mode == "threads":
+        caller_threads = torch.get_num_threads()
+        try:
+            with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+                pending = {pool.submit(_run_task, t, threads): t.name for t in tasks}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(pending.pop(future), *future.result())
+        finally:
+            torch.set_num_threads(caller_threads)
+        return results
+
+    # spawn, not fork: the parent's torch thread pools may already be running
+    ctx = mp.get_context("spawn")
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    procs = {}
+    try:
+        for task in tasks:
+            recv, send = ctx.Pipe(duplex=False)
+            proc = ctx.Process(
+                target=_suite_process, args=(task, threads, os.getpid(), send), name=task.name
+            )
+            proc.start()
+            send.close()
+            procs[recv] = (task.name, proc)
+        while procs:
+            for conn in wait_conns(list(procs)):
+                name, proc = procs.pop(conn)
+                try:
+                    status, payload = conn.recv()
+                except EOFError:
+                    proc.join()
+                    raise RuntimeError(
+                        f"suite {name!r} died without a result (exit code {proc.exitcode})"
+                    ) from None
+                proc.join()
+                if status == "error":
+                    raise RuntimeError(f"suite {name!r} failed:\n{payload}")
+                finish(name, *payload)
+    finally:
+        for _, proc in procs.values():
+            if proc.is_alive():
+                proc.terminate()
+    return results
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+
+
+@dataclass(frozen=True)
+class Interval:
+    estimate: float
+    low: float
+    high: float
+
+
+def _z(confidence: float) -> float:
+    if not 0.0 < confidence < 1.0:
+        raise ValueError(f"confidence must be in (0, 1) (got {confidence})")
+    return NormalDist().inv_cdf((1.0 + confidence) / 2.0)
+
+
+def _fpc(n: int, population: int) -> float:
+    """
+    Finite population correction: samples are drawn without replacement, so the interval
+    shrinks to the estimate once the whole population has been seen.
+    """
+    return max(0.0, (population - n) / max(1, population - 1)) if population > 1 else 0.0
+
+
+def ratio_interval(
+    sums: list[float], counts: list[int], *, population: int, confidence: float
+) -> Interval:
+    """
+    Normal-approximation interval for sum(sums) / sum(counts) over sampled units (e.g. the
+    token-weighted loss over documents: per-document NLL sums and token counts).
+    """
+    n = len(sums)
+    estimate = sum(sums) / max(1, sum(counts))
+    if _fpc(n, population) == 0.0:
+        return Interval(estimate, estimate, estimate)
+    if n < 2:
+        return Interval(estimate, -math.inf, math.inf)
+    mean_count = sum(counts) / n
+    resid = [s - estimate * c for s, c in zip(sums, counts, strict=True)]
+    var = sum(r * r for r in resid) / (n - 1) / n * _fpc(n, population)
+    half = _z(confidence) * math.sqrt(var) / max(mean_count, 1e-12)
+    return Interval(estimate, estimate - half, estimate + half)
+
+
+def proportion_interval(passed: int, n: int, *, population: int, confidence: float) -> Interval:
+    """
+    Wilson score interval for a pass rate, with the finite population correction.
+    """
+    if n == 0:
+        return Interval(0.0, 0.0, 1.0)
+    p = passed / n
+    z2 = _z(confidence) ** 2 * _fpc(n, population)
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half = math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) * math.sqrt(z2) / (1 + z2 / n)
+    return Interval(p, max(0.0, center - half), min(1.0, center + half))
+
+
+def decide(interval: Interval, threshold: float, *, higher_is_better: bool) -> str:
+    """
+    "pass" / "fail" once the interval lies entirely on one side of `threshold`, else
+    "undecided". A collapsed interval (whole population seen) always decides.
+    """
+    if interval.low == interval.high:
+        ok = interval.estimate >= threshold if higher_is_better else interval.estimate <= threshold
+        return "pass" if ok else "fail"
+    if higher_is_better:
+        if interval.low >= threshold:
+            return "pass"
+        return "fail" if interval.high < threshold else "undecided"
+    if interval.high <= threshold:
+        return "pass"
+    return "fail" if interval.low > threshold else "undecided"
+
+
+def gate_passed(decisions: list[str]) -> bool | None:
+    """
+    Combined gate: False as soon as one metric fails, True once all pass, else None.
+    """
+    if "fail" in decisions:
+        return False
+    return True if decisions and all(d == "pass" for d in decisions) else None
@@ -1,66 +1,417 @@
 from __future__ import annotations
 
+import asyncio
 import math
+import time
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
+import numpy as np
 import torch
-from datasets import Dataset
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import torch.nn.functional as F
 
-from frontier_ml_stack.training.data import load_records_as_dataset
+from frontier_ml_stack.eval.sequential import decide, ratio_interval
+from frontier_ml_stack.inference.client import AsyncInferenceClient, pipelined
+from frontier_ml_stack.inference.types import ScoreRequest
+from frontier_ml_stack.models.loading import LoadStats
+from frontier_ml_stack.models.registry import MODEL_REGISTRY, ModelRegistry
+from frontier_ml_stack.training.data import load_records_as_dataset, load_token_store_dataset
+from frontier_ml_stack.training.packing import IGNORE_INDEX
 
 
 @dataclass(frozen=True)
 class LossEvalResult:
-    avg_loss: float
+    avg_loss: float  # mean NLL per scored token
     perplexity: float
     n_samples: int
+    n_tokens: int = 0  # scored (label) tokens
+    n_windows: int = 0  # model inputs; > n_samples when long documents are windowed
+    tokens_per_second: float = 0.0
+    gate: dict[str, Any] | None = None  # sequential (gated) mode: interval, decision, savings
+    load: LoadStats | None = None
 
 
-def _tokenize(ds: Dataset, tokenizer, max_seq_length: int) -> Dataset:
-    def _tok(batch):
-        return tokenizer(
-            batch["text"],
-            truncation=True,
-            max_length=max_seq_length,
-            padding="max_length",
-        )
+def load_documents(
+    tokenizer,
+    *,
+    records_path: Path,
+    token_store: Path | None,
+    max_eval_samples: int,
+    max_seq_length: int,
+    stride: int = 0,
+) -> list[list[int]]:
+    """
+    Token ids of the eval documents, cut at `max_seq_length` unless windowed (`stride > 0`).
+    """
+    if token_store is not None:
+        store = load_token_store_dataset(
+            token_store, tokenizer=tokenizer, max_seq_length=max_seq_length
+        ).store
+        n = len(store) if max_eval_samples <= 0 else min(len(store), max_eval_samples)
+        docs = [store[i].astype(np.int64).tolist() for i in range(n)]
+    else:
+        ds = load_records_as_dataset(records_path)
+        if max_eval_samples > 0:
+            ds = ds.select(range(min(len(ds), max_eval_samples)))
+        docs = tokenizer(list(ds["text"]))["input_ids"] if len(ds) else []
+    return [d[:max_seq_length] for d in docs] if stride <= 0 else docs
+
+
+def loss_windows(
+    ids: list[int], *, max_seq_length: int, stride: int = 0
+) -> list[tuple[list[int], list[int]]]:
+    """
+    (input_ids, labels) model inputs covering one document.
+
+    stride=0 scores the first `max_seq_length` tokens. Otherwise windows of `max_seq_length`
+    start every `stride` tokens and each token is scored exactly once, in the first window
+    that reaches it; the tokens before it in that window (-100 labels) are context only.
+    """
+    if stride <= 0 or len(ids) <= max_seq_length:
+        window = ids[:max_seq_length]
+        return [(window, list(window))]
+    windows = []
+    scored_end = 0
+    for begin in range(0, len(ids), stride):
+        end = min(begin + max_seq_length, len(ids))
+        window = ids[begin:end]
+        context = len(window) - (end - scored_end)
+        windows.append((window, [IGNORE_INDEX] * context + window[context:]))
+        scored_end = end
+        if end == len(ids):
+            break
+    return windows
+
+
+def length_sorted_batches(lengths: list[int], *, batch_size: int) -> list[list[int]]:
+    """
+    Index batches of similar length, longest first (so a batch too big fails up front).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    return [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def collate_windows(
+    windows: list[tuple[list[int], list[int]]], *, pad_token_id: int
+) -> dict[str, torch.Tensor]:
+    """
+    Right-pad to the longest window in the batch; padding gets -100 labels.
+    """
+    width = max(len(ids) for ids, _ in windows)
+    return {
+        "input_ids": torch.tensor(
+            [ids + [pad_token_id] * (width - len(ids)) for ids, _ in windows]
+        ),
+        "attention_mask": torch.tensor(
+            [[1] * len(ids) + [0] * (width - len(ids)) for ids, _ in windows]
+        ),
+        "labels": torch.tensor([y + [IGNORE_INDEX] * (width - len(y)) for _, y in windows]),
+    }
+
+
+def position_nll(logits: torch.Tensor, labels: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Next-token NLL at every position (0 where unlabelled) and the mask of labelled (non -100)
+    positions, both (B, L - 1).
+    """
+    targets = labels[:, 1:]
+    nll = F.cross_entropy(
+        logits[:, :-1].transpose(1, 2).float(),
+        targets,
+        ignore_index=IGNORE_INDEX,
+        reduction="none",
+    )
+    return nll, targets != IGNORE_INDEX
 
-    tok = ds.map(_tok, batched=True, remove_columns=["text"])
-    tok.set_format(type="torch", columns=["input_ids", "attention_mask"])
-    return tok
+
+def row_nll(logits: torch.Tensor, labels: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """
+    Per-row summed next-token NLL over labelled (non -100) positions, and their counts.
+    """
+    nll, mask = position_nll(logits, labels)
+    return nll.sum(dim=1), mask.sum(dim=1)
+
+
+def token_nll(logits: torch.Tensor, labels: torch.Tensor) -> tuple[float, int]:
+    """
+    Summed next-token NLL over labelled (non -100) positions, and their count.
+    """
+    nll, counts = row_nll(logits, labels)
+    return float(nll.sum()), int(counts.sum())
+
+
+def _scored_tokens(windows: list[tuple[list[int], list[int]]]) -> int:
+    return sum(sum(y != IGNORE_INDEX for y in labels[1:]) for _, labels in windows)
 
 
 @torch.no_grad()
+def score_documents(
+    model,
+    docs: list[list[int]],
+    *,
+    pad_token_id: int,
+    max_seq_length: int,
+    stride: int,
+    batch_size: int,
+) -> tuple[list[tuple[float, int]], int]:
+    """
+    (summed NLL, scored tokens) per document, and the number of windows (model inputs).
+    """
+    windows = [
+        (d, w)
+        for d, ids in enumerate(docs)
+        for w in loss_windows(ids, max_seq_length=max_seq_length, stride=stride)
+    ]
+    scores = [[0.0, 0] for _ in docs]
+    for idx in length_sorted_batches([len(w[0]) for _, w in windows], batch_size=batch_size):
+        batch = collate_windows([windows[i][1] for i in idx], pad_token_id=pad_token_id)
+        logits = model(input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]).logits
+        nll, counts = row_nll(logits, batch["labels"])
+        for i, a, n in zip(idx, nll.tolist(), counts.tolist(), strict=True):
+            scores[windows[i][0]][0] += a
+            scores[windows[i][0]][1] += n
+    return [(a, int(n)) for a, n in scores], len(windows)
+
+
+class _LossTally:
+    """
+    Per-document scores as they arrive, and the sequential gate on their mean (if any).
+    """
+
+    def __init__(
+        self, population: int, max_loss: float | None, *, confidence: float, min_samples: int
+    ) -> None:
+        self.population = population
+        self.max_loss = max_loss
+        self.confidence = confidence
+        self.min_samples = min(min_samples, population)
+        self.docs: dict[int, tuple[float, int]] = {}
+        self.n_windows = 0
+        self.interval = None
+        self.decision = None
+
+    def add(self, doc_ids: list[int], scores: list[tuple[float, int]], n_windows: int) -> None:
+        self.docs.update(zip(doc_ids, scores, strict=True))
+        self.n_windows += n_windows
+        if self.max_loss is not None and len(self.docs) >= self.min_samples:
+            sums, counts = zip(*self.docs.values(), strict=True)
+            self.interval = ratio_interval(
+                list(sums), list(counts), population=self.population, confidence=self.confidence
+            )
+            self.decision = decide(self.interval, self.max_loss, higher_is_better=False)
+
+    @property
+    def decided(self) -> bool:
+        return self.decision not in (None, "undecided")
+
+    def result(
+        self, elapsed: float, *, tokens_total: int | None, load: LoadStats | None
+    ) -> LossEvalResult:
+        total_nll = sum(a for a, _ in self.docs.values())
+        total_tokens = sum(n for _, n in self.docs.values())
+        avg_loss = total_nll / max(1, total_tokens)
+        ppl = float(math.exp(avg_loss)) if avg_loss < 20 else float("inf")
+        gate = None
+        if self.max_loss is not None:
+            if tokens_total:
+                saved = 1.0 - total_tokens / tokens_total
+            else:  # unscored documents' lengths unknown (remote): count documents
+                saved = 1.0 - len(self.docs) / self.population if self.population else 0.0
+            gate = {
+                "metric": "avg_loss",
+                "threshold": self.max_loss,
+                "decision": self.decision or "pass",  # no documents: nothing contradicts it
+                "estimate": avg_loss,
+                "low": self.interval.low if self.interval else avg_loss,
+                "high": self.interval.high if self.interval else avg_loss,
+                "samples_used": len(self.docs),
+                "n_population": self.population,
+                "tokens_scored": total_tokens,
+                "tokens_total": tokens_total,
+                "compute_saved": saved,
+            }
+        return LossEvalResult(
+            avg_loss=avg_loss,
+            perplexity=ppl,
+            n_samples=len(self.docs),
+            n_tokens=total_tokens,
+            n_windows=self.n_windows,
+            tokens_per_second=total_tokens / elapsed if elapsed > 0 else 0.0,
+            gate=gate,
+            load=load,
+        )
+
+
+def _eval_order(n: int, *, gated: bool, batch_size: int, seed: int) -> list[list[int]]:
+    """
+    Document chunks in scoring order: all at once, or seeded random batches when gated.
+    """
+    if not gated:
+        return [list(range(n))] if n else []
+    order = torch.randperm(n, generator=torch.Generator().manual_seed(seed)).tolist()
+    return [order[i : i + batch_size] for i in range(0, n, batch_size)]
+
+
+def _eval_loss_remote(
+    server_url: str,
+    texts: list[str],
+    chunks: list[list[int]],
+    tally: _LossTally,
+    *,
+    max_seq_length: int,
+    stride: int,
+    concurrency: int,
+    retries: int,
+) -> None:
+    async def run() -> None:
+        async with AsyncInferenceClient(
+            server_url, concurrency=concurrency, retries=retries
+        ) as client:
+
+            def call(chunk: list[int]):
+                req = ScoreRequest(
+                    texts=[texts[d] for d in chunk],
+                    max_seq_length=max_seq_length,
+                    stride=stride,
+                    token_logprobs=False,
+                )
+                return client.score(req)
+
+            def on_result(chunk: list[int], resp) -> None:
+                scores = [(r.nll, r.tokens) for r in resp.results]
+                tally.add(chunk, scores, resp.n_windows)
+
+            await pipelined(
+                chunks,
+                call,
+                concurrency=concurrency,
+                on_result=on_result,
+                stop=lambda: tally.decided,
+            )
+
+    asyncio.run(run())
+
+
+def loss_of_documents(
+    model,
+    docs: list[list[int]],
+    *,
+    pad_token_id: int,
+    max_seq_length: int,
+    stride: int,
+    batch_size: int,
+) -> LossEvalResult:
+    """
+    Ungated loss of already tokenized documents (see `load_documents`) under `model`.
+    """
+    tally = _LossTally(len(docs), None, confidence=0.95, min_samples=0)
+    t0 = time.perf_counter()
+    scores, n_windows = score_documents(
+        model,
+        docs,
+        pad_token_id=pad_token_id,
+        max_seq_length=max_seq_length,
+        stride=stride,
+        batch_size=batch_size,
+    )
+    tally.add(list(range(len(docs))), scores, n_windows)
+    return tally.result(time.perf_counter() - t0, tokens_total=None, load=None)
+
+
 def eval_loss(
     *,
     model_path: str,
     records_path: Path,
     max_eval_samples: int,
     max_seq_length: int,
+    token_store: Path | None = None,
+    batch_size: int = 8,
+    stride: int = 0,
+    registry: ModelRegistry | None = None,
+    max_loss: float | None = None,
+    confidence: float = 0.95,
+    min_samples: int = 16,
+    seed: int = 0,
+    server_url: str = "",
+    concurrency: int = 8,
+    retries: int = 3,
 ) -> LossEvalResult:
-    tokenizer = AutoTokenizer.from_pretrained(model_path)
-    if tokenizer.pad_token is None:
-        tokenizer.pad_token = tokenizer.eos_token
-
-    model = AutoModelForCausalLM.from_pretrained(model_path, use_safetensors=False)
-    model.eval()
-
-    ds = load_records_as_dataset(records_path)
-    if max_eval_samples > 0:
-        ds = ds.select(range(min(len(ds), max_eval_samples)))
-
-    tok = _tokenize(ds, tokenizer, max_seq_length)
-
-    losses: list[float] = []
-    for i in range(len(tok)):
-        batch = tok[i]
-        input_ids = batch["input_ids"].unsqueeze(0)
-        attention_mask = batch["attention_mask"].unsqueeze(0)
-        out = model(input_ids=input_ids, attention_mask=attention_mask, labels=input_ids)
-        losses.append(float(out.loss))
-
-    avg_loss = sum(losses) / max(1, len(losses))
-    ppl = float(math.exp(avg_loss)) if avg_loss < 20 else float("inf")
-    return LossEvalResult(avg_loss=avg_loss, perplexity=ppl, n_samples=len(losses))
+    """
+    Token-weighted loss over the eval documents, in length-sorted, dynamically padded batches.
+
+    Documents are cut at `max_seq_length`, or with `stride > 0` covered by sliding windows
+    (see `loss_windows`) so long documents are scored in full.
+
+    With a `max_loss` gate, documents are scored in a seeded random order, `batch_size` at a
+    time, and scoring stops once the `confidence` interval of the loss (after at least
+    `min_samples` documents) lies entirely below or above `max_loss`.
+
+    With `server_url`, the documents are sent to a running `inference serve` (its /score
+    endpoint), `batch_size` per request with up to `concurrency` requests in flight.
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be >= 1 (got {batch_size})")
+    # windows must overlap: a window's first token has no context and is never predicted
+    if not 0 <= stride < max_seq_length:
+        raise ValueError(f"stride must be in [0, max_seq_length) (got {stride})")
+    kwargs = {"confidence": confidence, "min_samples": min_samples}
+
+    if server_url:
+        if token_store is not None:
+            raise ValueError("a token store cannot be scored remotely; pass the records")
+        ds = load_records_as_dataset(records_path)
+        if max_eval_samples > 0:
+            ds = ds.select(range(min(len(ds), max_eval_samples)))
+        texts = list(ds["text"])
+        tally = _LossTally(len(texts), max_loss, **kwargs)
+        chunks = _eval_order(len(texts), gated=True, batch_size=batch_size, seed=seed)
+        t0 = time.perf_counter()
+        _eval_loss_remote(
+            server_url,
+            texts,
+            chunks,
+            tally,
+            max_seq_length=max_seq_length,
+            stride=stride,
+            concurrency=concurrency,
+            retries=retries,
+        )
+        return tally.result(time.perf_counter() - t0, tokens_total=None, load=None)
+
+    with (registry or MODEL_REGISTRY).acquire(model_path) as lm:
+        tokenizer, model = lm.tokenizer, lm.model
+        docs = load_documents(
+            tokenizer,
+            records_path=records_path,
+            token_store=token_store,
+            max_eval_samples=max_eval_samples,
+            max_seq_length=max_seq_length,
+            stride=stride,
+        )
+        tally = _LossTally(len(docs), max_loss, **kwargs)
+        t0 = time.perf_counter()
+        chunks = _eval_order(
+            len(docs), gated=max_loss is not None, batch_size=batch_size, seed=seed
+        )
+        for chunk in chunks:
+            scores, n_windows = score_documents(
+                model,
+                [docs[d] for d in chunk],
+                pad_token_id=tokenizer.pad_token_id,
+                max_seq_length=max_seq_length,
+                stride=stride,
+                batch_size=batch_size,
+            )
+            tally.add(chunk, scores, n_windows)
+            if tally.decided:
+                break
+        elapsed = time.perf_counter() - t0
+
+    tokens_total = None
+    if max_loss is not None:
+        tokens_total = sum(
+            _scored_tokens(loss_windows(d, max_seq_length=max_seq_length, stride=stride))
+            for d in docs
+        )
+    return tally.result(elapsed, tokens_total=tokens_total, load=lm.stats)
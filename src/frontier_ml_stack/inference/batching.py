@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+import torch
+
+from frontier_ml_stack.eval.suites.loss_eval import collate_windows, position_nll
+
+Row = tuple[list[int], list[int]]  # (input_ids, labels with -100 for unscored positions)
+
+
+def token_budget_batches(lengths: list[int], *, max_tokens: int) -> list[list[int]]:
+    """
+    Index batches of similar length, longest first, whose padded size (rows x longest row)
+    stays within `max_tokens`. A row longer than the budget gets a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    batches: list[list[int]] = []
+    for i in order:
+        if batches and (len(batches[-1]) + 1) * lengths[batches[-1][0]] <= max_tokens:
+            batches[-1].append(i)
+        else:
+            batches.append([i])
+    return batches
+
+
+@dataclass
+class _Job:
+    rows: list[Row]
+    future: Future = field(default_factory=Future)
+
+
+class ScoreBatcher:
+    """
+    Scores rows for concurrent requests in shared, dynamically padded forward passes.
+
+    One worker thread owns the forward passes. It takes the first queued request, then keeps
+    collecting requests for up to `max_wait_ms` (or until `max_batch_tokens` rows' tokens are
+    queued), and runs all their rows together: sorted by length and right-padded per batch
+    to the longest row, within the token budget. Each caller gets the log-probs of its own
+    rows' labelled tokens back.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        *,
+        pad_token_id: int,
+        max_batch_tokens: int = 8192,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        if max_batch_tokens < 1:
+            raise ValueError(f"max_batch_tokens must be >= 1 (got {max_batch_tokens})")
+        self.model = model
+        self.pad_token_id = pad_token_id
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue: queue.Queue[_Job | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "rows": 0, "forwards": 0, "tokens": 0, "padded_tokens": 0}
+        self._thread = threading.Thread(target=self._loop, name="score-batcher", daemon=True)
+        self._thread.start()
+
+    def score(self, rows: list[Row]) -> list[list[float]]:
+        """
+        Log-prob of every labelled token, per row (blocks until the rows' batch has run).
+        """
+        if not rows:
+            return []
+        job = _Job(rows)
+        self._queue.put(job)
+        return job.future.result()
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            stats = dict(self._stats)
+        forwards = max(1, stats["forwards"])
+        stats["rows_per_forward"] = stats["rows"] / forwards
+        stats["padding_fraction"] = 1.0 - stats["tokens"] / max(1, stats["padded_tokens"])
+        return stats
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self) -> None:
+        closing = False
+        while not closing:
+            job = self._queue.get()
+            if job is None:
+                return
+            jobs = [job]
+            tokens = sum(len(ids) for ids, _ in job.rows)
+            deadline = time.monotonic() + self.max_wait_s
+            while tokens < self.max_batch_tokens:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    closing = True  # finish what was collected, then stop
+                    break
+                jobs.append(nxt)
+                tokens += sum(len(ids) for ids, _ in nxt.rows)
+            self._run(jobs)
+
+    @torch.no_grad()
+    def _run(self, jobs: list[_Job]) -> None:
+        rows = [row for job in jobs for row in job.rows]
+        try:
+            batches = token_budget_batches(
+                [len(ids) for ids, _ in rows], max_tokens=self.max_batch_tokens
+            )
+            out: list[list[float]] = [[] for _ in rows]
+            padded = 0
+            for idx in batches:
+                batch = collate_windows([rows[i] for i in idx], pad_token_id=self.pad_token_id)
+                padded += batch["input_ids"].numel()
+                logits = self.model(
+                    input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]
+                ).logits
+                nll, mask = position_nll(logits, batch["labels"])
+                for row, i in enumerate(idx):
+                    out[i] = (-nll[row][mask[row]]).tolist()
+        except BaseException as e:
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+        with self._lock:
+            self._stats["requests"] += len(jobs)
+            self._stats["rows"] += len(rows)
+            self._stats["forwards"] += len(batches)
+            self._stats["tokens"] += sum(len(ids) for ids, _ in rows)
+            self._stats["padded_tokens"] += padded
+        start = 0
+        for job in jobs:
+            job.future.set_result(out[start : start + len(job.rows)])
+            start += len(job.rows)
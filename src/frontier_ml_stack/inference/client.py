@@ -1,8 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any, TypeVar
+
 import httpx
 
-from frontier_ml_stack.inference.types import GenerateRequest, GenerateResponse
+from frontier_ml_stack.inference.types import (
+    GenerateRequest,
+    GenerateResponse,
+    ScoreRequest,
+    ScoreResponse,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Worth retrying: the server is overloaded or restarting, not rejecting the request.
+RETRY_STATUS = {429, 502, 503, 504}
 
 
 def generate(base_url: str, req: GenerateRequest, timeout_s: float = 60.0) -> GenerateResponse:
@@ -11,3 +26,113 @@ def generate(base_url: str, req: GenerateRequest, timeout_s: float = 60.0) -> Ge
         r = client.post(url, json=req.model_dump())
         r.raise_for_status()
         return GenerateResponse.model_validate(r.json())
+
+
+def score(base_url: str, req: ScoreRequest, timeout_s: float = 300.0) -> ScoreResponse:
+    url = base_url.rstrip("/") + "/score"
+    with httpx.Client(timeout=timeout_s) as client:
+        r = client.post(url, json=req.model_dump())
+        r.raise_for_status()
+        return ScoreResponse.model_validate(r.json())
+
+
+def health(base_url: str, timeout_s: float = 10.0) -> dict[str, Any]:
+    r = httpx.get(base_url.rstrip("/") + "/health", timeout=timeout_s)
+    r.raise_for_status()
+    return r.json()
+
+
+class AsyncInferenceClient:
+    """
+    Async client for `inference serve` over one pooled connection set.
+
+    At most `concurrency` requests are in flight (and as many connections kept alive).
+    Transport errors and 429/502/503/504 responses are retried `retries` times with
+    exponential backoff; other errors are raised.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        concurrency: int = 8,
+        retries: int = 3,
+        backoff_s: float = 0.5,
+        timeout_s: float = 300.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be >= 1 (got {concurrency})")
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.retried = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout_s,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            transport=transport,
+        )
+
+    async def __aenter__(self) -> AsyncInferenceClient:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self._client.aclose()
+
+    async def _post(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                last = attempt == self.retries
+                try:
+                    r = await self._client.post(path, json=payload)
+                except httpx.TransportError:
+                    if last:
+                        raise
+                else:
+                    if r.status_code not in RETRY_STATUS or last:
+                        r.raise_for_status()
+                        return r.json()
+                self.retried += 1
+                await asyncio.sleep(self.backoff_s * 2**attempt)
+        raise AssertionError("unreachable")
+
+    async def generate(self, req: GenerateRequest) -> GenerateResponse:
+        return GenerateResponse.model_validate(await self._post("/generate", req.model_dump()))
+
+    async def score(self, req: ScoreRequest) -> ScoreResponse:
+        return ScoreResponse.model_validate(await self._post("/score", req.model_dump()))
+
+
+async def pipelined(
+    items: Iterable[T],
+    call: Callable[[T], Awaitable[R]],
+    *,
+    concurrency: int,
+    on_result: Callable[[T, R], None],
+    stop: Callable[[], bool] | None = None,
+) -> None:
+    """
+    Run `call(item)` for every item with at most `concurrency` in flight, passing results to
+    `on_result` as they complete. Once `stop()` is true no new item is started; the ones in
+    flight still finish. The first error cancels the rest and is raised.
+    """
+    pending: dict[asyncio.Task[R], T] = {}
+    todo = iter(items)
+    end = object()
+    try:
+        while True:
+            while len(pending) < concurrency and not (stop is not None and stop()):
+                item = next(todo, end)
+                if item is end:
+                    break
+                pending[asyncio.ensure_future(call(item))] = item
+            if not pending:
+                return
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                on_result(pending.pop(task), task.result())
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,41 +1,72 @@
 from __future__ import annotations
 
+import logging
 import time
-from dataclasses import dataclass
+from dataclasses import asdict
+from typing import Any
 
 import torch
-from fastapi import FastAPI
-from transformers import AutoModelForCausalLM, AutoTokenizer
-
-from frontier_ml_stack.inference.types import GenerateRequest, GenerateResponse
-
-
-@dataclass
-class LoadedModel:
-    model_path: str
-    tokenizer: any
-    model: any
-
-
-def create_app(model_path: str) -> FastAPI:
+from fastapi import FastAPI, HTTPException
+
+from frontier_ml_stack.eval.suites.loss_eval import loss_windows
+from frontier_ml_stack.inference.batching import ScoreBatcher
+from frontier_ml_stack.inference.types import (
+    GenerateRequest,
+    GenerateResponse,
+    ScoreRequest,
+    ScoreResponse,
+    ScoreResult,
+)
+from frontier_ml_stack.models.loading import load_model_and_tokenizer
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+
+logger = logging.getLogger(__name__)
+
+
+def create_app(
+    model_path: str, *, score_batch_tokens: int = 8192, score_wait_ms: float = 2.0
+) -> FastAPI:
+    """
+    `/score` requests are micro-batched: requests queued within `score_wait_ms` of the first
+    one share forward passes of at most `score_batch_tokens` padded tokens.
+    """
     app = FastAPI(title="Frontier ML Stack - Inference")
-    state: dict[str, LoadedModel] = {}
+    state: dict[str, Any] = {}
 
     @app.on_event("startup")
     def _load() -> None:
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
-        if tokenizer.pad_token is None:
-            tokenizer.pad_token = tokenizer.eos_token
-
-        model = AutoModelForCausalLM.from_pretrained(model_path, use_safetensors=False)
-        model.eval()
-
         # CPU mode (Mac-friendly)
-        state["lm"] = LoadedModel(model_path=model_path, tokenizer=tokenizer, model=model)
+        lm = load_model_and_tokenizer(model_path)
+        state["lm"] = lm
+        state["batcher"] = ScoreBatcher(
+            lm.model,
+            pad_token_id=lm.tokenizer.pad_token_id,
+            max_batch_tokens=score_batch_tokens,
+            max_wait_ms=score_wait_ms,
+        )
+        logger.info(
+            "loaded %s (%s) in %.2fs, peak RSS %.0f MiB",
+            model_path,
+            lm.stats.weights_format,
+            lm.stats.load_s,
+            lm.stats.peak_rss_mb,
+        )
+
+    @app.on_event("shutdown")
+    def _stop() -> None:
+        if "batcher" in state:
+            state["batcher"].close()
 
     @app.get("/health")
-    def health() -> dict[str, str]:
-        return {"status": "ok", "model_path": model_path}
+    def health() -> dict[str, Any]:
+        lm = state.get("lm")
+        batcher = state.get("batcher")
+        return {
+            "status": "ok",
+            "model_path": model_path,
+            "load": asdict(lm.stats) if lm is not None else None,
+            "score_batching": batcher.stats() if batcher is not None else None,
+        }
 
     @torch.no_grad()
     @app.post("/generate", response_model=GenerateResponse)
@@ -61,12 +92,13 @@ def create_app(model_path: str) -> FastAPI:
             pad_token_id=tok.eos_token_id,
         )
 
-        decoded = tok.decode(gen[0], skip_special_tokens=True)
-        completion = decoded[len(req.prompt) :].strip()
+        # decode the new tokens only: slicing the decoded text by len(prompt) breaks
+        # whenever decoding does not round-trip the prompt exactly
+        prompt_tokens = int(input_ids.shape[1])
+        completion = tok.decode(gen[0, prompt_tokens:], skip_special_tokens=True).strip()
 
         elapsed_ms = (time.time() - t0) * 1000.0
-        prompt_tokens = int(input_ids.shape[1])
-        completion_tokens = int(gen.shape[1] - input_ids.shape[1])
+        completion_tokens = int(gen.shape[1] - prompt_tokens)
 
         return GenerateResponse(
             completion=completion,
@@ -76,4 +108,61 @@ def create_app(model_path: str) -> FastAPI:
             completion_tokens=completion_tokens,
         )
 
+    @app.post("/score", response_model=ScoreResponse)
+    def score(req: ScoreRequest) -> ScoreResponse:
+        """
+        Log-probs of scored tokens: every token of each text (windowed as in the loss eval),
+        or each pair's continuation given its prompt. Rows of concurrent requests share
+        forward passes (see `ScoreBatcher`).
+        """
+        lm = state["lm"]
+        tok = lm.tokenizer
+        if req.stride >= req.max_seq_length:
+            raise HTTPException(status_code=422, detail="stride must be < max_seq_length")
+        t0 = time.time()
+        rows: list[tuple[list[int], list[int]]] = []
+        owner: list[int] = []  # result index of each row
+        truncated: list[bool] = []
+        if req.texts:
+            for i, ids in enumerate(tok(req.texts)["input_ids"]):
+                if not ids:
+                    raise HTTPException(status_code=422, detail=f"text {i} has no tokens")
+                windows = loss_windows(ids, max_seq_length=req.max_seq_length, stride=req.stride)
+                rows += windows
+                owner += [i] * len(windows)
+                truncated.append(req.stride == 0 and len(ids) > req.max_seq_length)
+        else:
+            prompts = tok([p.prompt for p in req.pairs])["input_ids"]
+            continuations = tok([p.continuation for p in req.pairs], add_special_tokens=False)
+            for i, (prompt, cont) in enumerate(
+                zip(prompts, continuations["input_ids"], strict=True)
+            ):
+                if not prompt or not cont:
+                    raise HTTPException(
+                        status_code=422, detail=f"pair {i}: prompt and continuation need tokens"
+                    )
+                # keep the whole continuation if it fits, and as much recent context as fits
+                kept = cont[: req.max_seq_length - 1]
+                context = prompt[-(req.max_seq_length - len(kept)) :]
+                rows.append((context + kept, [IGNORE_INDEX] * len(context) + kept))
+                owner.append(i)
+                truncated.append(len(kept) < len(cont) or len(context) < len(prompt))
+        logprobs: list[list[float]] = [[] for _ in truncated]
+        for i, lp in zip(owner, state["batcher"].score(rows), strict=True):
+            logprobs[i] += lp
+        return ScoreResponse(
+            results=[
+                ScoreResult(
+                    nll=-sum(lp),
+                    tokens=len(lp),
+                    token_logprobs=lp if req.token_logprobs else None,
+                    truncated=cut,
+                )
+                for lp, cut in zip(logprobs, truncated, strict=True)
+            ],
+            model_path=lm.model_path,
+            elapsed_ms=(time.time() - t0) * 1000.0,
+            n_windows=len(rows),
+        )
+
     return app
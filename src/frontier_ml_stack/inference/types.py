@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class GenerateRequest(BaseModel):
@@ -16,3 +16,36 @@ class GenerateResponse(BaseModel):
     elapsed_ms: float
     prompt_tokens: int
     completion_tokens: int
+
+
+class ScorePair(BaseModel):
+    prompt: str = Field(..., min_length=1)  # context only
+    continuation: str = Field(..., min_length=1)  # scored; tokenized on its own, as in DPO
+
+
+class ScoreRequest(BaseModel):
+    texts: list[str] = Field(default_factory=list)  # score whole texts (the loss eval)...
+    pairs: list[ScorePair] = Field(default_factory=list)  # ...or continuations given prompts
+    max_seq_length: int = Field(256, ge=2, le=8192)
+    stride: int = Field(0, ge=0)  # texts only; > 0: score long texts in full with windows
+    token_logprobs: bool = True  # return the log-prob of every scored token
+
+    @model_validator(mode="after")
+    def _texts_or_pairs(self) -> ScoreRequest:
+        if bool(self.texts) == bool(self.pairs):
+            raise ValueError("give either texts or pairs")
+        return self
+
+
+class ScoreResult(BaseModel):
+    nll: float  # summed next-token NLL
+    tokens: int  # scored tokens
+    token_logprobs: list[float] | None = None  # one per scored token, in order
+    truncated: bool = False  # pairs: prompt (or continuation) cut to fit max_seq_length
+
+
+class ScoreResponse(BaseModel):
+    results: list[ScoreResult]
+    model_path: str
+    elapsed_ms: float
+    n_windows: int
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from frontier_ml_stack.utils.memory import peak_rss_mb
+
+SAFETENSORS_FILES = ("model.safetensors", "model.safetensors.index.json")
+PICKLE_FILES = ("pytorch_model.bin", "pytorch_model.bin.index.json")
+
+
+@dataclass(frozen=True)
+class LoadStats:
+    weights_format: str  # "safetensors", "pickle" or "hub" (resolved by transformers)
+    load_s: float
+    peak_rss_mb: float  # process high-water mark right after loading
+
+
+@dataclass
+class LoadedModel:
+    model_path: str
+    tokenizer: Any
+    model: Any
+    stats: LoadStats
+
+
+def weights_format(model_path: str) -> str:
+    """
+    How a local model dir stores its weights; "hub" for anything that is not a local dir.
+    """
+    path = Path(model_path)
+    if not path.is_dir():
+        return "hub"
+    if any((path / f).is_file() for f in SAFETENSORS_FILES):
+        return "safetensors"
+    if any((path / f).is_file() for f in PICKLE_FILES):
+        return "pickle"
+    raise FileNotFoundError(f"no model weights in {path}")
+
+
+def load_tokenizer(model_path: str):
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def load_causal_lm(model_path: str, *, dtype: torch.dtype | None = None):
+    """
+    Load a causal LM, preferring safetensors.
+
+    Safetensors files are memory-mapped and each tensor is copied out of the page cache as its
+    parameter is materialized (no pickle unpacking, no second full copy in RAM). Pickle
+    checkpoints still load (mmap-ed where torch supports it); re-save them to get the fast path.
+    """
+    fmt = weights_format(model_path)
+    kwargs: dict[str, Any] = {"low_cpu_mem_usage": True}
+    if fmt == "safetensors":
+        kwargs["use_safetensors"] = True
+    if dtype is not None:
+        kwargs["torch_dtype"] = dtype
+    return AutoModelForCausalLM.from_pretrained(model_path, **kwargs)
+
+
+def load_model_and_tokenizer(model_path: str, *, dtype: torch.dtype | None = None) -> LoadedModel:
+    """
+    Tokenizer (pad token set) + model in eval mode, with cold-start time and peak RSS.
+    """
+    t0 = time.perf_counter()
+    tokenizer = load_tokenizer(model_path)
+    model = load_causal_lm(model_path, dtype=dtype)
+    model.eval()
+    stats = LoadStats(
+        weights_format=weights_format(model_path),
+        load_s=time.perf_counter() - t0,
+        peak_rss_mb=peak_rss_mb(),
+    )
+    return LoadedModel(model_path=model_path, tokenizer=tokenizer, model=model, stats=stats)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import gc
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+import torch
+
+from frontier_ml_stack.models.loading import LoadedModel, load_model_and_tokenizer
+
+
+def model_size_mb(model: torch.nn.Module) -> float:
+    """
+    Parameter + buffer memory of a loaded model (tied weights counted once), in MiB.
+    """
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+
+
+@dataclass
+class _Entry:
+    lm: LoadedModel
+    size_mb: float
+    refs: int = 0
+
+
+class ModelRegistry:
+    """
+    In-process cache of loaded (tokenizer, model) pairs, shared by the eval suites.
+
+    `acquire` hands out a model and pins it until the block exits; pinned models are never
+    evicted. Released models stay cached, least recently used first out, while the cached
+    total exceeds `budget_mb` (0 => nothing is kept once released). Thread-safe; a miss
+    loads under the registry lock, so concurrent users of one model load it once.
+    """
+
+    def __init__(
+        self,
+        budget_mb: float = 0.0,
+        loader: Callable[..., LoadedModel] = load_model_and_tokenizer,
+    ) -> None:
+        self.budget_mb = budget_mb
+        self._loader = loader
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"loads": 0, "hits": 0, "evictions": 0}
+
+    @contextmanager
+    def acquire(
+        self, model_path: str, *, dtype: torch.dtype | None = None
+    ) -> Iterator[LoadedModel]:
+        key = (model_path, str(dtype))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                lm = self._loader(model_path, dtype=dtype)
+                entry = self._entries[key] = _Entry(lm=lm, size_mb=model_size_mb(lm.model))
+                self._counts["loads"] += 1
+            else:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+            entry.refs += 1
+        try:
+            yield entry.lm
+        finally:
+            with self._lock:
+                entry.refs -= 1
+                self._evict()
+
+    def _evict(self) -> None:
+        evicted = False
+        for key in list(self._entries):
+            if self.resident_mb() <= self.budget_mb:
+                break
+            if self._entries[key].refs == 0:
+                del self._entries[key]
+                self._counts["evictions"] += 1
+                evicted = True
+        if evicted:
+            gc.collect()
+
+    def set_budget(self, budget_mb: float) -> None:
+        """
+        Change the cache budget, evicting released models right away if now over it.
+        """
+        with self._lock:
+            self.budget_mb = budget_mb
+            self._evict()
+
+    def resident_mb(self) -> float:
+        return sum(e.size_mb for e in self._entries.values())
+
+    def clear(self) -> None:
+        """
+        Drop every released model.
+        """
+        with self._lock:
+            budget, self.budget_mb = self.budget_mb, 0.0
+            self._evict()
+            self.budget_mb = budget
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counts,
+                "cached": [
+                    {"model_path": path, "size_mb": e.size_mb, "refs": e.refs}
+                    for (path, _), e in self._entries.items()
+                ],
+                "resident_mb": self.resident_mb(),
+                "budget_mb": self.budget_mb,
+            }
+
+
+# Process-wide registry the eval suites share unless given their own.
+MODEL_REGISTRY = ModelRegistry()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+
+import torch
+
+
+class LengthBucketBatchSampler(torch.utils.data.Sampler[list[int]]):
+    """
+    Seeded batch sampler that groups examples of similar length.
+
+    Each epoch: shuffle all indices, cut them into buckets of `batch_size * bucket_multiplier`,
+    sort every bucket by length, split it into batches, then shuffle the batch order. The
+    result depends only on (seed, epoch), so runs are reproducible and resumable.
+    """
+
+    def __init__(
+        self,
+        lengths: Sequence[int],
+        *,
+        batch_size: int,
+        seed: int,
+        bucket_multiplier: int = 50,
+        drop_last: bool = False,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be >= 1 (got {batch_size})")
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.seed = seed
+        self.bucket_size = batch_size * max(1, bucket_multiplier)
+        self.drop_last = drop_last
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def batches(self) -> list[list[int]]:
+        """
+        Batches for the current epoch (pure function of seed and epoch).
+        """
+        g = torch.Generator()
+        g.manual_seed(self.seed + self.epoch)
+
+        order = torch.randperm(len(self.lengths), generator=g).tolist()
+        batches: list[list[int]] = []
+        for start in range(0, len(order), self.bucket_size):
+            bucket = sorted(order[start : start + self.bucket_size], key=self.lengths.__getitem__)
+            for b in range(0, len(bucket), self.batch_size):
+                batch = bucket[b : b + self.batch_size]
+                if len(batch) < self.batch_size and self.drop_last:
+                    continue
+                batches.append(batch)
+
+        perm = torch.randperm(len(batches), generator=g).tolist()
+        return [batches[i] for i in perm]
+
+    def __iter__(self) -> Iterator[list[int]]:
+        batches = self.batches()
+        # advance on our own in case the dataloader wrapper never forwards set_epoch()
+        self.epoch += 1
+        yield from batches
+
+    def __len__(self) -> int:
+        # buckets are whole multiples of batch_size, so only the last one can leave a short batch
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return -(-len(self.lengths) // self.batch_size)
+
+
+def random_batches(n: int, *, batch_size: int, seed: int) -> list[list[int]]:
+    """
+    Length-agnostic seeded batches, used to estimate padding without bucketing.
+    """
+    g = torch.Generator()
+    g.manual_seed(seed)
+    order = torch.randperm(n, generator=g).tolist()
+    return [order[i : i + batch_size] for i in range(0, n, batch_size)]
+
+
+def batch_padding_fraction(lengths: Sequence[int], batches: Sequence[Sequence[int]]) -> float:
+    """
+    Fraction of pad slots when each batch is padded to its own longest example.
+    """
+    real = 0
+    slots = 0
+    for batch in batches:
+        lens = [lengths[i] for i in batch]
+        real += sum(lens)
+        slots += max(lens) * len(lens)
+    return 1.0 - real / slots if slots else 0.0
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import copy
+import os
+import random
+import re
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+from safetensors.torch import save_file
+
+# File names match what HF Trainer reads in `train(resume_from_checkpoint=...)`.
+CHECKPOINT_PREFIX = "checkpoint"
+MODEL_WEIGHTS_FILE = "model.safetensors"
+ADAPTER_WEIGHTS_FILE = "adapter_model.safetensors"
+OPTIMIZER_FILE = "optimizer.pt"
+SCHEDULER_FILE = "scheduler.pt"
+RNG_STATE_FILE = "rng_state.pth"
+TRAINER_STATE_FILE = "trainer_state.json"
+
+_CHECKPOINT_RE = re.compile(rf"^{CHECKPOINT_PREFIX}-(\d+)$")
+
+
+def _cpu_copy(obj: Any) -> Any:
+    """
+    Deep copy of a (nested) state dict with every tensor detached and copied to CPU.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: _cpu_copy(v) for k, v in obj.items()}
+    if isinstance(obj, list | tuple):
+        return type(obj)(_cpu_copy(v) for v in obj)
+    return copy.deepcopy(obj)
+
+
+def drop_shared(state_dict: dict[str, torch.Tensor]) -> dict[str, torch.Tensor]:
+    """
+    Keep the first key of tensors that share storage (tied embeddings).
+
+    safetensors refuses aliased tensors; HF re-ties the dropped ones on load.
+    """
+    seen: set[tuple[int, int]] = set()
+    out = {}
+    for k, v in state_dict.items():
+        key = (v.untyped_storage().data_ptr(), v.storage_offset())
+        if key in seen:
+            continue
+        seen.add(key)
+        out[k] = v
+    return out
+
+
+def snapshot_model_state(model: torch.nn.Module, *, adapter_only: bool) -> dict[str, torch.Tensor]:
+    """
+    CPU copy of the weights to checkpoint (only the adapter when `adapter_only`).
+    """
+    if adapter_only:
+        from peft import get_peft_model_state_dict
+
+        state = get_peft_model_state_dict(model)
+    else:
+        state = drop_shared(model.state_dict())
+    return {k: v.detach().to("cpu", copy=True).contiguous() for k, v in state.items()}
+
+
+def rng_state() -> dict[str, Any]:
+    """
+    RNG states in the layout HF Trainer restores on resume.
+    """
+    states = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "cpu": torch.random.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        states["cuda"] = torch.cuda.random.get_rng_state()
+    return states
+
+
+def checkpoint_step(path: Path) -> int | None:
+    m = _CHECKPOINT_RE.match(path.name)
+    return int(m.group(1)) if m else None
+
+
+def list_checkpoints(root: Path) -> list[Path]:
+    """
+    Completed checkpoint dirs under `root`, oldest step first.
+    """
+    if not root.is_dir():
+        return []
+    found = [p for p in root.iterdir() if p.is_dir() and checkpoint_step(p) is not None]
+    return sorted(found, key=checkpoint_step)
+
+
+class CheckpointManager:
+    """
+    Writes HF-compatible checkpoints on a background thread and prunes old ones.
+
+    `save()` snapshots weights (adapter-only for LoRA), optimizer, scheduler, RNG and trainer
+    state to CPU memory on the calling thread, then serializes them in the background. At most
+    one write is in flight, so host memory is bounded by one snapshot. Checkpoints are written
+    to a hidden temp dir and renamed into place, so a crash never leaves a partial
+    `checkpoint-N` behind.
+    """
+
+    def __init__(self, root: Path, *, keep_last: int = 2, adapter_only: bool = False) -> None:
+        self.root = root
+        self.keep_last = keep_last
+        self.adapter_only = adapter_only
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending: Future | None = None
+
+    def save(
+        self,
+        step: int,
+        *,
+        model: torch.nn.Module,
+        optimizer: torch.optim.Optimizer | None = None,
+        scheduler: Any | None = None,
+        state: Any | None = None,
+        rng_states: list[dict[str, Any]] | None = None,
+    ) -> Path:
+        """
+        `rng_states` holds one entry per rank in data-parallel runs (default: this process).
+        """
+        self.wait()
+
+        final = self.root / f"{CHECKPOINT_PREFIX}-{step}"
+        tmp = self.root / f".{final.name}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        tensors = snapshot_model_state(model, adapter_only=self.adapter_only)
+        rng_states = rng_states or [rng_state()]
+        if len(rng_states) == 1:
+            blobs: dict[str, Any] = {RNG_STATE_FILE: rng_states[0]}
+        else:
+            # per-rank names, as HF Trainer expects when resuming a distributed run
+            blobs = {f"rng_state_{i}.pth": s for i, s in enumerate(rng_states)}
+        if optimizer is not None:
+            blobs[OPTIMIZER_FILE] = _cpu_copy(optimizer.state_dict())
+        if scheduler is not None:
+            blobs[SCHEDULER_FILE] = copy.deepcopy(scheduler.state_dict())
+
+        # small metadata files are written synchronously
+        if self.adapter_only:
+            for cfg in model.peft_config.values():
+                cfg.save_pretrained(str(tmp))
+        elif hasattr(model, "config") and hasattr(model.config, "save_pretrained"):
+            model.config.save_pretrained(str(tmp))
+        if state is not None:
+            state.save_to_json(str(tmp / TRAINER_STATE_FILE))
+
+        self._pending = self._executor.submit(self._write, tmp, final, tensors, blobs)
+        return final
+
+    def _write(
+        self, tmp: Path, final: Path, tensors: dict[str, torch.Tensor], blobs: dict[str, Any]
+    ) -> None:
+        weights = ADAPTER_WEIGHTS_FILE if self.adapter_only else MODEL_WEIGHTS_FILE
+        save_file(tensors, str(tmp / weights), metadata={"format": "pt"})
+        for name, obj in blobs.items():
+            torch.save(obj, tmp / name)
+
+        if final.exists():
+            shutil.rmtree(final)
+        os.replace(tmp, final)
+        self._prune()
+
+    def _prune(self) -> None:
+        if self.keep_last <= 0:
+            return
+        for old in list_checkpoints(self.root)[: -self.keep_last]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def wait(self) -> None:
+        """
+        Block until the in-flight write (if any) is done; re-raises its error.
+        """
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+    def close(self) -> None:
+        self.wait()
+        self._executor.shutdown()
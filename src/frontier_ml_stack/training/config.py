@@ -10,6 +10,28 @@ class SFTConfig:
     train_records: str  # path to records.jsonl
     output_dir: str = "artifacts/runs"
 
+    # Mixture of builds (overrides train_records when set)
+    train_mixture: str = ""  # "path:weight[:epochs],..."; see training/mixture.py
+    mixture_shuffle_buffer: int = 1000
+
+    # Streaming (records are read + tokenized lazily by DataLoader workers; needs max_steps)
+    streaming: bool = False
+    streaming_shuffle_buffer: int = 1000
+    dataloader_num_workers: int = 0
+    dataloader_prefetch_factor: int = 2  # batches prefetched per worker (workers > 0 only)
+
+    # Pre-tokenized store from `data tokenize` (overrides records/mixture when set)
+    train_token_store: str = ""
+
+    # Sequence packing (concatenate docs + EOS into max_seq_length blocks)
+    packing: bool = False
+    packing_reset_boundaries: bool = False  # restart positions/attention at each document
+
+    # Unpacked batches: "max_length" pads every example, "dynamic" pads to the batch's longest
+    padding: str = "max_length"
+    group_by_length: bool = False  # seeded length-bucketed batches (needs padding="dynamic")
+    length_bucket_multiplier: int = 50  # bucket = batch_size * multiplier examples
+
     # LoRA
     use_lora: bool = False
     lora_r: int = 8
@@ -18,6 +40,7 @@ class SFTConfig:
     lora_target_modules: str = ""  # comma-separated override; empty => auto
     lora_bias: str = "none"  # "none" | "all" | "lora_only"
     save_merged: bool = True  # if LoRA enabled, save merged model too
+    lora_base_dtype: str = "fp32"  # frozen base weight storage: "fp32" | "bf16" | "int8"
 
     # Training knobs (CPU-friendly defaults)
     max_steps: int = 20
@@ -25,7 +48,71 @@ class SFTConfig:
     learning_rate: float = 5e-5
     max_seq_length: int = 256
     seed: int = 42
+    gradient_checkpointing: bool = False  # recompute activations in backward to save memory
+
+    # CPU performance knobs (compare them per machine with `training perf-bench`)
+    bf16_autocast: bool = False  # bf16 autocast in forward/backward; weights/optimizer stay fp32
+    torch_compile: bool = False  # torch.compile (inductor) the model; first steps compile
+    fused_optimizer: bool = True  # fused AdamW kernel where this torch build has one
+    intra_op_threads: int = 0  # 0 => torch default
+    inter_op_threads: int = 0  # 0 => torch default
+    # glibc: serve allocations >= 1 MiB with mmap for the rest of the process (lower RSS with a
+    # bf16/int8 LoRA base); it cannot be undone, so it is opt-in
+    pin_mmap_threshold: bool = False
+
+    # Distillation from a stored teacher pass (`training teacher-pass`; needs train_token_store)
+    distill_teacher_logits: str = ""  # teacher pass dir; empty => plain SFT
+    distill_alpha: float = 0.5  # loss = alpha * KD + (1 - alpha) * LM loss
+    distill_temperature: float = 1.0
 
     # Save/logging
     save_steps: int = 0  # 0 => don't save checkpoints in tiny runs
+    save_total_limit: int = 2  # keep the newest N checkpoints (0 => keep all)
+    resume: bool = False  # continue from the latest checkpoint in run_dir/checkpoints, if any
+    logging_steps: int = 1
+
+    # Per-step telemetry (run_dir/step_metrics.jsonl) and optional torch profiler window
+    telemetry: bool = True
+    profile_start_step: int = 0
+    profile_num_steps: int = 0  # 0 => no profiler trace
+
+
+@dataclass(frozen=True)
+class DPOConfig:
+    run_name: str
+    model_name: str  # policy (initialized from this model)
+    train_records: str  # path to a PreferenceRecord JSONL
+    output_dir: str = "artifacts/runs"
+
+    # Reference model log-probs are computed once and cached (memmap) under ref_cache_dir
+    ref_model_name: str = ""  # empty => model_name
+    ref_cache_dir: str = "artifacts/ref_logps"
+    ref_batch_size: int = 8  # pairs per reference forward pass
+
+    # DPO
+    beta: float = 0.1
+    max_seq_length: int = 256  # prompt + completion
+    max_prompt_length: int = 128  # prompts are left-truncated to this many tokens
+
+    # LoRA
+    use_lora: bool = False
+    lora_r: int = 8
+    lora_alpha: int = 16
+    lora_dropout: float = 0.0  # the base model's dropout is always off in DPO
+    lora_target_modules: str = ""  # comma-separated override; empty => auto
+    lora_bias: str = "none"  # "none" | "all" | "lora_only"
+    save_merged: bool = True  # if LoRA enabled, save merged model too
+
+    # Training knobs (CPU-friendly defaults)
+    max_steps: int = 20
+    per_device_train_batch_size: int = 1  # pairs per step
+    learning_rate: float = 5e-6
+    seed: int = 42
+    gradient_checkpointing: bool = False
+
+    # Save/logging
+    save_steps: int = 0
+    save_total_limit: int = 2
+    resume: bool = False
     logging_steps: int = 1
+    telemetry: bool = True
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
 from pathlib import Path
+from typing import Any
 
-from datasets import Dataset
+import numpy as np
+import torch
+from datasets import Dataset, IterableDataset
 
-from frontier_ml_stack.data.schema import TextRecord
+from frontier_ml_stack.data.schema import PreferenceRecord, TextRecord
+from frontier_ml_stack.data.token_store import TokenStore
 
 
 def load_records_as_dataset(records_path: Path) -> Dataset:
@@ -24,3 +29,114 @@ def load_records_as_dataset(records_path: Path) -> Dataset:
         raise ValueError(f"No records found in {records_path}")
 
     return Dataset.from_list(records)
+
+
+def _byte_ranges(path: Path, num_shards: int) -> list[tuple[int, int]]:
+    size = path.stat().st_size
+    num_shards = max(1, min(num_shards, size))
+    step = -(-size // num_shards)
+    return [(lo, min(lo + step, size)) for lo in range(0, size, step)]
+
+
+def _iter_records_in_ranges(path: str, ranges: list[tuple[int, int]]) -> Iterator[dict[str, str]]:
+    """
+    Yield records whose line starts inside one of the byte ranges [start, end).
+    """
+    with open(path, "rb") as f:
+        for start, end in ranges:
+            f.seek(start)
+            if start > 0:
+                # resync to the next line start unless we are already on one
+                f.seek(start - 1)
+                f.readline()
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                yield {"text": TextRecord.model_validate_json(line).text}
+
+
+def load_records_as_iterable_dataset(records_path: Path, *, num_shards: int = 1) -> IterableDataset:
+    """
+    Stream canonical records.jsonl as an IterableDataset with a single 'text' column.
+
+    The file is split into `num_shards` byte ranges so DataLoader workers can each read
+    (and tokenize) a disjoint part of it; nothing is materialized in memory.
+    """
+    if records_path.stat().st_size == 0:
+        raise ValueError(f"No records found in {records_path}")
+    return IterableDataset.from_generator(
+        _iter_records_in_ranges,
+        gen_kwargs={"path": str(records_path), "ranges": _byte_ranges(records_path, num_shards)},
+    )
+
+
+class TokenStoreDataset(torch.utils.data.Dataset):
+    """
+    Map-style dataset over a pre-tokenized TokenStore.
+
+    Rows match `tokenizer(..., truncation=True, padding="max_length")` output (or unpadded
+    rows when `pad_to_max_length=False`), but are sliced from the memmap on access instead
+    of being re-tokenized.
+    """
+
+    def __init__(
+        self,
+        store: TokenStore,
+        *,
+        max_seq_length: int,
+        pad_token_id: int,
+        pad_to_max_length: bool = True,
+    ) -> None:
+        self.store = store
+        self.max_seq_length = max_seq_length
+        self.pad_token_id = pad_token_id
+        self.pad_to_max_length = pad_to_max_length
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def lengths(self) -> list[int]:
+        return np.minimum(self.store.doc_lengths(), self.max_seq_length).tolist()
+
+    def __getitem__(self, i: int) -> dict[str, list[int]]:
+        ids = self.store[i][: self.max_seq_length].astype(np.int64).tolist()
+        n_pad = self.max_seq_length - len(ids) if self.pad_to_max_length else 0
+        return {
+            "input_ids": ids + [self.pad_token_id] * n_pad,
+            "attention_mask": [1] * len(ids) + [0] * n_pad,
+        }
+
+
+def load_token_store_dataset(
+    store_dir: Path, *, tokenizer: Any, max_seq_length: int, pad_to_max_length: bool = True
+) -> TokenStoreDataset:
+    store = TokenStore(store_dir)
+    store.check_tokenizer(tokenizer)
+    if len(store) == 0:
+        raise ValueError(f"No documents found in token store {store_dir}")
+    return TokenStoreDataset(
+        store,
+        max_seq_length=max_seq_length,
+        pad_token_id=tokenizer.pad_token_id,
+        pad_to_max_length=pad_to_max_length,
+    )
+
+
+def load_preference_records(records_path: Path) -> list[PreferenceRecord]:
+    """
+    Load a preference JSONL (one PreferenceRecord per line).
+    """
+    records: list[PreferenceRecord] = []
+    with records_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(PreferenceRecord.model_validate_json(line))
+
+    if not records:
+        raise ValueError(f"No preference records found in {records_path}")
+    return records
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+from typing import Any
+
+import torch
+import torch.distributed as dist
+
+
+def world_size() -> int:
+    return int(os.environ.get("WORLD_SIZE", "1"))
+
+
+def rank() -> int:
+    return int(os.environ.get("RANK", "0"))
+
+
+def is_main_process() -> bool:
+    """
+    True on global rank 0 (and in single-process runs); only it writes run artifacts.
+    """
+    return rank() == 0
+
+
+def _active() -> bool:
+    return dist.is_available() and dist.is_initialized() and dist.get_world_size() > 1
+
+
+def all_reduce_sum(value: int) -> int:
+    """
+    Sum an integer over all ranks (identity outside a process group).
+    """
+    if not _active():
+        return value
+    t = torch.tensor([value], dtype=torch.int64)
+    dist.all_reduce(t, op=dist.ReduceOp.SUM)
+    return int(t.item())
+
+
+def all_gather_objects(obj: Any) -> list[Any]:
+    """
+    Picklable object from every rank, ordered by rank (`[obj]` outside a process group).
+    """
+    if not _active():
+        return [obj]
+    out: list[Any] = [None] * dist.get_world_size()
+    dist.all_gather_object(out, obj)
+    return out
+
+
+def broadcast_object(obj: Any) -> Any:
+    """
+    Rank 0's picklable object on every rank (`obj` itself outside a process group).
+    """
+    if not _active():
+        return obj
+    out = [obj]
+    dist.broadcast_object_list(out, src=0)
+    return out[0]
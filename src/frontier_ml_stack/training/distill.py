@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+
+from frontier_ml_stack.data.hashing import sha256_text
+from frontier_ml_stack.data.token_store import TokenStore
+from frontier_ml_stack.training.data import TokenStoreDataset
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+from frontier_ml_stack.training.ref_logps import model_fingerprint
+from frontier_ml_stack.training.run_artifacts import write_json
+from frontier_ml_stack.utils.files import record_progress
+
+SCHEMA_VERSION = "teacher-topk-v1"
+LOGITS_FILE = "topk_logits.npy"  # (T, k) float16
+IDS_FILE = "topk_ids.npy"  # (T, k) int32
+OFFSETS_FILE = "offsets.npy"  # (docs + 1,) int64 into the rows above
+PROGRESS_FILE = "progress.json"
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass(frozen=True)
+class TeacherPassResult:
+    output_dir: Path
+    num_docs: int
+    num_tokens: int
+    top_k: int
+    bytes_per_token: int
+    reused: bool
+    seconds: float = 0.0
+    tokens_per_second: float = 0.0
+
+
+def teacher_offsets(store: TokenStore, max_seq_length: int) -> np.ndarray:
+    """
+    Row offsets of each document in the teacher arrays (documents cut at max_seq_length).
+    """
+    lengths = np.minimum(store.doc_lengths(), max_seq_length)
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+
+def teacher_key(store: TokenStore, teacher_model: str, *, top_k: int, max_seq_length: int) -> str:
+    return sha256_text(
+        json.dumps(
+            {
+                "store_fingerprint": store.manifest["params"]["fingerprint"],
+                "teacher": model_fingerprint(teacher_model),
+                "top_k": top_k,
+                "max_seq_length": max_seq_length,
+                "schema": SCHEMA_VERSION,
+            },
+            sort_keys=True,
+        )
+    )[:12]
+
+
+@torch.inference_mode()
+def write_teacher_topk(
+    model: torch.nn.Module,
+    store: TokenStore,
+    out_dir: Path,
+    *,
+    top_k: int,
+    max_seq_length: int,
+    batch_size: int = 8,
+    pad_token_id: int = 0,
+    meta: dict[str, Any] | None = None,
+) -> dict[str, float]:
+    """
+    Write the model's top-k logits (fp16) and ids (int32) for every token of `store`.
+
+    Row r holds the prediction for the token after position r, so rows line up with the
+    store's tokens (each document cut at `max_seq_length`). Progress is recorded after every
+    batch, so an interrupted pass resumes; the manifest (plus `meta`) is written last.
+    Returns the pass time and teacher tokens/s for the documents computed in this call.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    offsets = teacher_offsets(store, max_seq_length)
+    n_docs, n_tokens = len(store), int(offsets[-1])
+
+    progress_path = out_dir / PROGRESS_FILE
+    start = 0
+    if progress_path.is_file():
+        start = int(json.loads(progress_path.read_text(encoding="utf-8"))["done"])
+    mode = "r+" if start else "w+"
+    logits_out = np.lib.format.open_memmap(
+        out_dir / LOGITS_FILE, mode=mode, dtype=np.float16, shape=(n_tokens, top_k)
+    )
+    ids_out = np.lib.format.open_memmap(
+        out_dir / IDS_FILE, mode=mode, dtype=np.int32, shape=(n_tokens, top_k)
+    )
+    np.save(out_dir / OFFSETS_FILE, offsets)
+
+    was_training = model.training
+    model.eval()
+    # longest first: batches pad to similar lengths; stable, so resuming follows the same order
+    order = np.argsort(-np.diff(offsets), kind="stable")
+
+    t0 = time.perf_counter()
+    for lo in range(start, n_docs, batch_size):
+        docs = order[lo : lo + batch_size]
+        rows = [store[int(d)][:max_seq_length].astype(np.int64) for d in docs]
+        width = max(len(r) for r in rows)
+        # padded positions are masked and never stored, so any pad id works
+        input_ids = torch.full((len(rows), width), pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for i, r in enumerate(rows):
+            input_ids[i, : len(r)] = torch.from_numpy(r)
+            attention_mask[i, : len(r)] = 1
+
+        logits = model(input_ids=input_ids, attention_mask=attention_mask).logits
+        values, ids = logits.float().topk(top_k, dim=-1)
+        values, ids = values.half().numpy(), ids.int().numpy()
+        for i, d in enumerate(docs):
+            a, b = int(offsets[d]), int(offsets[d + 1])
+            logits_out[a:b] = values[i, : b - a]
+            ids_out[a:b] = ids[i, : b - a]
+
+        record_progress(progress_path, min(lo + batch_size, n_docs), logits_out, ids_out)
+    seconds = time.perf_counter() - t0
+    model.train(was_training)
+    del logits_out, ids_out
+
+    done_tokens = int(np.diff(offsets)[order[start:]].sum())
+    stats = {"seconds": seconds, "tokens_per_second": done_tokens / seconds if seconds else 0.0}
+    write_json(
+        out_dir / MANIFEST_FILE,
+        {
+            **(meta or {}),
+            "schema_version": SCHEMA_VERSION,
+            "store_fingerprint": store.manifest["params"].get("fingerprint"),
+            "top_k": top_k,
+            "max_seq_length": max_seq_length,
+            "counts": {"docs": n_docs, "tokens": n_tokens},
+            "bytes_per_token": bytes_per_token(top_k),
+            "pass": stats,
+        },
+    )
+    return stats
+
+
+def bytes_per_token(top_k: int) -> int:
+    return top_k * (np.dtype(np.float16).itemsize + np.dtype(np.int32).itemsize)
+
+
+def run_teacher_pass(
+    store_dir: Path,
+    teacher_model: str,
+    *,
+    top_k: int = 16,
+    max_seq_length: int = 256,
+    batch_size: int = 8,
+    out_root: Path | None = None,
+) -> TeacherPassResult:
+    """
+    Load the teacher and run (or resume, or reuse) its top-k pass over a token store.
+
+    The output dir (default `<store_dir>/teacher/<key>`) is keyed on the store, the teacher
+    and the settings.
+    """
+    from transformers import AutoTokenizer
+
+    from frontier_ml_stack.models.loading import load_causal_lm
+
+    store = TokenStore(store_dir)
+    tokenizer = AutoTokenizer.from_pretrained(teacher_model)
+    store.check_tokenizer(tokenizer)
+    if top_k < 1 or top_k > len(tokenizer):
+        raise ValueError(f"top_k must be in [1, vocab size] (got {top_k})")
+
+    key = teacher_key(store, teacher_model, top_k=top_k, max_seq_length=max_seq_length)
+    out_dir = (out_root or Path(store_dir) / "teacher") / key
+    result = {
+        "output_dir": out_dir,
+        "num_docs": len(store),
+        "num_tokens": int(teacher_offsets(store, max_seq_length)[-1]),
+        "top_k": top_k,
+        "bytes_per_token": bytes_per_token(top_k),
+    }
+    if (out_dir / MANIFEST_FILE).is_file():
+        done = json.loads((out_dir / MANIFEST_FILE).read_text(encoding="utf-8"))["pass"]
+        return TeacherPassResult(**result, reused=True, **done)
+
+    stats = write_teacher_topk(
+        load_causal_lm(teacher_model),
+        store,
+        out_dir,
+        top_k=top_k,
+        max_seq_length=max_seq_length,
+        batch_size=batch_size,
+        pad_token_id=tokenizer.pad_token_id or 0,
+        meta={"store_dir": str(Path(store_dir).resolve()), "teacher_model": teacher_model},
+    )
+    return TeacherPassResult(**result, reused=False, **stats)
+
+
+class TeacherLogits:
+    """
+    Read-only memmapped view of a teacher pass; `teacher[i]` -> (logits, ids) of document i.
+    """
+
+    def __init__(self, teacher_dir: Path) -> None:
+        self.teacher_dir = Path(teacher_dir)
+        manifest_path = self.teacher_dir / MANIFEST_FILE
+        if not manifest_path.is_file():
+            raise ValueError(f"{self.teacher_dir} is not a complete teacher pass")
+        self.manifest: dict[str, Any] = json.loads(manifest_path.read_text(encoding="utf-8"))
+        self.top_k = int(self.manifest["top_k"])
+        self.max_seq_length = int(self.manifest["max_seq_length"])
+        self.offsets = np.load(self.teacher_dir / OFFSETS_FILE, mmap_mode="r")
+        self.logits = np.load(self.teacher_dir / LOGITS_FILE, mmap_mode="r")
+        self.ids = np.load(self.teacher_dir / IDS_FILE, mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> tuple[np.ndarray, np.ndarray]:
+        a, b = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.logits[a:b], self.ids[a:b]
+
+    def check_store(self, store: TokenStore, max_seq_length: int) -> None:
+        """
+        Raise unless these rows were computed for `store` at the student's sequence length.
+        """
+        if self.manifest["store_fingerprint"] != store.manifest["params"].get("fingerprint"):
+            raise ValueError(f"teacher logits {self.teacher_dir} were built from another store")
+        if max_seq_length > self.max_seq_length:
+            raise ValueError(
+                f"teacher logits cover {self.max_seq_length} tokens per document; "
+                f"max_seq_length={max_seq_length} needs a new teacher pass"
+            )
+
+
+class DistillTokenStoreDataset(torch.utils.data.Dataset):
+    """
+    Token store rows plus the teacher's top-k logits/ids for each position, both memmapped.
+    """
+
+    def __init__(self, base: TokenStoreDataset, teacher: TeacherLogits) -> None:
+        teacher.check_store(base.store, base.max_seq_length)
+        self.base = base
+        self.teacher = teacher
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def lengths(self) -> list[int]:
+        return self.base.lengths()
+
+    def __getitem__(self, i: int) -> dict[str, Any]:
+        row = self.base[i]
+        logits, ids = self.teacher[i]
+        n = min(len(logits), self.base.max_seq_length)
+        return {**row, "teacher_logits": logits[:n], "teacher_ids": ids[:n]}
+
+
+def collate_distill(features: Sequence[dict[str, Any]], *, pad_token_id: int) -> dict[str, Any]:
+    """
+    Right-pad token rows and teacher rows to the longest sequence in the batch.
+
+    Labels are the input ids at real (attention_mask == 1) positions and -100 elsewhere.
+    Teacher logits stay fp16 in the batch; the loss upcasts them.
+    """
+    width = max(len(f["input_ids"]) for f in features)
+    k = features[0]["teacher_ids"].shape[1]
+    input_ids = torch.full((len(features), width), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(features), width), dtype=torch.long)
+    teacher_logits = torch.zeros((len(features), width, k), dtype=torch.float16)
+    teacher_ids = torch.zeros((len(features), width, k), dtype=torch.long)
+    for i, f in enumerate(features):
+        n = len(f["input_ids"])
+        input_ids[i, :n] = torch.as_tensor(f["input_ids"])
+        attention_mask[i, :n] = torch.as_tensor(f["attention_mask"])
+        t = len(f["teacher_ids"])
+        teacher_logits[i, :t] = torch.from_numpy(np.array(f["teacher_logits"]))
+        teacher_ids[i, :t] = torch.from_numpy(np.array(f["teacher_ids"], dtype=np.int64))
+    labels = input_ids.masked_fill(attention_mask == 0, IGNORE_INDEX)
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        "labels": labels,
+        "teacher_logits": teacher_logits,
+        "teacher_ids": teacher_ids,
+    }
+
+
+def topk_kd_loss(
+    student_logits: torch.Tensor,
+    teacher_logits: torch.Tensor,
+    teacher_ids: torch.Tensor,
+    labels: torch.Tensor,
+    *,
+    temperature: float = 1.0,
+) -> torch.Tensor:
+    """
+    KL(teacher || student) per predicted token, with the teacher renormalized over its top-k.
+
+    Position t carries the teacher's prediction for token t+1, so positions whose next label
+    is -100 are ignored. Scaled by T^2 so gradients keep their magnitude across temperatures.
+    """
+    s = student_logits[:, :-1].float() / temperature
+    t = teacher_logits[:, :-1].float() / temperature
+    ids = teacher_ids[:, :-1]
+    mask = (labels[:, 1:] != IGNORE_INDEX).float()
+
+    teacher_logp = t.log_softmax(-1)
+    # student log-probs at the teacher's top-k ids only (no (B, L, V) log_softmax copy)
+    student_logp = s.gather(-1, ids) - torch.logsumexp(s, dim=-1, keepdim=True)
+    kl = (teacher_logp.exp() * (teacher_logp - student_logp)).sum(-1)
+    return (kl * mask).sum() / mask.sum().clamp(min=1) * temperature**2
+
+
+def storage_bytes(teacher_dir: Path) -> int:
+    return sum(p.stat().st_size for p in Path(teacher_dir).iterdir() if p.suffix == ".npy")
+
+
+def benchmark_distillation(
+    store_dir: Path,
+    teacher_model: str,
+    student_model: str,
+    *,
+    top_ks: Sequence[int] = (4, 16, 64),
+    max_seq_length: int = 128,
+    batch_size: int = 4,
+    steps: int = 10,
+    out_dir: Path = Path("artifacts/runs/distill_bench"),
+) -> dict[str, Any]:
+    """
+    Storage cost and throughput of offline top-k distillation, per k.
+
+    For each k: run (or reuse) the teacher pass, then train the student for `steps` steps on
+    it. A plain SFT run on the same store is the baseline. Online distillation would run the
+    teacher forward on every batch; its throughput is estimated from the measured student and
+    teacher rates (1 / (1/student + 1/teacher) tokens/s).
+    """
+    from frontier_ml_stack.training.config import SFTConfig
+    from frontier_ml_stack.training.sft import run_sft
+
+    def student_tps(name: str, teacher_dir: str = "") -> float:
+        cfg = SFTConfig(
+            run_name=name,
+            model_name=student_model,
+            train_records="",
+            train_token_store=str(store_dir),
+            output_dir=str(out_dir),
+            padding="dynamic",
+            max_seq_length=max_seq_length,
+            per_device_train_batch_size=batch_size,
+            max_steps=steps,
+            distill_teacher_logits=teacher_dir,
+        )
+        metrics = json.loads((run_sft(cfg) / "metrics.json").read_text(encoding="utf-8"))
+        return float(metrics["step_telemetry"]["tokens_per_second"])
+
+    vocab_size = int(TokenStore(store_dir).manifest["params"]["vocab_size"])
+    report: dict[str, Any] = {
+        "store_dir": str(store_dir),
+        "teacher_model": teacher_model,
+        "student_model": student_model,
+        "max_seq_length": max_seq_length,
+        "batch_size": batch_size,
+        "steps": steps,
+        "vocab_size": vocab_size,
+        # storing full fp16 distributions instead, for scale
+        "full_logits_bytes_per_token": vocab_size * np.dtype(np.float16).itemsize,
+        "sft_tokens_per_second": student_tps("sft"),
+        "top_k": [],
+    }
+    for k in top_ks:
+        teacher = run_teacher_pass(store_dir, teacher_model, top_k=k, max_seq_length=max_seq_length)
+        student = student_tps(f"kd-k{k}", str(teacher.output_dir))
+        online = 1.0 / (1.0 / student + 1.0 / teacher.tokens_per_second)
+        report["top_k"].append(
+            {
+                "k": k,
+                "bytes_per_token": teacher.bytes_per_token,
+                "storage_mb": storage_bytes(teacher.output_dir) / 2**20,
+                "tokens": teacher.num_tokens,
+                "teacher_pass_tokens_per_second": teacher.tokens_per_second,
+                "student_tokens_per_second": student,
+                "online_teacher_tokens_per_second_est": online,
+            }
+        )
+    out_dir.mkdir(parents=True, exist_ok=True)
+    write_json(out_dir / "distill_bench.json", report)
+    return report
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import gc
+from functools import partial
+from pathlib import Path
+
+import torch
+from transformers import TrainingArguments
+
+from frontier_ml_stack.data.hashing import sha256_file
+from frontier_ml_stack.data.token_store import tokenizer_fingerprint
+from frontier_ml_stack.models.loading import load_causal_lm, load_tokenizer
+from frontier_ml_stack.training.checkpoint import CheckpointManager
+from frontier_ml_stack.training.config import DPOConfig
+from frontier_ml_stack.training.data import load_preference_records
+from frontier_ml_stack.training.lora import (
+    apply_lora,
+    guess_target_modules,
+    parse_target_modules,
+    trainable_params_summary,
+)
+from frontier_ml_stack.training.preference import (
+    PreferenceDataset,
+    collate_pairs,
+    disable_dropout,
+    tokenize_preference_pair,
+)
+from frontier_ml_stack.training.ref_logps import ReferenceLogpCache, model_fingerprint
+from frontier_ml_stack.training.run_artifacts import prepare_run_dir, write_config, write_json
+from frontier_ml_stack.training.sft import (
+    _RESUME_MUTABLE,
+    _find_resume_checkpoint,
+    save_final_model,
+)
+from frontier_ml_stack.training.telemetry import StepTelemetryCallback
+from frontier_ml_stack.training.trainer import DPOTrainer
+from frontier_ml_stack.utils.memory import peak_rss_mb
+
+# The reference pass settings don't change what is trained (the cache is keyed separately).
+_DPO_RESUME_MUTABLE = _RESUME_MUTABLE | {"ref_cache_dir", "ref_batch_size"}
+
+
+def reference_cache_params(cfg: DPOConfig, tokenizer) -> dict:
+    """
+    Everything the cached reference log-probs depend on (and nothing else).
+    """
+    return {
+        "dataset_sha256": sha256_file(Path(cfg.train_records)),
+        "ref_model": model_fingerprint(cfg.ref_model_name or cfg.model_name),
+        "tokenizer_fingerprint": tokenizer_fingerprint(tokenizer),
+        "max_seq_length": cfg.max_seq_length,
+        "max_prompt_length": cfg.max_prompt_length,
+    }
+
+
+def run_dpo(cfg: DPOConfig) -> Path:
+    """
+    DPO training. Reference log-probs are computed once per (dataset, reference model) into a
+    memmapped cache, so every training step only runs the policy.
+    """
+    run_dir = prepare_run_dir(Path(cfg.output_dir), cfg.run_name)
+    resume_from = None
+    if cfg.resume:
+        resume_from = _find_resume_checkpoint(run_dir, cfg, mutable=_DPO_RESUME_MUTABLE)
+    write_config(run_dir / "config.json", cfg)
+
+    tokenizer = load_tokenizer(cfg.model_name)
+    ref_name = cfg.ref_model_name or cfg.model_name
+    if ref_name != cfg.model_name:
+        ref_tokenizer = load_tokenizer(ref_name)
+        if tokenizer_fingerprint(ref_tokenizer) != tokenizer_fingerprint(tokenizer):
+            raise ValueError(f"reference model {ref_name!r} uses a different tokenizer")
+
+    records = load_preference_records(Path(cfg.train_records))
+    pairs = [
+        tokenize_preference_pair(
+            r,
+            tokenizer,
+            max_seq_length=cfg.max_seq_length,
+            max_prompt_length=cfg.max_prompt_length,
+        )
+        for r in records
+    ]
+
+    cache = ReferenceLogpCache(
+        Path(cfg.ref_cache_dir), reference_cache_params(cfg, tokenizer), len(pairs)
+    )
+    model = load_causal_lm(cfg.model_name)
+    ref_stats = {"cache_dir": str(cache.cache_dir), "pairs": len(pairs), "reused": len(pairs)}
+    if not cache.complete:
+        # the policy starts as the reference: score with it before any update
+        ref = model
+        if ref_name != cfg.model_name:
+            ref = load_causal_lm(ref_name)
+        ref_stats = cache.fill(
+            ref, pairs, batch_size=cfg.ref_batch_size, pad_token_id=tokenizer.pad_token_id
+        )
+        del ref
+        gc.collect()
+
+    # before LoRA, so only an explicit lora_dropout adds noise to the policy
+    dropout_modules = disable_dropout(model)
+    lora_info = {"use_lora": cfg.use_lora}
+    if cfg.use_lora:
+        override = parse_target_modules(cfg.lora_target_modules)
+        targets = override or guess_target_modules(model)
+        model = apply_lora(
+            model,
+            r=cfg.lora_r,
+            alpha=cfg.lora_alpha,
+            dropout=cfg.lora_dropout,
+            target_modules=targets,
+            bias=cfg.lora_bias,
+        )
+        lora_info["target_modules"] = targets
+        lora_info["trainable_summary"] = trainable_params_summary(model)
+    model.train()
+
+    args = TrainingArguments(
+        output_dir=str(run_dir / "checkpoints"),
+        max_steps=cfg.max_steps,
+        per_device_train_batch_size=cfg.per_device_train_batch_size,
+        learning_rate=cfg.learning_rate,
+        logging_steps=cfg.logging_steps,
+        save_strategy="steps" if cfg.save_steps > 0 else "no",
+        save_steps=cfg.save_steps,
+        # batches carry ref_logps and paired labels, which the model's forward does not take
+        remove_unused_columns=False,
+        report_to=[],
+        seed=cfg.seed,
+        gradient_checkpointing=cfg.gradient_checkpointing,
+        gradient_checkpointing_kwargs={"use_reentrant": False}
+        if cfg.gradient_checkpointing
+        else None,
+    )
+    telemetry = StepTelemetryCallback(run_dir / "step_metrics.jsonl") if cfg.telemetry else None
+    trainer = DPOTrainer(
+        model=model,
+        args=args,
+        train_dataset=PreferenceDataset(pairs, cache.load()),
+        data_collator=partial(collate_pairs, pad_token_id=tokenizer.pad_token_id),
+        beta=cfg.beta,
+        telemetry=telemetry,
+        checkpoint_manager=CheckpointManager(
+            run_dir / "checkpoints", keep_last=cfg.save_total_limit, adapter_only=cfg.use_lora
+        ),
+    )
+    train_result = trainer.train(resume_from_checkpoint=str(resume_from) if resume_from else None)
+
+    metrics = train_result.metrics
+    metrics["model_name"] = cfg.model_name
+    metrics["ref_model_name"] = ref_name
+    metrics["torch_version"] = torch.__version__
+    metrics["beta"] = cfg.beta
+    metrics["pairs"] = len(pairs)
+    metrics["resumed_from"] = str(resume_from) if resume_from else None
+    metrics["reference_pass"] = ref_stats
+    metrics["disabled_dropout_modules"] = dropout_modules
+    logged = [h for h in trainer.state.log_history if "rewards/accuracy" in h]
+    if logged:
+        metrics["final_rewards"] = {k: v for k, v in logged[-1].items() if k.startswith("rewards/")}
+    if telemetry is not None:
+        metrics["step_telemetry"] = telemetry.summary()
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    write_json(run_dir / "metrics.json", metrics)
+    write_json(run_dir / "lora.json", lora_info)
+
+    save_final_model(
+        trainer, tokenizer, run_dir, use_lora=cfg.use_lora, save_merged=cfg.save_merged
+    )
+    return run_dir
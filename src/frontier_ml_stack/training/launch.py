@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Any
+
+import torch
+import torch.multiprocessing as mp
+
+from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.run_artifacts import write_json
+from frontier_ml_stack.training.sft import run_sft
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        return os.cpu_count() or 1
+
+
+def threads_per_process(nproc: int, cores: int | None = None) -> int:
+    """
+    Split the cores evenly over local ranks so intra-op pools don't oversubscribe.
+    """
+    return max(1, (cores or available_cores()) // nproc)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _worker(
+    local_rank: int,
+    cfg: SFTConfig,
+    nproc: int,
+    nnodes: int,
+    node_rank: int,
+    master_addr: str,
+    master_port: int,
+    threads: int,
+) -> None:
+    os.environ.update(
+        {
+            "RANK": str(node_rank * nproc + local_rank),
+            "LOCAL_RANK": str(local_rank),
+            "WORLD_SIZE": str(nnodes * nproc),
+            "LOCAL_WORLD_SIZE": str(nproc),
+            "MASTER_ADDR": master_addr,
+            "MASTER_PORT": str(master_port),
+        }
+    )
+    torch.set_num_threads(threads)
+    run_sft(cfg)
+
+
+def launch_sft(
+    cfg: SFTConfig,
+    *,
+    nproc: int,
+    nnodes: int = 1,
+    node_rank: int = 0,
+    master_addr: str = "127.0.0.1",
+    master_port: int = 0,
+    threads: int = 0,
+) -> Path:
+    """
+    Run `run_sft` as `nproc` data-parallel ranks on this host (gloo backend).
+
+    Multi-host: start the same command on every host with its own `node_rank` and the same
+    `master_addr`/`master_port` (reachable from all hosts). Global rank 0 writes artifacts.
+    """
+    if nproc < 1 or nnodes < 1 or not 0 <= node_rank < nnodes:
+        raise ValueError(f"invalid layout nproc={nproc} nnodes={nnodes} node_rank={node_rank}")
+    if nnodes > 1 and not master_port:
+        raise ValueError("multi-host runs need an explicit master_port")
+
+    threads = threads or threads_per_process(nproc)
+    master_port = master_port or _free_port()
+    # inherited by the spawned ranks before torch sets up its OpenMP pool; only set while
+    # spawning, so later work in this process keeps its own setting
+    previous = os.environ.get("OMP_NUM_THREADS")
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        mp.start_processes(
+            _worker,
+            args=(cfg, nproc, nnodes, node_rank, master_addr, master_port, threads),
+            nprocs=nproc,
+            start_method="spawn",
+            join=True,
+        )
+    finally:
+        if previous is None:
+            del os.environ["OMP_NUM_THREADS"]
+        else:
+            os.environ["OMP_NUM_THREADS"] = previous
+    return Path(cfg.output_dir) / cfg.run_name
+
+
+def scaling_report(baseline: dict[str, Any], run: dict[str, Any]) -> dict[str, Any]:
+    """
+    Throughput speedup and efficiency of a data-parallel run vs a single-process baseline.
+    """
+    world = int(run.get("world_size", 1))
+    base = float(baseline["train_samples_per_second"])
+    dist = float(run["train_samples_per_second"])
+    speedup = dist / base if base else 0.0
+    return {
+        "world_size": world,
+        "baseline_samples_per_second": base,
+        "samples_per_second": dist,
+        "speedup": speedup,
+        "efficiency": speedup / world,
+    }
+
+
+def write_scaling_report(run_dir: Path, baseline_run_dir: Path) -> dict[str, Any]:
+    """
+    Compare run_dir against a single-process baseline run and store the result in scaling.json.
+    """
+
+    def load(d: Path) -> dict[str, Any]:
+        return json.loads((d / "metrics.json").read_text(encoding="utf-8"))
+
+    report = scaling_report(load(baseline_run_dir), load(run_dir))
+    report["baseline_run"] = str(baseline_run_dir)
+    write_json(run_dir / "scaling.json", report)
+    return report
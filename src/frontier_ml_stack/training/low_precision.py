@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import sys
+
+import torch
+import torch.nn.functional as F
+from torch import nn
+from transformers.pytorch_utils import Conv1D
+
+BASE_DTYPES = ("fp32", "bf16", "int8")
+
+_M_MMAP_THRESHOLD = -3  # glibc mallopt parameter
+
+
+def _dequantize(weight: torch.Tensor, scale: torch.Tensor | None) -> torch.Tensor:
+    w = weight.float()
+    return w * scale[:, None] if scale is not None else w
+
+
+class _FrozenLinearFn(torch.autograd.Function):
+    """
+    y = x @ W^T with W dequantized on the fly in both passes.
+
+    Only the compact weight is kept for backward (not the fp32 copy), and no weight gradient
+    is ever computed.
+    """
+
+    @staticmethod
+    def forward(ctx, x, weight, scale):
+        ctx.save_for_backward(weight, scale)
+        return F.linear(x, _dequantize(weight, scale).to(x.dtype))
+
+    @staticmethod
+    def backward(ctx, grad_out):
+        weight, scale = ctx.saved_tensors
+        return grad_out @ _dequantize(weight, scale).to(grad_out.dtype), None, None
+
+
+class LowPrecisionLinear(nn.Linear):
+    """
+    Frozen nn.Linear whose weight is stored in bf16 or int8 (per-output-channel scale).
+
+    Compute stays in the input dtype (fp32), so only the storage precision of the frozen base
+    changes. PEFT wraps it like any nn.Linear; LoRA adapters on top stay fp32.
+    """
+
+    def __init__(
+        self,
+        weight: torch.Tensor,
+        bias: torch.Tensor | None,
+        *,
+        base_dtype: str,
+        from_conv1d: bool = False,
+    ) -> None:
+        out_features, in_features = weight.shape
+        super().__init__(in_features, out_features, bias=False, device="meta")
+        self.base_dtype = base_dtype
+        self.from_conv1d = from_conv1d
+
+        w = weight.detach().float()
+        if base_dtype == "int8":
+            scale = w.abs().amax(dim=1).clamp(min=1e-8) / 127.0
+            q = torch.round(w / scale[:, None]).clamp(-127, 127).to(torch.int8)
+            self.weight = nn.Parameter(q, requires_grad=False)
+            self.register_buffer("weight_scale", scale)
+        elif base_dtype == "bf16":
+            self.weight = nn.Parameter(w.to(torch.bfloat16), requires_grad=False)
+            self.register_buffer("weight_scale", None)
+        else:
+            raise ValueError(f"unsupported low-precision dtype {base_dtype!r}")
+
+        # bias stays fp32: tiny, and trainable with lora_bias="all"
+        if bias is not None:
+            self.bias = nn.Parameter(bias.detach().float(), requires_grad=False)
+
+    @classmethod
+    def from_module(cls, module: nn.Module, base_dtype: str) -> LowPrecisionLinear:
+        if isinstance(module, Conv1D):
+            # Conv1D stores (in, out) and computes x @ W + b
+            return cls(module.weight.t(), module.bias, base_dtype=base_dtype, from_conv1d=True)
+        return cls(module.weight, module.bias, base_dtype=base_dtype)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        y = _FrozenLinearFn.apply(x, self.weight, self.weight_scale)
+        return y + self.bias if self.bias is not None else y
+
+    def dequantized(self) -> nn.Linear:
+        """
+        Plain fp32 nn.Linear with the same (dequantized) weights.
+        """
+        linear = nn.Linear(self.in_features, self.out_features, bias=self.bias is not None)
+        with torch.no_grad():
+            linear.weight.copy_(_dequantize(self.weight, self.weight_scale))
+            if self.bias is not None:
+                linear.bias.copy_(self.bias)
+        linear.from_conv1d = self.from_conv1d
+        return linear
+
+
+def _replace_children(model: nn.Module, fn) -> int:
+    n = 0
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            new = fn(name, child)
+            if new is not None:
+                setattr(parent, name, new)
+                n += 1
+    return n
+
+
+def quantize_frozen_linears(
+    model: nn.Module, base_dtype: str, *, skip: tuple[str, ...] = ("lm_head",)
+) -> int:
+    """
+    Swap Linear/Conv1D layers for LowPrecisionLinear and keep every other param in fp32.
+
+    Must run before LoRA is applied. `lm_head` is skipped (often tied to the embeddings).
+    Returns the number of replaced layers.
+    """
+    if base_dtype not in BASE_DTYPES:
+        raise ValueError(f"base dtype must be one of {BASE_DTYPES} (got {base_dtype!r})")
+    if base_dtype == "fp32":
+        return 0
+
+    def swap(name: str, child: nn.Module):
+        if name in skip or isinstance(child, LowPrecisionLinear):
+            return None
+        if isinstance(child, nn.Linear | Conv1D):
+            return LowPrecisionLinear.from_module(child, base_dtype)
+        return None
+
+    n = _replace_children(model, swap)
+    # remaining float params (embeddings, norms) back to fp32; LowPrecisionLinear keeps its own
+    for module in model.modules():
+        if isinstance(module, LowPrecisionLinear):
+            continue
+        for p in module.parameters(recurse=False):
+            if p.is_floating_point():
+                p.data = p.data.float()
+    return n
+
+
+def dequantize_linears(model: nn.Module) -> int:
+    """
+    Replace LowPrecisionLinear layers with fp32 nn.Linear (e.g. before merging LoRA).
+    """
+    return _replace_children(
+        model, lambda _, c: c.dequantized() if isinstance(c, LowPrecisionLinear) else None
+    )
+
+
+def restore_conv1d(model: nn.Module) -> int:
+    """
+    Turn dequantized layers that started out as Conv1D (GPT-2) back into Conv1D.
+    """
+
+    def swap(_: str, child: nn.Module):
+        if not (isinstance(child, nn.Linear) and getattr(child, "from_conv1d", False)):
+            return None
+        conv = Conv1D(child.out_features, child.in_features)
+        with torch.no_grad():
+            conv.weight.copy_(child.weight.t())
+            if child.bias is not None:
+                conv.bias.copy_(child.bias)
+            else:
+                conv.bias.zero_()
+        return conv
+
+    return _replace_children(model, swap)
+
+
+def pin_malloc_mmap_threshold(nbytes: int = 1 << 20) -> bool:
+    """
+    Serve allocations >= nbytes with mmap and return them to the OS on free (glibc only).
+
+    Every LowPrecisionLinear allocates and frees a fp32 weight copy per forward/backward.
+    glibc's adaptive threshold would move those into the heap, where they fragment and
+    RSS grows past the fp32 baseline. Also hands heap freed so far (load-time conversion
+    buffers) back to the OS. Returns False where unsupported.
+
+    This is process-wide and glibc has no call to read the old threshold back, so it cannot
+    be undone; `run_sft` only calls it when `pin_mmap_threshold` is set.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        pinned = bool(libc.mallopt(_M_MMAP_THRESHOLD, nbytes))
+        libc.malloc_trim(0)
+    except (OSError, AttributeError):
+        return False
+    return pinned
+
+
+def param_bytes(model: nn.Module, *, trainable: bool) -> int:
+    return sum(
+        p.numel() * p.element_size() for p in model.parameters() if p.requires_grad == trainable
+    )
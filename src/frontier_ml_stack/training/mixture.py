@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+
+from datasets import IterableDataset
+
+from frontier_ml_stack.data.schema import TextRecord
+
+
+@dataclass(frozen=True)
+class MixtureSource:
+    path: str  # build dir (containing records.jsonl) or a records.jsonl file
+    weight: float
+    epochs: int | None = 1  # None => cycle indefinitely (upsampling)
+
+
+def _is_number(s: str) -> bool:
+    try:
+        float(s)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_mixture_spec(spec: str) -> list[MixtureSource]:
+    """
+    Parse a comma-separated mixture spec: "path:weight[:epochs],...".
+
+    `epochs` defaults to 1; use "inf" to cycle a source indefinitely. Fields are split off
+    from the right, so the path itself may contain ":".
+    """
+    sources: list[MixtureSource] = []
+    for item in (x.strip() for x in spec.split(",")):
+        if not item:
+            continue
+        parts = item.rsplit(":", 2)
+        if len(parts) == 3 and _is_number(parts[1]):
+            path, weight_s, epochs_s = parts
+        else:
+            parts = item.rsplit(":", 1)
+            if len(parts) != 2 or not parts[0]:
+                raise ValueError(f"Invalid mixture entry {item!r}; expected path:weight[:epochs]")
+            (path, weight_s), epochs_s = parts, None
+
+        if not _is_number(weight_s):
+            raise ValueError(f"Invalid mixture weight {weight_s!r} in {item!r}")
+        weight = float(weight_s)
+        if weight <= 0:
+            raise ValueError(f"Mixture weight must be > 0 (got {weight} for {path})")
+
+        epochs: int | None = 1
+        if epochs_s is not None:
+            if epochs_s != "inf" and not epochs_s.isdigit():
+                raise ValueError(f"Mixture epochs must be >= 1 or 'inf' (got {epochs_s})")
+            epochs = None if epochs_s == "inf" else int(epochs_s)
+            if epochs is not None and epochs < 1:
+                raise ValueError(f"Mixture epochs must be >= 1 or 'inf' (got {epochs_s})")
+
+        sources.append(MixtureSource(path=path, weight=weight, epochs=epochs))
+
+    if not sources:
+        raise ValueError("Mixture spec contains no sources")
+    return sources
+
+
+def resolve_records_path(path: str | Path) -> Path:
+    p = Path(path)
+    if p.is_dir():
+        p = p / "records.jsonl"
+    if not p.exists():
+        raise FileNotFoundError(p)
+    return p
+
+
+def _iter_texts(records_path: Path) -> Iterator[str]:
+    with records_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield TextRecord.model_validate_json(line).text
+
+
+def _interleave(sources: list[MixtureSource], rng: random.Random) -> Iterator[str]:
+    """
+    Weighted interleaving of per-source streams.
+
+    A source is dropped once it has completed its epoch budget. The stream ends when every
+    finite source is exhausted; if all sources cycle indefinitely it never ends.
+    """
+    paths = [resolve_records_path(s.path) for s in sources]
+    iters = [_iter_texts(p) for p in paths]
+    epochs_done = [0] * len(sources)
+    seen = [False] * len(sources)
+    active = list(range(len(sources)))
+    has_finite = any(s.epochs is not None for s in sources)
+
+    while active:
+        if has_finite and all(sources[i].epochs is None for i in active):
+            return
+
+        i = rng.choices(active, weights=[sources[j].weight for j in active])[0]
+        try:
+            text = next(iters[i])
+        except StopIteration:
+            text = None
+        if text is not None:
+            seen[i] = True
+            yield text
+            continue
+
+        if not seen[i]:
+            raise ValueError(f"No records found in {paths[i]}")
+        epochs_done[i] += 1
+        if sources[i].epochs is None or epochs_done[i] < sources[i].epochs:
+            iters[i] = _iter_texts(paths[i])
+        else:
+            active.remove(i)
+
+
+def iter_mixture(
+    sources: list[MixtureSource], *, seed: int, shuffle_buffer: int
+) -> Iterator[dict[str, str]]:
+    """
+    Deterministic, seeded stream of {"text": ...} rows drawn from several builds.
+
+    Memory is bounded by `shuffle_buffer` rows regardless of source sizes.
+    """
+    mix_rng = random.Random(seed)
+    buf_rng = random.Random(seed + 1)
+
+    buffer: list[str] = []
+    for text in _interleave(sources, mix_rng):
+        if len(buffer) < max(1, shuffle_buffer):
+            buffer.append(text)
+            continue
+        j = buf_rng.randrange(len(buffer))
+        yield {"text": buffer[j]}
+        buffer[j] = text
+
+    buf_rng.shuffle(buffer)
+    for text in buffer:
+        yield {"text": text}
+
+
+def load_mixture_as_dataset(
+    sources: list[MixtureSource], *, seed: int, shuffle_buffer: int
+) -> IterableDataset:
+    """
+    Wrap `iter_mixture` as a Hugging Face IterableDataset with a single 'text' column.
+    """
+    gen = partial(iter_mixture, list(sources), seed=seed, shuffle_buffer=shuffle_buffer)
+    return IterableDataset.from_generator(gen)
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Sequence
+
+import numpy as np
+import torch
+
+from frontier_ml_stack.data.token_store import TokenStore
+
+IGNORE_INDEX = -100
+
+
+def _block_features(
+    ids: list[int],
+    positions: list[int],
+    *,
+    block_size: int,
+    pad_token_id: int,
+    reset_boundaries: bool,
+) -> dict[str, list[int]]:
+    """
+    Turn one (possibly short) packed block into model inputs.
+
+    `positions` restart at 0 at every document (or document piece) inside the block. With
+    `reset_boundaries`, they are emitted as `position_ids` and no attention mask is returned:
+    transformers then builds a block-diagonal causal mask from them, so documents don't
+    attend to each other, but only for a model without a KV cache (see
+    `isolate_packed_documents`). Otherwise a plain attention mask is emitted.
+    """
+    n_real = len(ids)
+    n_pad = block_size - n_real
+
+    labels = list(ids)
+    if reset_boundaries:
+        # the first token of each document must not be predicted from the previous one
+        labels = [IGNORE_INDEX if p == 0 else t for t, p in zip(ids, positions, strict=True)]
+
+    out = {
+        "input_ids": ids + [pad_token_id] * n_pad,
+        "labels": labels + [IGNORE_INDEX] * n_pad,
+    }
+    if reset_boundaries:
+        out["position_ids"] = positions + list(range(n_pad))
+    else:
+        out["attention_mask"] = [1] * n_real + [0] * n_pad
+    return out
+
+
+def isolate_packed_documents(model: torch.nn.Module) -> bool:
+    """
+    Make `position_ids` resets keep packed documents apart in `model`'s forward; returns the
+    previous `use_cache` so it can be restored before saving.
+
+    transformers only derives the per-document mask when no `past_key_values` is passed, and
+    models with `use_cache=True` (GPT-2's default) create a cache in every forward, which
+    silently turns the mask back into a plain causal one across the whole block.
+    """
+    previous = model.config.use_cache
+    model.config.use_cache = False
+    return previous
+
+
+def pack_documents(
+    docs: Iterable[Sequence[int]],
+    *,
+    block_size: int,
+    eos_token_id: int,
+    pad_token_id: int,
+    reset_boundaries: bool = False,
+) -> Iterator[dict[str, list[int]]]:
+    """
+    Concatenate documents (each followed by EOS) into fixed-length blocks.
+
+    Documents longer than a block continue in the next one; only the final block is padded.
+    """
+    ids: list[int] = []
+    positions: list[int] = []
+    for doc in docs:
+        doc = [*doc, eos_token_id]
+        start = 0
+        while start < len(doc):
+            take = min(block_size - len(ids), len(doc) - start)
+            ids.extend(doc[start : start + take])
+            positions.extend(range(take))
+            start += take
+            if len(ids) == block_size:
+                yield _block_features(
+                    ids,
+                    positions,
+                    block_size=block_size,
+                    pad_token_id=pad_token_id,
+                    reset_boundaries=reset_boundaries,
+                )
+                ids, positions = [], []
+
+    if ids:
+        yield _block_features(
+            ids,
+            positions,
+            block_size=block_size,
+            pad_token_id=pad_token_id,
+            reset_boundaries=reset_boundaries,
+        )
+
+
+def pack_batch(
+    batch: dict[str, list[list[int]]],
+    *,
+    block_size: int,
+    eos_token_id: int,
+    pad_token_id: int,
+    reset_boundaries: bool = False,
+) -> dict[str, list[list[int]]]:
+    """
+    `datasets.map(batched=True)` adapter around `pack_documents`.
+    """
+    blocks = list(
+        pack_documents(
+            batch["input_ids"],
+            block_size=block_size,
+            eos_token_id=eos_token_id,
+            pad_token_id=pad_token_id,
+            reset_boundaries=reset_boundaries,
+        )
+    )
+    if not blocks:
+        return {"input_ids": [], "labels": []}
+    return {k: [b[k] for b in blocks] for k in blocks[0]}
+
+
+class PackedTokenStoreDataset(torch.utils.data.Dataset):
+    """
+    Map-style packed view over a TokenStore, computed lazily from document offsets.
+
+    The packed stream is every document followed by EOS; block b covers stream positions
+    [b * block_size, (b + 1) * block_size). Nothing is materialized up front.
+    """
+
+    def __init__(
+        self,
+        store: TokenStore,
+        *,
+        block_size: int,
+        eos_token_id: int,
+        pad_token_id: int,
+        reset_boundaries: bool = False,
+    ) -> None:
+        self.store = store
+        self.block_size = block_size
+        self.eos_token_id = eos_token_id
+        self.pad_token_id = pad_token_id
+        self.reset_boundaries = reset_boundaries
+
+        # stream start of doc i: its token offset plus one EOS per preceding doc
+        offsets = np.asarray(store.offsets, dtype=np.int64)
+        self._doc_starts = offsets[:-1] + np.arange(len(store), dtype=np.int64)
+        self._stream_len = int(offsets[-1]) + len(store)
+
+    def __len__(self) -> int:
+        return -(-self._stream_len // self.block_size)
+
+    def __getitem__(self, b: int) -> dict[str, list[int]]:
+        if not 0 <= b < len(self):
+            raise IndexError(b)
+        lo = b * self.block_size
+        hi = min(lo + self.block_size, self._stream_len)
+
+        ids: list[int] = []
+        positions: list[int] = []
+        doc = int(np.searchsorted(self._doc_starts, lo, side="right")) - 1
+        p = lo
+        while p < hi:
+            start = int(self._doc_starts[doc])
+            end = start + len(self.store[doc]) + 1  # + EOS
+            piece_end = min(end, hi)
+            within = p - start
+            toks = self.store[doc][within : piece_end - start].astype(np.int64).tolist()
+            if piece_end == end:
+                toks.append(self.eos_token_id)
+            ids.extend(toks)
+            positions.extend(range(piece_end - p))
+            p = piece_end
+            doc += 1
+
+        return _block_features(
+            ids,
+            positions,
+            block_size=self.block_size,
+            pad_token_id=self.pad_token_id,
+            reset_boundaries=self.reset_boundaries,
+        )
+
+
+def padding_stats(doc_lengths: Sequence[int] | np.ndarray, *, block_size: int) -> dict[str, float]:
+    """
+    Dataset-level padding fractions for pad-to-max_length vs packed layouts.
+    """
+    lengths = np.asarray(doc_lengths, dtype=np.int64)
+    n_docs = int(lengths.size)
+    if n_docs == 0:
+        return {}
+
+    kept = np.minimum(lengths, block_size)
+    padded_slots = n_docs * block_size
+    packed_tokens = int(lengths.sum()) + n_docs  # + one EOS per doc
+    packed_slots = -(-packed_tokens // block_size) * block_size
+
+    return {
+        "docs": n_docs,
+        "tokens": int(lengths.sum()),
+        "padding_fraction_max_length": 1.0 - float(kept.sum()) / padded_slots,
+        "truncated_tokens_max_length": int((lengths - kept).sum()),
+        "padding_fraction_packed": 1.0 - packed_tokens / packed_slots,
+    }
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import warnings
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
+import torch
+
+from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.run_artifacts import write_json
+
+# Profiles `training perf-bench` compares by default (SFTConfig overrides of the defaults,
+# which already use the fused optimizer where available).
+DEFAULT_PROFILES: dict[str, dict[str, Any]] = {
+    "baseline": {},
+    "bf16": {"bf16_autocast": True},
+    "compile": {"torch_compile": True},
+    "unfused_adamw": {"fused_optimizer": False},
+    "bf16+compile": {"bf16_autocast": True, "torch_compile": True},
+}
+
+
+def apply_thread_settings(intra_op: int = 0, inter_op: int = 0) -> dict[str, int]:
+    """
+    Set torch intra-/inter-op pool sizes (0 => leave as is) and return the effective values.
+
+    The inter-op pool can only be sized before its first use; later calls keep the current
+    size and warn.
+    """
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0 and inter_op != torch.get_num_interop_threads():
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            warnings.warn(f"inter-op threads unchanged: {e}", stacklevel=2)
+    return {
+        "intra_op_threads": torch.get_num_threads(),
+        "inter_op_threads": torch.get_num_interop_threads(),
+    }
+
+
+def fused_adamw_available(device: str = "cpu") -> bool:
+    """
+    Whether this torch build has the fused AdamW kernel for `device`.
+    """
+    p = torch.nn.Parameter(torch.zeros(1, device=device))
+    p.grad = torch.zeros_like(p)
+    try:
+        torch.optim.AdamW([p], fused=True).step()
+    except (RuntimeError, TypeError):
+        return False
+    return True
+
+
+def parse_profiles(items: list[str]) -> dict[str, dict[str, Any]]:
+    """
+    ["fast:bf16_autocast=true,torch_compile=true", "plain:"] -> {name: overrides}.
+    """
+    from frontier_ml_stack.training.sweep import parse_assignments
+
+    profiles: dict[str, dict[str, Any]] = {}
+    for item in items:
+        name, sep, spec = item.partition(":")
+        if not sep or not name:
+            raise ValueError(f"expected name:field=value,... (got {item!r})")
+        profiles[name] = parse_assignments([x for x in spec.split(",") if x])
+    return profiles
+
+
+def perf_table(rows: list[dict[str, Any]]) -> str:
+    """
+    Markdown table of steady-state throughput per profile (speedup vs the first profile).
+    """
+    base = next((r["tokens_per_second"] for r in rows if r.get("tokens_per_second")), None)
+    header = [
+        "profile",
+        "tokens/s",
+        "speedup",
+        "step s (median)",
+        "first step s",
+        "train_loss",
+        "peak RSS MiB",
+    ]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for r in rows:
+        if r["status"] != "ok":
+            lines.append(f"| {r['profile']} | failed | - | - | - | - | - |")
+            continue
+        tps = r["tokens_per_second"]
+        speedup = f"{tps / base:.2f}x" if base and tps else "-"
+        cells = [
+            r["profile"],
+            f"{tps:.1f}",
+            speedup,
+            f"{r['step_time_s_median']:.3f}",
+            f"{r['first_step_s']:.2f}",
+            f"{r['train_loss']:.4f}",
+            f"{r['peak_rss_mb']:.0f}",
+        ]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def _first_step_s(run_dir: Path) -> float | None:
+    path = run_dir / "step_metrics.jsonl"
+    if not path.is_file():
+        return None
+    with path.open(encoding="utf-8") as f:
+        first = f.readline()
+    return json.loads(first)["wall_s"] if first else None
+
+
+def benchmark_perf(
+    base: SFTConfig,
+    profiles: dict[str, dict[str, Any]],
+    *,
+    bench_name: str,
+) -> Path:
+    """
+    Train `base.max_steps` steps once per profile, one run at a time, and compare tokens/s.
+
+    Runs go through the sweep runner with a single process, so each profile starts from a
+    fresh fork (thread pools, compile caches) and the model and data are loaded once.
+    Throughput is the step-telemetry steady state (first step excluded: it includes
+    torch.compile); the first step's wall time is reported separately. Writes
+    perf_bench.json and perf_bench.md to the bench dir.
+    """
+    from frontier_ml_stack.training.sweep import run_sweep
+
+    if not profiles:
+        raise ValueError("no profiles to benchmark")
+    base = replace(base, telemetry=True, save_steps=0, save_merged=False)
+    names = list(profiles)
+    sweep_dir = run_sweep(base, [profiles[n] for n in names], sweep_name=bench_name, max_procs=1)
+    sweep = json.loads((sweep_dir / "sweep.json").read_text(encoding="utf-8"))
+
+    rows = []
+    for name, run in zip(names, sweep["runs"], strict=True):
+        row: dict[str, Any] = {
+            "profile": name,
+            "overrides": profiles[name],
+            "status": run["status"],
+        }
+        if run["status"] != "ok":
+            row["error"] = run.get("error")
+            rows.append(row)
+            continue
+        run_dir = Path(run["run_dir"])
+        metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+        steady = metrics.get("step_telemetry", {})
+        row.update(
+            run_dir=str(run_dir),
+            tokens_per_second=steady.get("tokens_per_second"),
+            step_time_s_median=steady.get("step_time_s_median"),
+            first_step_s=_first_step_s(run_dir),
+            train_loss=metrics.get("train_loss"),
+            peak_rss_mb=metrics.get("peak_rss_mb"),
+            perf=metrics.get("perf"),
+        )
+        rows.append(row)
+
+    write_json(sweep_dir / "perf_bench.json", {"bench_name": bench_name, "profiles": rows})
+    (sweep_dir / "perf_bench.md").write_text(perf_table(rows), encoding="utf-8")
+    return sweep_dir
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from frontier_ml_stack.data.schema import PreferenceRecord
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+
+
+def _completion(
+    prompt_ids: list[int], response_ids: list[int], max_seq_length: int
+) -> dict[str, list[int]]:
+    ids = (prompt_ids + response_ids)[:max_seq_length]
+    labels = ([IGNORE_INDEX] * len(prompt_ids) + response_ids)[:max_seq_length]
+    return {"input_ids": ids, "labels": labels}
+
+
+def tokenize_preference_pair(
+    record: PreferenceRecord, tokenizer: Any, *, max_seq_length: int, max_prompt_length: int
+) -> dict[str, list[int]]:
+    """
+    Token ids + labels (prompt masked to -100) for the chosen and rejected completions.
+
+    Prompt and completions are tokenized separately so both sequences share the exact same
+    prompt tokens. Prompts keep their last `max_prompt_length` tokens; completions (EOS
+    appended) are cut at `max_seq_length`.
+    """
+    if max_prompt_length >= max_seq_length:
+        raise ValueError("max_prompt_length must be smaller than max_seq_length")
+    prompt = tokenizer(record.prompt)["input_ids"][-max_prompt_length:]
+    eos = [tokenizer.eos_token_id] if tokenizer.eos_token_id is not None else []
+    chosen = _completion(
+        prompt,
+        tokenizer(record.chosen, add_special_tokens=False)["input_ids"] + eos,
+        max_seq_length,
+    )
+    rejected = _completion(
+        prompt,
+        tokenizer(record.rejected, add_special_tokens=False)["input_ids"] + eos,
+        max_seq_length,
+    )
+    return {
+        "chosen_input_ids": chosen["input_ids"],
+        "chosen_labels": chosen["labels"],
+        "rejected_input_ids": rejected["input_ids"],
+        "rejected_labels": rejected["labels"],
+    }
+
+
+def collate_pairs(pairs: Sequence[dict[str, Any]], *, pad_token_id: int) -> dict[str, torch.Tensor]:
+    """
+    Stack chosen rows, then rejected rows, into one right-padded (2B, L) batch.
+
+    One forward pass scores both halves. `ref_logps` (2B,) is passed through when the pairs
+    carry cached reference log-probs.
+    """
+    seqs = [p["chosen_input_ids"] for p in pairs] + [p["rejected_input_ids"] for p in pairs]
+    labels = [p["chosen_labels"] for p in pairs] + [p["rejected_labels"] for p in pairs]
+    width = max(len(s) for s in seqs)
+
+    batch = {
+        "input_ids": torch.tensor([s + [pad_token_id] * (width - len(s)) for s in seqs]),
+        "attention_mask": torch.tensor([[1] * len(s) + [0] * (width - len(s)) for s in seqs]),
+        "labels": torch.tensor([y + [IGNORE_INDEX] * (width - len(y)) for y in labels]),
+    }
+    if "ref_chosen_logp" in pairs[0]:
+        batch["ref_logps"] = torch.tensor(
+            [p["ref_chosen_logp"] for p in pairs] + [p["ref_rejected_logp"] for p in pairs],
+            dtype=torch.float32,
+        )
+    return batch
+
+
+class PreferenceDataset(torch.utils.data.Dataset):
+    """
+    Tokenized pairs joined with their cached reference log-probs ((N, 2) memmap).
+    """
+
+    def __init__(self, pairs: list[dict[str, list[int]]], ref_logps: np.ndarray) -> None:
+        if len(pairs) != len(ref_logps):
+            raise ValueError(f"{len(pairs)} pairs but {len(ref_logps)} reference log-prob rows")
+        self.pairs = pairs
+        self.ref_logps = ref_logps
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def __getitem__(self, i: int) -> dict[str, Any]:
+        chosen, rejected = self.ref_logps[i]
+        return {
+            **self.pairs[i],
+            "ref_chosen_logp": float(chosen),
+            "ref_rejected_logp": float(rejected),
+        }
+
+
+def disable_dropout(model: torch.nn.Module) -> int:
+    """
+    Set every dropout probability in `model` (modules and `*_pdrop`/`*dropout` config fields)
+    to 0; returns the number of dropout modules changed.
+
+    The cached reference log-probs come from an eval-mode pass, so a policy trained with
+    dropout would see noise in its log-ratio, even at step 0 where it should be exactly 0.
+    """
+    config = getattr(model, "config", None)
+    if config is not None:
+        for key, value in vars(config).items():
+            if isinstance(value, float) and (key.endswith("pdrop") or key.endswith("dropout")):
+                setattr(config, key, 0.0)
+    changed = 0
+    for module in model.modules():
+        if isinstance(module, torch.nn.Dropout) and module.p > 0:
+            module.p = 0.0
+            changed += 1
+    return changed
+
+
+def sequence_logps(logits: torch.Tensor, labels: torch.Tensor) -> torch.Tensor:
+    """
+    Summed log-probability of each row's labelled (non -100) tokens under `logits`.
+    """
+    logits = logits[:, :-1].float()
+    targets = labels[:, 1:]
+    mask = targets != IGNORE_INDEX
+    picked = logits.gather(-1, targets.clamp(min=0).unsqueeze(-1)).squeeze(-1)
+    # log_softmax at the target only; avoids a second (B, L, V) tensor
+    token_logps = picked - torch.logsumexp(logits, dim=-1)
+    return (token_logps * mask).sum(-1)
+
+
+def dpo_loss(
+    policy_logps: torch.Tensor, ref_logps: torch.Tensor, beta: float
+) -> tuple[torch.Tensor, dict[str, torch.Tensor]]:
+    """
+    DPO loss for (2B,) log-probs laid out as [chosen..., rejected...].
+
+    Returns the mean loss and per-pair implicit rewards (beta * policy/reference log-ratio).
+    """
+    n = policy_logps.shape[0] // 2
+    ratios = policy_logps - ref_logps
+    chosen_rewards, rejected_rewards = beta * ratios[:n], beta * ratios[n:]
+    margins = chosen_rewards - rejected_rewards
+    loss = -F.logsigmoid(margins).mean()
+    return loss, {
+        "chosen": chosen_rewards.detach(),
+        "rejected": rejected_rewards.detach(),
+        "margin": margins.detach(),
+    }
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+
+from frontier_ml_stack.data.hashing import sha256_text
+from frontier_ml_stack.training.preference import collate_pairs, sequence_logps
+from frontier_ml_stack.training.run_artifacts import write_json
+from frontier_ml_stack.utils.files import record_progress
+
+SCHEMA_VERSION = "ref-logps-v1"
+LOGPS_FILE = "ref_logps.npy"
+PROGRESS_FILE = "progress.json"
+MANIFEST_FILE = "manifest.json"
+
+_WEIGHT_SUFFIXES = (".safetensors", ".bin", ".pt")
+
+
+def model_fingerprint(model_name: str) -> dict[str, Any]:
+    """
+    Identity of a model for cache keys: the hub commit, or the weight files of a local dir.
+
+    Local weights are identified by name, size and mtime (hashing GBs of weights on every run
+    would cost more than the cache saves).
+    """
+    path = Path(model_name)
+    if path.is_dir():
+        files = sorted(
+            (p.name, p.stat().st_size, p.stat().st_mtime_ns)
+            for p in path.iterdir()
+            if p.suffix in _WEIGHT_SUFFIXES or p.name == "config.json"
+        )
+        return {"path": str(path.resolve()), "files": files}
+
+    from transformers import AutoConfig
+
+    commit = getattr(AutoConfig.from_pretrained(model_name), "_commit_hash", None)
+    return {"name": model_name, "commit": commit}
+
+
+class ReferenceLogpCache:
+    """
+    Reference-model log-probs of every (chosen, rejected) pair, as an (N, 2) float32 memmap.
+
+    The cache dir is keyed on `params` (dataset digest, reference model, tokenizer and
+    truncation settings), so DPO runs that only differ in training hyperparameters share it.
+    `fill()` writes in batches and records progress after each one, so an interrupted pass
+    resumes where it stopped. The manifest is written last and marks the cache complete.
+    """
+
+    def __init__(self, root: Path, params: dict[str, Any], num_pairs: int) -> None:
+        self.params = {**params, "schema": SCHEMA_VERSION}
+        self.key = sha256_text(json.dumps(self.params, sort_keys=True))[:12]
+        self.cache_dir = Path(root) / self.key
+        self.num_pairs = num_pairs
+
+    @property
+    def complete(self) -> bool:
+        return (self.cache_dir / MANIFEST_FILE).is_file()
+
+    def done(self) -> int:
+        """
+        Pairs already computed (in fill order).
+        """
+        path = self.cache_dir / PROGRESS_FILE
+        if self.complete:
+            return self.num_pairs
+        if not path.is_file() or not (self.cache_dir / LOGPS_FILE).is_file():
+            return 0
+        return int(json.loads(path.read_text(encoding="utf-8"))["done"])
+
+    def load(self) -> np.ndarray:
+        if not self.complete:
+            raise ValueError(f"reference log-prob cache {self.cache_dir} is incomplete")
+        return np.load(self.cache_dir / LOGPS_FILE, mmap_mode="r")
+
+    @staticmethod
+    def fill_order(pairs: list[dict[str, list[int]]]) -> np.ndarray:
+        """
+        Longest pairs first, so each batch pads to similar lengths (stable, so resumable).
+        """
+        lengths = [max(len(p["chosen_input_ids"]), len(p["rejected_input_ids"])) for p in pairs]
+        return np.argsort(-np.asarray(lengths), kind="stable")
+
+    @torch.inference_mode()
+    def fill(
+        self,
+        model: torch.nn.Module,
+        pairs: list[dict[str, list[int]]],
+        *,
+        batch_size: int,
+        pad_token_id: int,
+    ) -> dict[str, Any]:
+        """
+        Compute the missing rows with `model` and return pass statistics.
+        """
+        if len(pairs) != self.num_pairs:
+            raise ValueError(f"expected {self.num_pairs} pairs, got {len(pairs)}")
+        start = self.done()
+        stats = {"cache_dir": str(self.cache_dir), "pairs": self.num_pairs, "reused": start}
+        if self.complete:
+            return {**stats, "computed": 0, "seconds": 0.0}
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        logps_path = self.cache_dir / LOGPS_FILE
+        if start:
+            out = np.load(logps_path, mmap_mode="r+")
+        else:
+            out = np.lib.format.open_memmap(
+                logps_path, mode="w+", dtype=np.float32, shape=(self.num_pairs, 2)
+            )
+
+        was_training = model.training
+        model.eval()
+        order = self.fill_order(pairs)
+        t0 = time.perf_counter()
+        for lo in range(start, self.num_pairs, batch_size):
+            idx = order[lo : lo + batch_size]
+            batch = collate_pairs([pairs[i] for i in idx], pad_token_id=pad_token_id)
+            logits = model(
+                input_ids=batch["input_ids"], attention_mask=batch["attention_mask"]
+            ).logits
+            logps = sequence_logps(logits, batch["labels"]).numpy()
+            out[idx, 0] = logps[: len(idx)]
+            out[idx, 1] = logps[len(idx) :]
+            record_progress(
+                self.cache_dir / PROGRESS_FILE, min(lo + batch_size, self.num_pairs), out
+            )
+        seconds = time.perf_counter() - t0
+        model.train(was_training)
+        del out
+
+        computed = self.num_pairs - start
+        write_json(
+            self.cache_dir / MANIFEST_FILE,
+            {
+                "params": self.params,
+                "counts": {"pairs": self.num_pairs},
+                "dtype": "float32",
+                "columns": ["chosen", "rejected"],
+            },
+        )
+        return {
+            **stats,
+            "computed": computed,
+            "seconds": seconds,
+            "pairs_per_second": computed / seconds if seconds else 0.0,
+        }
@@ -1,51 +1,340 @@
 from __future__ import annotations
 
+import json
+from dataclasses import asdict, dataclass, field
+from functools import partial
 from pathlib import Path
+from typing import Any
 
 import torch
+from datasets import Dataset
 from transformers import (
-    AutoModelForCausalLM,
-    AutoTokenizer,
     DataCollatorForLanguageModeling,
-    Trainer,
     TrainingArguments,
+    default_data_collator,
 )
 
+from frontier_ml_stack.models.loading import load_causal_lm, load_tokenizer
+from frontier_ml_stack.training.bucketing import (
+    LengthBucketBatchSampler,
+    batch_padding_fraction,
+    random_batches,
+)
+from frontier_ml_stack.training.checkpoint import CheckpointManager, list_checkpoints
 from frontier_ml_stack.training.config import SFTConfig
-from frontier_ml_stack.training.data import load_records_as_dataset
+from frontier_ml_stack.training.data import (
+    load_records_as_dataset,
+    load_records_as_iterable_dataset,
+    load_token_store_dataset,
+)
+from frontier_ml_stack.training.dist import broadcast_object, is_main_process, world_size
+from frontier_ml_stack.training.distill import (
+    DistillTokenStoreDataset,
+    TeacherLogits,
+    collate_distill,
+)
 from frontier_ml_stack.training.lora import (
     apply_lora,
     guess_target_modules,
     parse_target_modules,
     trainable_params_summary,
 )
+from frontier_ml_stack.training.low_precision import (
+    BASE_DTYPES,
+    dequantize_linears,
+    param_bytes,
+    pin_malloc_mmap_threshold,
+    quantize_frozen_linears,
+    restore_conv1d,
+)
+from frontier_ml_stack.training.mixture import load_mixture_as_dataset, parse_mixture_spec
+from frontier_ml_stack.training.packing import (
+    PackedTokenStoreDataset,
+    isolate_packed_documents,
+    pack_batch,
+    padding_stats,
+)
+from frontier_ml_stack.training.perf import apply_thread_settings, fused_adamw_available
 from frontier_ml_stack.training.run_artifacts import prepare_run_dir, write_config, write_json
+from frontier_ml_stack.training.telemetry import StepTelemetryCallback
+from frontier_ml_stack.training.trainer import DistillTrainer, SFTTrainer
+from frontier_ml_stack.utils.memory import peak_rss_mb, reset_peak_rss
+
+
+# Map functions are module-level (bound with partial) so streaming datasets stay picklable
+# for DataLoader workers under the spawn start method.
+def _tokenize_batch(batch, *, tokenizer, max_seq_length: int, padding: str):
+    return tokenizer(
+        batch["text"],
+        truncation=True,
+        max_length=max_seq_length,
+        padding="max_length" if padding == "max_length" else False,
+    )
+
+
+def _tokenize_and_pack_batch(batch, *, tokenizer, pack):
+    return pack({"input_ids": tokenizer(batch["text"])["input_ids"]})
+
+
+def _tokenize_dataset(ds, tokenizer, max_seq_length: int, padding: str = "max_length"):
+    tok = partial(
+        _tokenize_batch, tokenizer=tokenizer, max_seq_length=max_seq_length, padding=padding
+    )
+    return ds.map(tok, batched=True, remove_columns=["text"])
+
+
+@dataclass
+class TrainData:
+    dataset: Any
+    collator: Any
+    stats: dict[str, Any] = field(default_factory=dict)
+    batch_sampler: LengthBucketBatchSampler | None = None
+
+
+def _pack_dataset(ds, tokenizer, cfg: SFTConfig) -> tuple[Any, dict[str, Any]]:
+    pack = partial(
+        pack_batch,
+        block_size=cfg.max_seq_length,
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=tokenizer.pad_token_id,
+        reset_boundaries=cfg.packing_reset_boundaries,
+    )
+
+    if not isinstance(ds, Dataset):
+        # streaming source: tokenize + pack lazily, stats unknown up front
+        tok_and_pack = partial(_tokenize_and_pack_batch, tokenizer=tokenizer, pack=pack)
+        return ds.map(tok_and_pack, batched=True, remove_columns=["text"]), {}
+
+    tok = ds.map(lambda batch: tokenizer(batch["text"]), batched=True, remove_columns=["text"])
+    stats = padding_stats([len(x) for x in tok["input_ids"]], block_size=cfg.max_seq_length)
+    # one map batch => a single partially filled block at the very end
+    packed = tok.map(pack, batched=True, batch_size=len(tok), remove_columns=tok.column_names)
+    return packed, stats
 
 
-def _tokenize_dataset(ds, tokenizer, max_seq_length: int):
-    def _tok(batch):
-        return tokenizer(
-            batch["text"],
-            truncation=True,
-            max_length=max_seq_length,
-            padding="max_length",
+def _validate_layout(cfg: SFTConfig) -> None:
+    if cfg.padding not in ("max_length", "dynamic"):
+        raise ValueError(f"padding must be 'max_length' or 'dynamic' (got {cfg.padding!r})")
+    if cfg.packing and cfg.group_by_length:
+        raise ValueError("group_by_length does not apply to packed blocks; disable one of them")
+    if cfg.group_by_length and cfg.padding != "dynamic":
+        raise ValueError("group_by_length only saves compute with padding='dynamic'")
+    if cfg.streaming and cfg.max_steps <= 0:
+        raise ValueError("streaming datasets have no length; set max_steps > 0")
+    if cfg.distill_teacher_logits and (not cfg.train_token_store or cfg.packing):
+        raise ValueError("distillation reads teacher rows per document: needs an unpacked store")
+    if not 0.0 <= cfg.distill_alpha <= 1.0:
+        raise ValueError(f"distill_alpha must be in [0, 1] (got {cfg.distill_alpha})")
+
+
+def _with_length_stats(
+    data: TrainData, lengths: list[int], cfg: SFTConfig, doc_lengths=None
+) -> TrainData:
+    """
+    Attach padding statistics and, if enabled, the length-bucketed batch sampler.
+
+    `lengths` are per-example lengths after truncation; `doc_lengths` (untruncated, when
+    known) also yield the packed-layout estimate for comparison.
+    """
+    bs = cfg.per_device_train_batch_size
+    if doc_lengths is not None:
+        data.stats.update(padding_stats(doc_lengths, block_size=cfg.max_seq_length))
+    else:
+        # lengths are already truncated here, so the packed estimate would be misleading
+        data.stats.update(padding_stats(lengths, block_size=cfg.max_seq_length))
+        data.stats.pop("padding_fraction_packed", None)
+
+    if cfg.padding == "dynamic":
+        if cfg.group_by_length:
+            data.batch_sampler = LengthBucketBatchSampler(
+                lengths,
+                batch_size=bs,
+                seed=cfg.seed,
+                bucket_multiplier=cfg.length_bucket_multiplier,
+            )
+            batches = data.batch_sampler.batches()
+        else:
+            batches = random_batches(len(lengths), batch_size=bs, seed=cfg.seed)
+        data.stats["padding_fraction_dynamic"] = batch_padding_fraction(lengths, batches)
+    return data
+
+
+def _build_train_dataset(cfg: SFTConfig, tokenizer) -> TrainData:
+    """
+    Build the training dataset, collator, optional batch sampler and data stats.
+    """
+    _validate_layout(cfg)
+    lm_collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
+    dynamic = cfg.padding == "dynamic"
+
+    if cfg.train_token_store:
+        base = load_token_store_dataset(
+            Path(cfg.train_token_store),
+            tokenizer=tokenizer,
+            max_seq_length=cfg.max_seq_length,
+            pad_to_max_length=not dynamic,
         )
+        if cfg.distill_teacher_logits:
+            teacher = TeacherLogits(Path(cfg.distill_teacher_logits))
+            data = TrainData(
+                DistillTokenStoreDataset(base, teacher),
+                partial(collate_distill, pad_token_id=tokenizer.pad_token_id),
+                {"distill_top_k": teacher.top_k},
+            )
+            return _with_length_stats(
+                data, base.lengths(), cfg, doc_lengths=base.store.doc_lengths()
+            )
+        if not cfg.packing:
+            data = TrainData(base, lm_collator)
+            return _with_length_stats(
+                data, base.lengths(), cfg, doc_lengths=base.store.doc_lengths()
+            )
+        packed = PackedTokenStoreDataset(
+            base.store,
+            block_size=cfg.max_seq_length,
+            eos_token_id=tokenizer.eos_token_id,
+            pad_token_id=tokenizer.pad_token_id,
+            reset_boundaries=cfg.packing_reset_boundaries,
+        )
+        stats = padding_stats(base.store.doc_lengths(), block_size=cfg.max_seq_length)
+        return TrainData(packed, default_data_collator, stats)
+
+    if cfg.train_mixture:
+        ds = load_mixture_as_dataset(
+            parse_mixture_spec(cfg.train_mixture),
+            seed=cfg.seed,
+            shuffle_buffer=cfg.mixture_shuffle_buffer,
+        )
+    elif cfg.streaming:
+        ds = load_records_as_iterable_dataset(
+            Path(cfg.train_records), num_shards=max(1, cfg.dataloader_num_workers) * 4
+        ).shuffle(seed=cfg.seed, buffer_size=cfg.streaming_shuffle_buffer)
+    else:
+        ds = load_records_as_dataset(Path(cfg.train_records))
+
+    if cfg.packing:
+        packed, stats = _pack_dataset(ds, tokenizer, cfg)
+        return TrainData(packed, default_data_collator, stats)
+
+    tokenized = _tokenize_dataset(ds, tokenizer, cfg.max_seq_length, padding=cfg.padding)
+    if not isinstance(tokenized, Dataset):
+        if cfg.group_by_length:
+            raise ValueError("group_by_length needs a map-style dataset (not a stream)")
+        return TrainData(tokenized, lm_collator)
+
+    lengths = [sum(m) for m in tokenized["attention_mask"]]
+    return _with_length_stats(TrainData(tokenized, lm_collator), lengths, cfg)
+
+
+# Settings that may change between a run and its resume without changing what is trained.
+# Not max_steps: it is the LR scheduler's horizon, so the saved scheduler state depends on it.
+_RESUME_MUTABLE = {
+    "resume",
+    "logging_steps",
+    "save_steps",
+    "save_total_limit",
+    "telemetry",
+    "pin_mmap_threshold",
+    "profile_start_step",
+    "profile_num_steps",
+}
+
+
+def _find_resume_checkpoint(
+    run_dir: Path, cfg: Any, *, mutable: set[str] = _RESUME_MUTABLE
+) -> Path | None:
+    """
+    Latest checkpoint of an earlier run in `run_dir`, after checking its config is compatible.
+    """
+    ckpt = next(reversed(list_checkpoints(run_dir / "checkpoints")), None)
+    config_path = run_dir / "config.json"
+    if ckpt is None:
+        return ckpt
+    if not config_path.is_file():
+        # without it compatibility cannot be checked; starting over would overwrite the progress
+        raise ValueError(f"cannot resume {run_dir}: checkpoints exist but config.json is missing")
 
-    return ds.map(_tok, batched=True, remove_columns=["text"])
+    saved = json.loads(config_path.read_text(encoding="utf-8"))
+    current = asdict(cfg)
+    changed = sorted(k for k in current.keys() - mutable if k in saved and saved[k] != current[k])
+    if changed:
+        raise ValueError(f"cannot resume {run_dir}: config changed ({', '.join(changed)})")
+    return ckpt
 
 
-def run_sft(cfg: SFTConfig) -> Path:
-    records_path = Path(cfg.train_records)
+def save_final_model(
+    trainer: SFTTrainer, tokenizer, run_dir: Path, *, use_lora: bool, save_merged: bool
+) -> None:
+    """
+    Final save. LoRA runs keep only the adapter (plus the merged model); the base weights
+    are unchanged, so a full copy of them would be redundant.
+    """
+    model = trainer.model
+    if use_lora:
+        adapter_dir = run_dir / "lora_adapter"
+        model.save_pretrained(str(adapter_dir), safe_serialization=True)
+        tokenizer.save_pretrained(str(adapter_dir))
+
+        # Optionally save merged model for downstream eval/inference
+        if save_merged and hasattr(model, "merge_and_unload"):
+            # merge into fp32 weights, and give GPT-2 back its Conv1D layout
+            dequantize_linears(model)
+            merged = model.merge_and_unload()
+            restore_conv1d(merged)
+            merged_dir = run_dir / "final_model_merged"
+            merged_dir.mkdir(parents=True, exist_ok=True)
+            merged.save_pretrained(str(merged_dir), safe_serialization=True)
+            tokenizer.save_pretrained(str(merged_dir))
+    else:
+        final_dir = run_dir / "final_model"
+        final_dir.mkdir(parents=True, exist_ok=True)
+        trainer.save_model(str(final_dir))
+        tokenizer.save_pretrained(str(final_dir))
+
+
+def run_sft(
+    cfg: SFTConfig,
+    *,
+    tokenizer=None,
+    model: torch.nn.Module | None = None,
+    data: TrainData | None = None,
+) -> Path:
+    """
+    Train one SFT run. `tokenizer`, `model` (fp32 base) and `data` may be preloaded by the
+    caller (e.g. the sweep runner); `model` is modified in place.
+    """
     out_root = Path(cfg.output_dir)
     run_dir = prepare_run_dir(out_root, cfg.run_name)
 
-    write_config(run_dir / "config.json", cfg)
+    # in data-parallel runs every rank trains, but only global rank 0 writes artifacts
+    main = is_main_process()
+    world = world_size()
+
+    # rank 0 decides (other hosts may not see its run dir) and broadcasts once the group is up
+    resume_from = None
+    if cfg.resume and main:
+        resume_from = _find_resume_checkpoint(run_dir, cfg)
+    if main:
+        write_config(run_dir / "config.json", cfg)
+
+    # before any parallel work: the inter-op pool can only be sized once
+    thread_settings = apply_thread_settings(cfg.intra_op_threads, cfg.inter_op_threads)
 
-    tokenizer = AutoTokenizer.from_pretrained(cfg.model_name)
-    if tokenizer.pad_token is None:
-        tokenizer.pad_token = tokenizer.eos_token
+    if tokenizer is None:
+        tokenizer = load_tokenizer(cfg.model_name)
 
-    model = AutoModelForCausalLM.from_pretrained(cfg.model_name)
+    if cfg.lora_base_dtype not in BASE_DTYPES:
+        raise ValueError(f"lora_base_dtype must be one of {BASE_DTYPES}")
+    low_precision = cfg.lora_base_dtype != "fp32"
+    if low_precision and not cfg.use_lora:
+        raise ValueError("a low-precision base needs use_lora (the base must stay frozen)")
+
+    # load low-precision bases as bf16 so the fp32 copy never materializes
+    if model is None:
+        model = load_causal_lm(cfg.model_name, dtype=torch.bfloat16 if low_precision else None)
+    use_cache = None
+    if cfg.packing and cfg.packing_reset_boundaries:
+        use_cache = isolate_packed_documents(model)
     lora_info = {"use_lora": cfg.use_lora}
 
     if cfg.use_lora:
@@ -53,6 +342,9 @@ def run_sft(cfg: SFTConfig) -> Path:
         targets = override or guess_target_modules(model)
         lora_info["target_modules"] = targets
         lora_info["override"] = bool(override)
+        lora_info["base_dtype"] = cfg.lora_base_dtype
+        if low_precision:
+            lora_info["quantized_layers"] = quantize_frozen_linears(model, cfg.lora_base_dtype)
 
         model = apply_lora(
             model,
@@ -62,6 +354,10 @@ def run_sft(cfg: SFTConfig) -> Path:
             target_modules=targets,
             bias=cfg.lora_bias,
         )
+        # adapters (and so the optimizer state) stay fp32 whatever the base storage dtype
+        for p in model.parameters():
+            if p.requires_grad:
+                p.data = p.data.float()
         # Helpful: log trainable params
         lora_info["params"] = {
             "r": cfg.lora_r,
@@ -70,64 +366,141 @@ def run_sft(cfg: SFTConfig) -> Path:
             "bias": cfg.lora_bias,
         }
         lora_info["trainable_summary"] = trainable_params_summary(model)
+    if cfg.pin_mmap_threshold:
+        lora_info["mmap_threshold_pinned"] = pin_malloc_mmap_threshold()
     model.train()
 
-    ds = load_records_as_dataset(records_path)
-    tokenized = _tokenize_dataset(ds, tokenizer, cfg.max_seq_length)
+    if data is None:
+        data = _build_train_dataset(cfg, tokenizer)
 
-    collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
+    fused_optimizer = cfg.fused_optimizer and fused_adamw_available()
 
+    # torch rejects prefetch_factor without worker processes
+    prefetch_factor = cfg.dataloader_prefetch_factor if cfg.dataloader_num_workers > 0 else None
     args = TrainingArguments(
         output_dir=str(run_dir / "checkpoints"),
         max_steps=cfg.max_steps,
         per_device_train_batch_size=cfg.per_device_train_batch_size,
         learning_rate=cfg.learning_rate,
         logging_steps=cfg.logging_steps,
+        save_strategy="steps" if cfg.save_steps > 0 else "no",
         save_steps=cfg.save_steps,
+        dataloader_num_workers=cfg.dataloader_num_workers,
+        dataloader_prefetch_factor=prefetch_factor,
         report_to=[],
         seed=cfg.seed,
         fp16=False,
-        bf16=False,
+        bf16=cfg.bf16_autocast,
+        torch_compile=cfg.torch_compile,
+        optim="adamw_torch_fused" if fused_optimizer else "adamw_torch",
+        gradient_checkpointing=cfg.gradient_checkpointing,
+        # non-reentrant checkpointing works with a frozen embedding layer (LoRA)
+        gradient_checkpointing_kwargs={"use_reentrant": False}
+        if cfg.gradient_checkpointing
+        else None,
+        # gloo DDP is CPU-only; HF also rejects bf16 without a GPU unless told it is a CPU run
+        use_cpu=world > 1 or (cfg.bf16_autocast and not torch.cuda.is_available()),
+        ddp_backend="gloo" if world > 1 else None,
+        # every trainable parameter gets a gradient; the unused-parameter search is a wasted
+        # autograd traversal per step
+        ddp_find_unused_parameters=False,
+        # teacher rows are not model inputs; DistillTrainer pops them before the forward
+        remove_unused_columns=not cfg.distill_teacher_logits,
     )
 
-    trainer = Trainer(
+    # TrainingArguments has set up the process group
+    resume_from = broadcast_object(resume_from)
+
+    telemetry = None
+    if cfg.telemetry:
+        telemetry = StepTelemetryCallback(
+            run_dir / "step_metrics.jsonl" if main else None,
+            profile_dir=run_dir / "profile",
+            profile_start_step=cfg.profile_start_step,
+            profile_num_steps=cfg.profile_num_steps,
+        )
+
+    trainer_cls = SFTTrainer
+    if cfg.distill_teacher_logits:
+        trainer_cls = partial(
+            DistillTrainer, alpha=cfg.distill_alpha, temperature=cfg.distill_temperature
+        )
+    trainer = trainer_cls(
         model=model,
         args=args,
-        train_dataset=tokenized,
-        data_collator=collator,
+        train_dataset=data.dataset,
+        data_collator=data.collator,
+        train_batch_sampler=data.batch_sampler,
+        telemetry=telemetry,
+        checkpoint_manager=CheckpointManager(
+            run_dir / "checkpoints", keep_last=cfg.save_total_limit, adapter_only=cfg.use_lora
+        ),
     )
 
-    train_result = trainer.train()
+    # loading (mmapped checkpoint + dtype conversion) peaks above steady state; track it apart
+    load_peak_rss_mb = peak_rss_mb()
+    peak_reset = reset_peak_rss()
+
+    # HF restores weights, optimizer, scheduler, RNG and trainer state, then fast-forwards the
+    # data: map-style datasets skip at the batch-sampler level (index lists only, no example
+    # is loaded), streams are re-read up to the checkpoint.
+    train_result = trainer.train(resume_from_checkpoint=str(resume_from) if resume_from else None)
+    if not main:
+        return run_dir
 
     metrics = train_result.metrics
     metrics["model_name"] = cfg.model_name
     metrics["torch_version"] = torch.__version__
+    metrics["world_size"] = world
+    metrics["threads_per_process"] = torch.get_num_threads()
+    metrics["packing"] = cfg.packing
+    metrics["padding"] = cfg.padding
+    metrics["group_by_length"] = cfg.group_by_length
+    metrics["resumed_from"] = str(resume_from) if resume_from else None
+    metrics.update(data.stats)
+    if cfg.packing:
+        pad_key = "padding_fraction_packed"
+    elif cfg.padding == "dynamic":
+        pad_key = "padding_fraction_dynamic"
+    else:
+        pad_key = "padding_fraction_max_length"
+    if pad_key in data.stats:
+        # real (non-pad) tokens per sample; packed blocks are max_seq_length slots wide
+        if cfg.packing:
+            real_per_sample = cfg.max_seq_length * (1.0 - data.stats[pad_key])
+        else:
+            kept = data.stats["tokens"] - data.stats.get("truncated_tokens_max_length", 0)
+            real_per_sample = kept / data.stats["docs"]
+        metrics["padding_fraction"] = data.stats[pad_key]
+        metrics["train_tokens_per_second"] = metrics["train_samples_per_second"] * real_per_sample
+    if telemetry is not None:
+        metrics["step_telemetry"] = telemetry.summary()
+    metrics["gradient_checkpointing"] = cfg.gradient_checkpointing
+    metrics["perf"] = {
+        "bf16_autocast": cfg.bf16_autocast,
+        "torch_compile": cfg.torch_compile,
+        "fused_optimizer": fused_optimizer,
+        **thread_settings,
+    }
+    metrics["load_peak_rss_mb"] = load_peak_rss_mb
+    # training-phase peak where the high-water mark can be reset, else the process peak
+    metrics["peak_rss_mb"] = peak_rss_mb() if peak_reset else max(load_peak_rss_mb, peak_rss_mb())
+    if cfg.use_lora:
+        metrics["lora_base_dtype"] = cfg.lora_base_dtype
+        lora_info["memory"] = {
+            "frozen_param_bytes": param_bytes(model, trainable=False),
+            "trainable_param_bytes": param_bytes(model, trainable=True),
+            "gradient_checkpointing": cfg.gradient_checkpointing,
+            "peak_rss_mb": metrics["peak_rss_mb"],
+            "load_peak_rss_mb": load_peak_rss_mb,
+            "step_time_s_mean": metrics.get("step_telemetry", {}).get("step_time_s_mean"),
+        }
     write_json(run_dir / "metrics.json", metrics)
     write_json(run_dir / "lora.json", lora_info)
 
-    # Save final model (small models only; in bigger runs you will save checkpoints)
-    final_dir = run_dir / "final_model"
-    final_dir.mkdir(parents=True, exist_ok=True)
-    trainer.save_model(str(final_dir))
-    tokenizer.save_pretrained(str(final_dir))
-
-    if cfg.use_lora:
-        # Save adapter weights only
-        adapter_dir = run_dir / "lora_adapter"
-        adapter_dir.mkdir(parents=True, exist_ok=True)
-        model.save_pretrained(str(adapter_dir))
-
-        # Optionally save merged model for downstream eval/inference
-        if cfg.save_merged and hasattr(model, "merge_and_unload"):
-            merged = model.merge_and_unload()
-            merged_dir = run_dir / "final_model_merged"
-            merged_dir.mkdir(parents=True, exist_ok=True)
-            merged.save_pretrained(str(merged_dir))
-            tokenizer.save_pretrained(str(merged_dir))
-    else:
-        # Save full fine-tuned model
-        final_dir = run_dir / "final_model"
-        final_dir.mkdir(parents=True, exist_ok=True)
-        trainer.save_model(str(final_dir))
-
+    if use_cache is not None:
+        model.config.use_cache = use_cache  # the saved model generates with a KV cache again
+    save_final_model(
+        trainer, tokenizer, run_dir, use_lora=cfg.use_lora, save_merged=cfg.save_merged
+    )
     return run_dir
@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+from dataclasses import fields, replace
+from pathlib import Path
+from typing import Any
+
+import torch
+
+from frontier_ml_stack.models.loading import load_causal_lm, load_tokenizer
+from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.launch import available_cores
+from frontier_ml_stack.training.run_artifacts import prepare_run_dir, write_json
+from frontier_ml_stack.training.sft import TrainData, _build_train_dataset, run_sft
+
+# Fields that decide the tokenized training data; runs agreeing on them share one build.
+DATA_FIELDS = (
+    "train_records",
+    "train_mixture",
+    "mixture_shuffle_buffer",
+    "streaming",
+    "streaming_shuffle_buffer",
+    "dataloader_num_workers",
+    "train_token_store",
+    "packing",
+    "packing_reset_boundaries",
+    "padding",
+    "group_by_length",
+    "length_bucket_multiplier",
+    "per_device_train_batch_size",
+    "max_seq_length",
+    "seed",
+    "distill_teacher_logits",
+)
+
+# Never swept: the sweep names the runs and owns the output layout.
+_RESERVED = {"run_name", "output_dir", "resume"}
+
+_FIELD_TYPES = {f.name: f.type for f in fields(SFTConfig)}
+
+# Set in the parent before the pool forks; children read them copy-on-write.
+_SHARED: dict[str, Any] = {}
+
+
+def _coerce(name: str, raw: Any) -> Any:
+    if name not in _FIELD_TYPES:
+        raise ValueError(f"unknown SFTConfig field {name!r}")
+    if name in _RESERVED:
+        raise ValueError(f"{name!r} is set by the sweep runner")
+    if not isinstance(raw, str):
+        return raw
+    kind = _FIELD_TYPES[name]
+    if kind == "bool":
+        if raw.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"{name}: expected a bool (got {raw!r})")
+        return raw.lower() in ("true", "1")
+    if kind == "int":
+        return int(raw)
+    if kind == "float":
+        return float(raw)
+    return raw
+
+
+def parse_assignments(items: list[str]) -> dict[str, Any]:
+    """
+    ["learning_rate=1e-4", "use_lora=true"] -> typed overrides.
+    """
+    out: dict[str, Any] = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"expected key=value (got {item!r})")
+        out[key.strip()] = _coerce(key.strip(), value.strip())
+    return out
+
+
+def parse_grid(items: list[str]) -> dict[str, list[Any]]:
+    """
+    ["learning_rate=1e-4,5e-5", "lora_r=4,8"] -> {"learning_rate": [...], "lora_r": [...]}.
+    """
+    grid: dict[str, list[Any]] = {}
+    for item in items:
+        key, sep, values = item.partition("=")
+        if not sep or not values:
+            raise ValueError(f"expected key=v1,v2,... (got {item!r})")
+        key = key.strip()
+        grid[key] = [_coerce(key, v.strip()) for v in values.split(",")]
+    return grid
+
+
+def expand_grid(grid: dict[str, list[Any]]) -> list[dict[str, Any]]:
+    """
+    Cartesian product of the grid, in key order (last key varies fastest).
+    """
+    if not grid:
+        return []
+    keys = list(grid)
+    return [dict(zip(keys, combo, strict=True)) for combo in itertools.product(*grid.values())]
+
+
+def load_override_list(path: Path) -> list[dict[str, Any]]:
+    """
+    JSON list of override objects, one per run.
+    """
+    items = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(items, list) or not all(isinstance(x, dict) for x in items):
+        raise ValueError(f"{path}: expected a JSON list of objects")
+    return [{k: _coerce(k, v) for k, v in x.items()} for x in items]
+
+
+def _data_key(cfg: SFTConfig) -> tuple:
+    return tuple(getattr(cfg, f) for f in DATA_FIELDS)
+
+
+def _run_one(job: tuple[SFTConfig, dict[str, Any], int]) -> dict[str, Any]:
+    cfg, overrides, threads = job
+    torch.set_num_threads(threads)
+    row: dict[str, Any] = {"run_name": cfg.run_name, "overrides": overrides}
+    t0 = time.perf_counter()
+    try:
+        model = _SHARED["model"] if cfg.model_name == _SHARED["model_name"] else None
+        tokenizer = _SHARED["tokenizer"] if model is not None else None
+        data = _SHARED["data"].get(_data_key(cfg)) if tokenizer is not None else None
+        run_dir = run_sft(cfg, tokenizer=tokenizer, model=model, data=data)
+        metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+        row.update(
+            status="ok",
+            run_dir=str(run_dir),
+            shared_model=model is not None,
+            shared_data=data is not None,
+            train_loss=metrics.get("train_loss"),
+            train_runtime=metrics.get("train_runtime"),
+            train_samples_per_second=metrics.get("train_samples_per_second"),
+            train_tokens_per_second=metrics.get("train_tokens_per_second"),
+            peak_rss_mb=metrics.get("peak_rss_mb"),
+        )
+    except Exception as e:  # one bad config must not take down the sweep
+        row.update(status="failed", error=f"{type(e).__name__}: {e}")
+        row["traceback"] = traceback.format_exc()
+    row["wall_s"] = time.perf_counter() - t0
+    return row
+
+
+def _child(index: int, job: tuple, results) -> None:
+    results.put((index, _run_one(job)))
+
+
+def _run_pool(jobs: list[tuple], procs: int) -> list[dict[str, Any]]:
+    """
+    Fork one process per job, at most `procs` at a time; rows come back in job order.
+
+    Not a multiprocessing.Pool: its workers are daemonic and may not start DataLoader workers.
+    """
+    ctx = mp.get_context("fork")
+    results = ctx.Queue()
+    rows: list[dict[str, Any] | None] = [None] * len(jobs)
+    running: dict[int, Any] = {}
+    pending = list(enumerate(jobs))
+
+    while pending or running:
+        while pending and len(running) < procs:
+            index, job = pending.pop(0)
+            proc = ctx.Process(target=_child, args=(index, job, results))
+            proc.start()
+            running[index] = proc
+        try:
+            index, row = results.get(timeout=1.0)
+        except queue.Empty:
+            # a child killed outright (e.g. by the OOM killer) never reports back
+            for index, proc in list(running.items()):
+                if not proc.is_alive() and proc.exitcode != 0:
+                    running.pop(index)
+                    cfg, overrides, _ = jobs[index]
+                    rows[index] = {
+                        "run_name": cfg.run_name,
+                        "overrides": overrides,
+                        "status": "failed",
+                        "error": f"worker exited with code {proc.exitcode}",
+                    }
+            continue
+        # a child can queue its row and then die; if it was marked failed in the meantime,
+        # its own row arrives late and replaces that placeholder
+        proc = running.pop(index, None)
+        if proc is not None:
+            proc.join()
+        rows[index] = row
+
+    return rows
+
+
+def sweep_table(rows: list[dict[str, Any]]) -> str:
+    """
+    Markdown comparison table, best train_loss first (failed runs last).
+    """
+    keys = sorted({k for r in rows for k in r["overrides"]})
+    ok = sorted((r for r in rows if r["status"] == "ok"), key=lambda r: r["train_loss"])
+    failed = [r for r in rows if r["status"] != "ok"]
+
+    def fmt(v: Any) -> str:
+        if v is None:
+            return "-"
+        return f"{v:.4g}" if isinstance(v, float) else str(v)
+
+    header = ["run", *keys, "train_loss", "samples/s", "tokens/s", "peak RSS MiB", "wall s"]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for r in ok + failed:
+        loss = fmt(r.get("train_loss")) if r["status"] == "ok" else "failed"
+        cells = [
+            r["run_name"],
+            *(fmt(r["overrides"].get(k)) for k in keys),
+            loss,
+            fmt(r.get("train_samples_per_second")),
+            fmt(r.get("train_tokens_per_second")),
+            fmt(r.get("peak_rss_mb")),
+            fmt(r.get("wall_s")),
+        ]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def run_sweep(
+    base: SFTConfig,
+    override_list: list[dict[str, Any]],
+    *,
+    sweep_name: str,
+    max_procs: int = 0,
+) -> Path:
+    """
+    Run one SFT job per override dict, up to `max_procs` (default: one per core) at a time.
+
+    The parent loads the tokenizer, the fp32 base model and the tokenized data once; each run
+    is a fresh fork of it, so these are shared copy-on-write (a LoRA run only allocates its
+    adapters and activations) and every run starts from the pristine base. Writes sweep.json
+    and sweep.md to the sweep dir.
+    """
+    if not override_list:
+        raise ValueError("sweep has no runs (empty grid and override list)")
+
+    sweep_dir = prepare_run_dir(Path(base.output_dir), sweep_name)
+    cfgs = [
+        replace(base, **o, run_name=f"run-{i:03d}", output_dir=str(sweep_dir))
+        for i, o in enumerate(override_list)
+    ]
+
+    cores = available_cores()
+    procs = max(1, min(len(cfgs), max_procs or cores))
+    threads = max(1, cores // procs)
+
+    # fast tokenizers would warn and disable their thread pool in every forked child
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    tokenizer = load_tokenizer(base.model_name)
+    data: dict[tuple, TrainData] = {}
+    build_errors: dict[tuple, dict[str, str]] = {}
+    for cfg in cfgs:
+        key = _data_key(cfg)
+        if cfg.model_name != base.model_name or key in data or key in build_errors:
+            continue
+        try:
+            data[key] = _build_train_dataset(cfg, tokenizer)
+        except Exception as e:  # fails the runs that need this data, as _run_one would
+            build_errors[key] = {
+                "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(),
+            }
+    _SHARED.update(
+        model_name=base.model_name,
+        tokenizer=tokenizer,
+        model=load_causal_lm(base.model_name),
+        data=data,
+    )
+
+    # runs whose shared data failed to build are recorded as failed without being started
+    errors = [
+        build_errors.get(_data_key(cfg)) if cfg.model_name == base.model_name else None
+        for cfg in cfgs
+    ]
+    jobs = [
+        (cfg, o, threads)
+        for cfg, o, error in zip(cfgs, override_list, errors, strict=True)
+        if error is None
+    ]
+    t0 = time.perf_counter()
+    try:
+        ran = iter(_run_pool(jobs, procs))
+    finally:
+        _SHARED.clear()
+    rows = [
+        next(ran)
+        if error is None
+        else {"run_name": cfg.run_name, "overrides": o, "status": "failed", **error}
+        for cfg, o, error in zip(cfgs, override_list, errors, strict=True)
+    ]
+
+    summary = {
+        "sweep_name": sweep_name,
+        "processes": procs,
+        "threads_per_process": threads,
+        "wall_s": time.perf_counter() - t0,
+        "shared_data_builds": len(data),
+        "runs": rows,
+    }
+    write_json(sweep_dir / "sweep.json", summary)
+    (sweep_dir / "sweep.md").write_text(sweep_table(rows), encoding="utf-8")
+    return sweep_dir
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Any
+
+import torch
+from transformers import TrainerCallback
+
+from frontier_ml_stack.training.dist import all_reduce_sum
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+from frontier_ml_stack.utils.memory import peak_rss_mb
+
+
+def count_real_tokens(inputs: dict[str, Any]) -> int:
+    """
+    Non-pad tokens in a collated batch.
+
+    Uses the attention mask when present; packed blocks with reset boundaries carry none, so
+    supervised labels are counted instead (this misses one token per document).
+    """
+    if inputs.get("attention_mask") is not None:
+        return int(inputs["attention_mask"].sum())
+    if inputs.get("labels") is not None:
+        return int((inputs["labels"] != IGNORE_INDEX).sum())
+    return int(inputs["input_ids"].numel())
+
+
+class StepTelemetryCallback(TrainerCallback):
+    """
+    Per-optimizer-step timing, throughput and memory, streamed to step_metrics.jsonl.
+
+    Phases per step (HF Trainer fetches all micro-batches before `on_step_begin`):
+      - data_wait_s: previous step end -> step begin (batch fetch/collate, logging,
+        checkpoint snapshots)
+      - compute_s: step begin -> pre-optimizer (forward/backward, grad clipping)
+      - optimizer_s: optimizer.step()
+    Optionally records a torch profiler trace for a window of steps.
+
+    In data-parallel runs it runs on every rank (token counts are summed over ranks each
+    step); only the rank given an `out_path` writes.
+    """
+
+    def __init__(
+        self,
+        out_path: Path | None,
+        *,
+        profile_dir: Path | None = None,
+        profile_start_step: int = 0,
+        profile_num_steps: int = 0,
+    ) -> None:
+        self.out_path = out_path
+        self.profile_dir = profile_dir
+        self.profile_start_step = profile_start_step
+        self.profile_num_steps = profile_num_steps
+
+        self.records: list[dict[str, Any]] = []
+        self._tokens = 0
+        self._t_prev_end = 0.0
+        self._t_begin = 0.0
+        self._t_pre_opt: float | None = None
+        self._t_post_opt: float | None = None
+        self._f = None
+        self._profiler: torch.profiler.profile | None = None
+
+    def record_batch(self, inputs: dict[str, Any]) -> None:
+        self._tokens += count_real_tokens(inputs)
+
+    # --- TrainerCallback hooks ---
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        self._t_prev_end = time.perf_counter()
+        if self.out_path is None:
+            return
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        if state.global_step > 0 and self.out_path.exists():
+            # resumed run: drop steps after the checkpoint, they are about to be redone
+            lines = self.out_path.read_text(encoding="utf-8").splitlines(keepends=True)
+            kept = [
+                x for x in lines if x.endswith("\n") and json.loads(x)["step"] <= state.global_step
+            ]
+            self.out_path.write_text("".join(kept), encoding="utf-8")
+        self._f = self.out_path.open("a", encoding="utf-8")
+        self._t_prev_end = time.perf_counter()
+
+    def on_step_begin(self, args, state, control, **kwargs):
+        if self.profile_num_steps > 0 and state.global_step == self.profile_start_step:
+            self._profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+            )
+            self._profiler.__enter__()
+        self._t_begin = time.perf_counter()
+        self._t_pre_opt = None
+        self._t_post_opt = None
+
+    def on_pre_optimizer_step(self, args, state, control, **kwargs):
+        self._t_pre_opt = time.perf_counter()
+
+    def on_optimizer_step(self, args, state, control, **kwargs):
+        self._t_post_opt = time.perf_counter()
+
+    def on_step_end(self, args, state, control, **kwargs):
+        now = time.perf_counter()
+        t_pre = self._t_pre_opt if self._t_pre_opt is not None else now
+        t_post = self._t_post_opt if self._t_post_opt is not None else now
+        wall = now - self._t_prev_end
+        tokens = all_reduce_sum(self._tokens)
+
+        rec = {
+            "step": state.global_step,
+            "wall_s": wall,
+            "data_wait_s": self._t_begin - self._t_prev_end,
+            "compute_s": t_pre - self._t_begin,
+            "optimizer_s": t_post - t_pre,
+            "tokens": tokens,
+            "tokens_per_s": tokens / wall if wall > 0 else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        self.records.append(rec)
+        if self._f is not None:
+            self._f.write(json.dumps(rec) + "\n")
+            self._f.flush()
+
+        if self._profiler is not None and (
+            state.global_step >= self.profile_start_step + self.profile_num_steps
+        ):
+            self._stop_profiler()
+
+        self._tokens = 0
+        # measured last so this bookkeeping is not charged to the step
+        self._t_prev_end = time.perf_counter()
+
+    def on_train_end(self, args, state, control, **kwargs):
+        self._stop_profiler()
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    # --- helpers ---
+
+    def _stop_profiler(self) -> None:
+        if self._profiler is None:
+            return
+        prof, self._profiler = self._profiler, None
+        prof.__exit__(None, None, None)
+        if self.profile_dir is not None and self.out_path is not None:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            prof.export_chrome_trace(str(self.profile_dir / "trace.json"))
+            table = prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=30)
+            (self.profile_dir / "summary.txt").write_text(table, encoding="utf-8")
+
+    def summary(self) -> dict[str, Any]:
+        """
+        Aggregate over recorded steps; the first step is excluded as warmup when possible.
+        """
+        recs = self.records[1:] if len(self.records) > 1 else self.records
+        if not recs:
+            return {}
+
+        wall = sum(r["wall_s"] for r in recs)
+        tokens = sum(r["tokens"] for r in recs)
+        return {
+            "steps": len(recs),
+            "warmup_steps_excluded": len(self.records) - len(recs),
+            "step_time_s_mean": wall / len(recs),
+            "step_time_s_median": statistics.median(r["wall_s"] for r in recs),
+            "data_wait_fraction": sum(r["data_wait_s"] for r in recs) / wall if wall else 0.0,
+            "compute_fraction": sum(r["compute_s"] for r in recs) / wall if wall else 0.0,
+            "optimizer_fraction": sum(r["optimizer_s"] for r in recs) / wall if wall else 0.0,
+            "tokens_per_second": tokens / wall if wall else 0.0,
+            "peak_rss_mb": max(r["peak_rss_mb"] for r in self.records),
+        }
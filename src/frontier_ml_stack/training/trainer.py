@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import datasets
+import torch
+from torch.utils.data import DataLoader
+from transformers import Trainer
+
+from frontier_ml_stack.training.checkpoint import CheckpointManager, rng_state
+from frontier_ml_stack.training.dist import all_gather_objects
+from frontier_ml_stack.training.distill import topk_kd_loss
+from frontier_ml_stack.training.preference import dpo_loss, sequence_logps
+from frontier_ml_stack.training.telemetry import StepTelemetryCallback
+
+
+class SFTTrainer(Trainer):
+    """
+    HF Trainer with an optional custom batch sampler, per-step telemetry and background
+    checkpointing.
+    """
+
+    def __init__(
+        self,
+        *args,
+        train_batch_sampler: torch.utils.data.Sampler | None = None,
+        telemetry: StepTelemetryCallback | None = None,
+        checkpoint_manager: CheckpointManager | None = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.train_batch_sampler = train_batch_sampler
+        self.checkpoint_manager = checkpoint_manager
+        self.telemetry = telemetry
+        if telemetry is not None:
+            self.add_callback(telemetry)
+
+    def training_step(self, model, inputs, *args, **kwargs):
+        # callbacks never see the batch, so real-token counts are taken here
+        if self.telemetry is not None:
+            self.telemetry.record_batch(inputs)
+        return super().training_step(model, inputs, *args, **kwargs)
+
+    def train(self, *args, **kwargs):
+        try:
+            return super().train(*args, **kwargs)
+        finally:
+            if self.checkpoint_manager is not None:
+                self.checkpoint_manager.wait()
+
+    def _save_checkpoint(self, model, trial, *args, **kwargs) -> None:
+        # HF decides when to save (save_steps); the manager decides how
+        if self.checkpoint_manager is None:
+            return super()._save_checkpoint(model, trial, *args, **kwargs)
+        # collective: every rank contributes its RNG state, rank 0 writes the checkpoint
+        rng_states = all_gather_objects(rng_state())
+        if not self.is_world_process_zero():
+            return
+        self.checkpoint_manager.save(
+            self.state.global_step,
+            model=self.model,
+            optimizer=self.optimizer,
+            scheduler=self.lr_scheduler,
+            state=self.state,
+            rng_states=rng_states,
+        )
+
+    def get_train_dataloader(self) -> DataLoader:
+        if self.train_batch_sampler is None:
+            return super().get_train_dataloader()
+
+        dataset = self.train_dataset
+        collator = self.data_collator
+        if isinstance(dataset, datasets.Dataset):
+            dataset = self._remove_unused_columns(dataset, description="training")
+        else:
+            collator = self._get_collator_with_removed_columns(collator, description="training")
+
+        loader = DataLoader(
+            dataset,
+            batch_sampler=self.train_batch_sampler,
+            collate_fn=collator,
+            num_workers=self.args.dataloader_num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+            persistent_workers=self.args.dataloader_persistent_workers,
+            prefetch_factor=self.args.dataloader_prefetch_factor,
+        )
+        return self.accelerator.prepare(loader)
+
+
+class DPOTrainer(SFTTrainer):
+    """
+    DPO on batches from `collate_pairs`: only the policy runs, reference log-probs come with
+    the batch (precomputed by `ReferenceLogpCache`).
+    """
+
+    def __init__(self, *args, beta: float, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.beta = beta
+        self._reward_sums: dict[str, float] = {}
+        self._reward_pairs = 0
+
+    def compute_loss(self, model, inputs, return_outputs=False, num_items_in_batch=None):
+        outputs = model(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"])
+        policy_logps = sequence_logps(outputs.logits, inputs["labels"])
+        loss, rewards = dpo_loss(policy_logps, inputs["ref_logps"], self.beta)
+
+        sums = {
+            "rewards/chosen": rewards["chosen"].sum(),
+            "rewards/rejected": rewards["rejected"].sum(),
+            "rewards/margin": rewards["margin"].sum(),
+            "rewards/accuracy": (rewards["margin"] > 0).float().sum(),
+        }
+        for k, v in sums.items():
+            self._reward_sums[k] = self._reward_sums.get(k, 0.0) + float(v)
+        self._reward_pairs += rewards["margin"].numel()
+        return (loss, outputs) if return_outputs else loss
+
+    def log(self, logs: dict[str, float], *args, **kwargs) -> None:
+        # reward stats averaged over the pairs seen since the previous log
+        if "loss" in logs and self._reward_pairs:
+            logs.update({k: v / self._reward_pairs for k, v in self._reward_sums.items()})
+            self._reward_sums, self._reward_pairs = {}, 0
+        super().log(logs, *args, **kwargs)
+
+
+class DistillTrainer(SFTTrainer):
+    """
+    Student training on batches from `collate_distill`:
+    loss = alpha * top-k KD against the stored teacher logits + (1 - alpha) * LM loss.
+    """
+
+    def __init__(self, *args, alpha: float, temperature: float, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.alpha = alpha
+        self.temperature = temperature
+
+    def compute_loss(self, model, inputs, return_outputs=False, num_items_in_batch=None):
+        teacher_logits = inputs.pop("teacher_logits")
+        teacher_ids = inputs.pop("teacher_ids")
+        outputs = model(**inputs)
+        kd = topk_kd_loss(
+            outputs.logits,
+            teacher_logits,
+            teacher_ids,
+            inputs["labels"],
+            temperature=self.temperature,
+        )
+        loss = self.alpha * kd + (1.0 - self.alpha) * outputs.loss
+        return (loss, outputs) if return_outputs else loss
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+
+def write_json_atomic(path: Path, obj: Any) -> None:
+    """
+    Write `obj` as JSON so readers see the old file or the new one, never a partial write.
+    The temp name carries the pid, so concurrent writers don't clobber each other's temp file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, indent=2, sort_keys=True, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def record_progress(path: Path, done: int, *arrays: np.memmap) -> None:
+    """
+    Flush `arrays`, then record that their first `done` rows are written. The flush comes
+    first so progress never claims rows that are not on disk yet.
+    """
+    for a in arrays:
+        a.flush()
+    write_json_atomic(path, {"done": done})
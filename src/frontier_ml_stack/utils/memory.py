@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import resource
+import sys
+from pathlib import Path
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process so far, in MiB.
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, KiB on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the peak-RSS high-water mark (Linux only), e.g. so model loading doesn't mask
+    the training peak. Returns False where unsupported.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return False
+    return True
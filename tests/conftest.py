@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+from frontier_ml_stack.training.config import SFTConfig
+
+TINY_GPT2 = {
+    "vocab_size": 32,
+    "n_positions": 64,
+    "n_embd": 16,
+    "n_layer": 1,
+    "n_head": 2,
+    "bos_token_id": 0,
+    "eos_token_id": 0,
+}
+
+# one token per character: "<eos>" = 0, "a".."z" = 1..26, " " = 27
+CHAR_VOCAB = {"<eos>": 0, **{chr(c): c - 96 for c in range(97, 123)}, " ": 27}
+
+
+def _tiny_gpt2(*, seed: int = 0, **config: Any) -> GPT2LMHeadModel:
+    torch.manual_seed(seed)
+    return GPT2LMHeadModel(GPT2Config(**{**TINY_GPT2, **config})).eval()
+
+
+def _save_tiny_model(model_dir: Path, *, seed: int = 0, **config: Any) -> Path:
+    backend = Tokenizer(models.WordLevel(CHAR_VOCAB, unk_token="<eos>"))
+    backend.pre_tokenizer = pre_tokenizers.Split("", behavior="isolated")
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<eos>")
+    _tiny_gpt2(seed=seed, **config).save_pretrained(str(model_dir))
+    tokenizer.save_pretrained(str(model_dir))
+    return model_dir
+
+
+@pytest.fixture
+def tiny_gpt2() -> Callable[..., GPT2LMHeadModel]:
+    """
+    Builder of a seeded random GPT-2 in eval mode; keyword arguments override `TINY_GPT2`.
+    """
+    return _tiny_gpt2
+
+
+@pytest.fixture
+def save_tiny_model() -> Callable[..., Path]:
+    """
+    Saver of a tiny GPT-2 plus a character-level tokenizer (`CHAR_VOCAB`) to a model dir.
+    """
+    return _save_tiny_model
+
+
+@pytest.fixture
+def tiny_model_dir(tmp_path: Path) -> Path:
+    """
+    `tmp_path / "model"`, holding a tiny GPT-2 and its character-level tokenizer.
+    """
+    return _save_tiny_model(tmp_path / "model")
+
+
+@pytest.fixture
+def tiny_sft_config(tmp_path: Path, tiny_model_dir: Path) -> Callable[..., SFTConfig]:
+    """
+    Builder of a one-step SFT run of the tiny model on twelve short text records (written to
+    `tmp_path`); keyword arguments override the config fields.
+    """
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(
+            json.dumps({"id": str(i), "text": "abc de " * (i % 4 + 1) + "xyz"}) + "\n"
+            for i in range(12)
+        ),
+        encoding="utf-8",
+    )
+
+    def build(**overrides: Any) -> SFTConfig:
+        settings = {
+            "run_name": "run",
+            "model_name": str(tiny_model_dir),
+            "train_records": str(records),
+            "output_dir": str(tmp_path / "runs"),
+            "max_steps": 1,
+            "max_seq_length": 16,
+            "per_device_train_batch_size": 2,
+            "learning_rate": 1e-2,
+            **overrides,
+        }
+        return SFTConfig(**settings)
+
+    return build
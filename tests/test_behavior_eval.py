@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import torch
+
+from frontier_ml_stack.eval.scorers import score_completion, validate_scorer
+from frontier_ml_stack.eval.suites.behavior_eval import (
+    PromptCase,
+    eval_behavior,
+    generate_completions,
+    left_pad,
+    load_prompt_suite,
+    run_prompt_suite,
+)
+from frontier_ml_stack.models.loading import LoadedModel, LoadStats
+from frontier_ml_stack.models.registry import ModelRegistry
+
+# characters map to 2 + ord(c) % 30 (see _CharTokenizer); 1 is EOS
+_GPT2 = {"vocab_size": 40, "n_layer": 2, "bos_token_id": 1, "eos_token_id": 1}
+
+
+class _CharTokenizer:
+    pad_token_id = 0
+    eos_token_id = 1
+
+    def __call__(self, texts: list[str]) -> dict[str, list[list[int]]]:
+        return {"input_ids": [[2 + ord(c) % 30 for c in t] for t in texts]}
+
+    def batch_decode(self, rows: torch.Tensor, skip_special_tokens: bool = True) -> list[str]:
+        special = {self.pad_token_id, self.eos_token_id}
+        return [" ".join(str(t) for t in row.tolist() if t not in special) for row in rows]
+
+
+def test_left_pad_aligns_prompt_ends() -> None:
+    batch = left_pad([[5, 6, 7], [8]], pad_token_id=0)
+    assert batch["input_ids"].tolist() == [[5, 6, 7], [0, 0, 8]]
+    assert batch["attention_mask"].tolist() == [[1, 1, 1], [0, 0, 1]]
+
+
+def test_batched_greedy_generation_matches_one_at_a_time(tiny_gpt2) -> None:
+    model = tiny_gpt2(**_GPT2)
+    tok = _CharTokenizer()
+    prompts = ["hello there", "a", "what is the answer?", "xyz", "left padding matters"]
+
+    kwargs = {"max_new_tokens": 6, "temperature": 0.0}
+    batched, n_batched = generate_completions(model, tok, prompts, batch_size=3, **kwargs)
+    single, n_single = generate_completions(model, tok, prompts, batch_size=1, **kwargs)
+    assert batched == single
+    assert n_batched == n_single and all(n > 0 for n in n_batched)
+    assert all(c for c in batched)
+
+
+def test_scorers_and_suite_validation(tmp_path) -> None:
+    scorers = [
+        {"type": "refusal"},
+        {"type": "json_object", "keys": ["name"]},
+        {"type": "regex", "pattern": "^I", "name": "starts_with_i"},
+        {"type": "not_contains", "any": ["bomb"], "flag": "unsafe"},
+    ]
+    for spec in scorers:
+        validate_scorer(spec)
+    passed, flags = score_completion(scorers, "I cannot help with a bomb.")
+    assert passed == {
+        "refusal": True,
+        "json_object": False,
+        "starts_with_i": True,
+        "not_contains": False,
+    }
+    assert flags == ["bad_json_format", "unsafe"]
+    assert score_completion(scorers[1:2], '{"name": "x", "age": 3}') == ({"json_object": True}, [])
+
+    with pytest.raises(ValueError, match="type"):
+        validate_scorer({"type": "vibes"})
+    with pytest.raises(ValueError, match="pattern"):
+        validate_scorer({"type": "regex"})
+
+    path = tmp_path / "suite.jsonl"
+    path.write_text(
+        json.dumps({"id": "a", "prompt": "p", "scorers": [{"type": "refusal"}]})
+        + "\n"
+        + json.dumps({"id": "a", "prompt": "q"})
+        + "\n",
+        encoding="utf-8",
+    )
+    with pytest.raises(ValueError, match="duplicate"):
+        load_prompt_suite(path)
+    path.write_text(json.dumps({"id": "a", "prompt": "p", "scorers": [{}]}), encoding="utf-8")
+    with pytest.raises(ValueError, match=":1"):
+        load_prompt_suite(path)
+
+
+class _Interrupt(Exception):
+    pass
+
+
+def test_prompt_suite_resumes_from_checkpointed_batches(tmp_path, tiny_gpt2) -> None:
+    model = tiny_gpt2(**_GPT2)
+
+    def load(model_path: str, *, dtype=None) -> LoadedModel:
+        stats = LoadStats(weights_format="hub", load_s=0.0, peak_rss_mb=0.0)
+        return LoadedModel(model_path, _CharTokenizer(), model, stats)
+
+    registry = ModelRegistry(loader=load)
+    cases = [
+        PromptCase(id=f"p{i}", prompt="tell me " * (i + 1), scorers=({"type": "refusal"},))
+        for i in range(5)
+    ]
+    kwargs = {"batch_size": 2, "max_new_tokens": 4, "temperature": 0.0, "registry": registry}
+    full = run_prompt_suite("tiny", cases, out_dir=tmp_path / "full", **kwargs)
+
+    calls = {"n": 0}
+    generate = model.generate
+
+    def flaky_generate(*args, **kw):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise _Interrupt
+        return generate(*args, **kw)
+
+    model.generate = flaky_generate
+    with pytest.raises(_Interrupt):
+        run_prompt_suite("tiny", cases, out_dir=tmp_path / "run", **kwargs)
+    resumed = run_prompt_suite("tiny", cases, out_dir=tmp_path / "run", resume=True, **kwargs)
+    assert resumed["resumed"] == 2
+    assert resumed["rows"] == full["rows"]
+
+    with pytest.raises(ValueError, match="max_new_tokens"):
+        run_prompt_suite(
+            "tiny", cases, out_dir=tmp_path / "run", resume=True, **{**kwargs, "max_new_tokens": 5}
+        )
+
+
+def test_sharded_workers_match_in_process(tmp_path, save_tiny_model) -> None:
+    model_dir = save_tiny_model(tmp_path / "model", **_GPT2)
+
+    prompts = tmp_path / "suite.jsonl"
+    prompts.write_text(
+        "".join(
+            json.dumps(
+                {"id": f"p{i}", "prompt": "abc " * (i % 4 + 1), "scorers": [{"type": "refusal"}]}
+            )
+            + "\n"
+            for i in range(6)
+        ),
+        encoding="utf-8",
+    )
+    kwargs = {
+        "model_path": str(model_dir),
+        "max_prompts": 0,
+        "max_new_tokens": 3,
+        "temperature": 0.0,
+        "prompts_path": prompts,
+        "registry": ModelRegistry(),
+    }
+    local = eval_behavior(**kwargs, out_dir=tmp_path / "local")
+    sharded = eval_behavior(**kwargs, out_dir=tmp_path / "sharded", num_workers=2)
+    assert sharded.n_prompts == 6
+    assert [s.completion for s in sharded.samples] == [s.completion for s in local.samples]
+    assert len(list((tmp_path / "sharded").glob("samples-000-*.jsonl"))) == 2
+    assert sharded.scores["refusal"]["total"] == 6
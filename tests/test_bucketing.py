@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import random
+
+from frontier_ml_stack.training.bucketing import (
+    LengthBucketBatchSampler,
+    batch_padding_fraction,
+    random_batches,
+)
+from frontier_ml_stack.training.sft import run_sft
+
+_rng = random.Random(0)
+LENGTHS = [_rng.randint(1, 256) for _ in range(1000)]
+
+
+def test_length_bucket_sampler_is_seeded_and_covers_all_indices() -> None:
+    a = LengthBucketBatchSampler(LENGTHS, batch_size=8, seed=3, bucket_multiplier=10)
+    b = LengthBucketBatchSampler(LENGTHS, batch_size=8, seed=3, bucket_multiplier=10)
+
+    batches = list(a)
+    assert batches == list(b)
+    assert len(batches) == len(a)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(LENGTHS)))
+
+
+def test_length_bucket_sampler_changes_order_per_epoch() -> None:
+    s = LengthBucketBatchSampler(LENGTHS, batch_size=8, seed=3)
+    s.set_epoch(0)
+    first = s.batches()
+    s.set_epoch(1)
+    assert s.batches() != first
+
+    # iterating without set_epoch() advances the epoch on its own
+    s2 = LengthBucketBatchSampler(LENGTHS, batch_size=8, seed=3)
+    assert list(s2) == first
+    s.set_epoch(1)
+    assert list(s2) == s.batches()
+
+
+def test_length_bucketing_reduces_padding() -> None:
+    bucketed = LengthBucketBatchSampler(LENGTHS, batch_size=8, seed=0).batches()
+    unbucketed = random_batches(len(LENGTHS), batch_size=8, seed=0)
+
+    assert batch_padding_fraction(LENGTHS, bucketed) < batch_padding_fraction(LENGTHS, unbucketed)
+
+
+def test_drop_last_len() -> None:
+    s = LengthBucketBatchSampler(list(range(1, 22)), batch_size=4, seed=0, drop_last=True)
+    assert len(s) == len(list(s)) == 5
+
+
+def test_length_grouped_sft_run_reports_its_padding(tiny_sft_config) -> None:
+    cfg = tiny_sft_config(padding="dynamic", group_by_length=True, length_bucket_multiplier=2)
+    run_dir = run_sft(cfg)
+
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["group_by_length"] is True
+    assert metrics["padding_fraction"] == metrics["padding_fraction_dynamic"]
+    assert metrics["train_loss"] > 0
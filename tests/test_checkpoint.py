@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import shutil
+
+import pytest
+import torch
+from safetensors.torch import load_file
+
+from frontier_ml_stack.training.checkpoint import (
+    MODEL_WEIGHTS_FILE,
+    OPTIMIZER_FILE,
+    RNG_STATE_FILE,
+    CheckpointManager,
+    list_checkpoints,
+)
+from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.run_artifacts import write_config
+from frontier_ml_stack.training.sft import _find_resume_checkpoint, run_sft
+
+
+class _Tied(torch.nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        self.emb = torch.nn.Embedding(10, 4)
+        self.head = torch.nn.Linear(4, 10, bias=False)
+        self.head.weight = self.emb.weight
+
+
+def test_checkpoint_manager_snapshots_and_prunes(tmp_path) -> None:
+    model = _Tied()
+    opt = torch.optim.AdamW(model.parameters(), lr=0.1)
+    model.emb.weight.sum().backward()
+    opt.step()
+
+    mgr = CheckpointManager(tmp_path, keep_last=2)
+    for step in (1, 2, 3):
+        mgr.save(step, model=model, optimizer=opt)
+        saved = model.emb.weight.detach().clone()
+        # training keeps mutating weights while the write is in flight
+        with torch.no_grad():
+            model.emb.weight.add_(1.0)
+    mgr.close()
+
+    ckpts = list_checkpoints(tmp_path)
+    assert [p.name for p in ckpts] == ["checkpoint-2", "checkpoint-3"]
+    assert not list(tmp_path.glob(".*"))
+
+    weights = load_file(str(ckpts[-1] / MODEL_WEIGHTS_FILE))
+    # tied weights are stored once
+    assert list(weights) == ["emb.weight"]
+    assert torch.equal(weights["emb.weight"], saved)
+    assert (ckpts[-1] / OPTIMIZER_FILE).is_file()
+    assert (ckpts[-1] / RNG_STATE_FILE).is_file()
+
+
+def test_list_checkpoints_sorts_by_step(tmp_path) -> None:
+    for name in ("checkpoint-10", "checkpoint-9", ".checkpoint-11.tmp", "other"):
+        (tmp_path / name).mkdir()
+    assert [p.name for p in list_checkpoints(tmp_path)] == ["checkpoint-9", "checkpoint-10"]
+
+
+def test_find_resume_checkpoint_rejects_changed_config(tmp_path) -> None:
+    cfg = SFTConfig(run_name="r", model_name="m", train_records="a.jsonl", save_steps=5)
+    assert _find_resume_checkpoint(tmp_path, cfg) is None
+
+    (tmp_path / "checkpoints" / "checkpoint-5").mkdir(parents=True)
+    (tmp_path / "checkpoints" / "checkpoint-10").mkdir()
+    with pytest.raises(ValueError, match="config.json is missing"):
+        _find_resume_checkpoint(tmp_path, cfg)
+
+    write_config(tmp_path / "config.json", cfg)
+
+    bookkeeping = SFTConfig(
+        run_name="r", model_name="m", train_records="a.jsonl", logging_steps=1, resume=True
+    )
+    assert _find_resume_checkpoint(tmp_path, bookkeeping).name == "checkpoint-10"
+
+    # the saved scheduler state was built for the original horizon
+    extended = SFTConfig(
+        run_name="r", model_name="m", train_records="a.jsonl", max_steps=100, resume=True
+    )
+    with pytest.raises(ValueError, match="max_steps"):
+        _find_resume_checkpoint(tmp_path, extended)
+
+    other_data = SFTConfig(run_name="r", model_name="m", train_records="b.jsonl", resume=True)
+    with pytest.raises(ValueError, match="train_records"):
+        _find_resume_checkpoint(tmp_path, other_data)
+
+
+def test_resumed_run_ends_bit_identical_to_an_uninterrupted_one(tiny_sft_config) -> None:
+    settings = {"max_steps": 4, "save_steps": 2, "save_total_limit": 0, "telemetry": False}
+    full = run_sft(tiny_sft_config(run_name="full", **settings))
+
+    interrupted = run_sft(tiny_sft_config(run_name="resumed", **settings))
+    # as if the run had died right after its step-2 checkpoint
+    shutil.rmtree(interrupted / "checkpoints" / "checkpoint-4")
+    shutil.rmtree(interrupted / "final_model")
+    resumed = run_sft(tiny_sft_config(run_name="resumed", resume=True, **settings))
+
+    metrics = json.loads((resumed / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["resumed_from"].endswith("checkpoint-2")
+    want = load_file(full / "final_model" / "model.safetensors")
+    got = load_file(resumed / "final_model" / "model.safetensors")
+    assert want.keys() == got.keys()
+    assert all(torch.equal(want[k], got[k]) for k in want)
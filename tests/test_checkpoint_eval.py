@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import torch
+from peft import PeftModel
+
+from frontier_ml_stack.eval.checkpoints import run_checkpoint_eval, select_checkpoints
+from frontier_ml_stack.eval.config import BehaviorEvalConfig, CheckpointEvalConfig, LossEvalConfig
+from frontier_ml_stack.eval.suites.behavior_eval import generate_completions
+from frontier_ml_stack.eval.suites.loss_eval import load_documents, loss_of_documents
+from frontier_ml_stack.models.loading import load_causal_lm, load_tokenizer
+from frontier_ml_stack.training.checkpoint import CheckpointManager
+from frontier_ml_stack.training.lora import apply_lora
+
+
+def _write_run(run_dir, base_dir, *, lora: bool) -> None:
+    """
+    A training run whose checkpoints hold different (random) weights at steps 2, 4 and 6.
+    """
+    run_dir.mkdir()
+    (run_dir / "config.json").write_text(json.dumps({"model_name": str(base_dir)}))
+    model = load_causal_lm(str(base_dir))
+    if lora:
+        model = apply_lora(model, r=2, alpha=4, dropout=0.0, target_modules=["c_attn"], bias="none")
+    manager = CheckpointManager(run_dir / "checkpoints", keep_last=0, adapter_only=lora)
+    for step in (2, 4, 6):
+        with torch.no_grad():
+            for p in model.parameters():
+                if p.requires_grad:
+                    p.add_(torch.randn_like(p) * 0.5)
+        manager.save(step, model=model)
+    manager.close()
+
+
+@pytest.mark.parametrize("lora", [True, False])
+def test_curve_matches_evaluating_each_checkpoint_from_scratch(
+    tmp_path, tiny_model_dir, lora: bool
+) -> None:
+    run_dir = tmp_path / "run"
+    _write_run(run_dir, tiny_model_dir, lora=lora)
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(json.dumps({"id": str(i), "text": "abc " * (i + 2)}) + "\n" for i in range(5)),
+        encoding="utf-8",
+    )
+    prompts = tmp_path / "suite.jsonl"
+    prompts.write_text(
+        "".join(
+            json.dumps({"id": f"p{i}", "prompt": "ab " * (i + 1), "scorers": [{"type": "refusal"}]})
+            + "\n"
+            for i in range(3)
+        ),
+        encoding="utf-8",
+    )
+    cfg = CheckpointEvalConfig(
+        eval_name="curve",
+        run_dir=str(run_dir),
+        eval_records=str(records),
+        output_dir=str(tmp_path / "reports"),
+        loss=LossEvalConfig(max_eval_samples=0, max_seq_length=32, batch_size=2),
+        behavior=BehaviorEvalConfig(max_prompts=0, max_new_tokens=4, prompts_path=str(prompts)),
+    )
+    out = run_checkpoint_eval(cfg)
+    metrics = json.loads((out / "metrics.json").read_text(encoding="utf-8"))
+    curve = metrics["curve"]
+    assert [p["step"] for p in curve] == [2, 4, 6]
+    assert metrics["checkpoint_format"] == ("adapter" if lora else "full")
+    assert len({round(p["avg_loss"], 6) for p in curve}) == 3  # the weights really changed
+
+    tokenizer = load_tokenizer(str(tiny_model_dir))
+    docs = load_documents(
+        tokenizer, records_path=records, token_store=None, max_eval_samples=0, max_seq_length=32
+    )
+    for point in curve:
+        if lora:
+            model = PeftModel.from_pretrained(
+                load_causal_lm(str(tiny_model_dir)), point["checkpoint"]
+            )
+        else:
+            model = load_causal_lm(point["checkpoint"])
+        model.eval()
+        fresh = loss_of_documents(
+            model,
+            docs,
+            pad_token_id=tokenizer.pad_token_id,
+            max_seq_length=32,
+            stride=0,
+            batch_size=2,
+        )
+        assert point["avg_loss"] == pytest.approx(fresh.avg_loss, rel=1e-5)
+        completions, _ = generate_completions(
+            model,
+            tokenizer,
+            ["ab " * (i + 1) for i in range(3)],
+            batch_size=8,
+            max_new_tokens=4,
+            temperature=0.0,
+        )
+        rows = (out / "behavior" / f"samples-step-{point['step']}.jsonl").read_text().splitlines()
+        assert [json.loads(r)["completion"] for r in rows] == completions
+
+
+def test_select_checkpoints(tmp_path) -> None:
+    run_dir = tmp_path / "run"
+    with pytest.raises(ValueError, match="no checkpoints"):
+        select_checkpoints(run_dir)
+    for step in (10, 20, 30):
+        (run_dir / "checkpoints" / f"checkpoint-{step}").mkdir(parents=True)
+    (run_dir / "checkpoints" / ".checkpoint-40.tmp").mkdir()  # unfinished write
+    assert [p.name for p in select_checkpoints(run_dir, {30, 10})] == [
+        "checkpoint-10",
+        "checkpoint-30",
+    ]
+    with pytest.raises(ValueError, match=r"steps \[40\]"):
+        select_checkpoints(run_dir, {40})
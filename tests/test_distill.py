@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from frontier_ml_stack.data.token_store import (
+    MANIFEST_FILE,
+    TokenStore,
+    TokenStoreWriter,
+    token_dtype,
+)
+from frontier_ml_stack.training.data import TokenStoreDataset
+from frontier_ml_stack.training.distill import (
+    DistillTokenStoreDataset,
+    TeacherLogits,
+    collate_distill,
+    topk_kd_loss,
+    write_teacher_topk,
+)
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+
+VOCAB = 40
+
+
+def _write_store(out_dir: Path, docs: list[list[int]]) -> TokenStore:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    dtype = token_dtype(VOCAB)
+    writer = TokenStoreWriter(out_dir, dtype)
+    for ids in docs:
+        writer.add(ids)
+    writer.close()
+    params = {"dtype": dtype.name, "tokenizer_name": "t", "tokenizer_revision": None}
+    (out_dir / MANIFEST_FILE).write_text(
+        json.dumps({"params": {**params, "fingerprint": "store-a"}}), encoding="utf-8"
+    )
+    return TokenStore(out_dir)
+
+
+class _Interrupt(Exception):
+    pass
+
+
+def test_teacher_topk_rows_align_with_store_and_resume(tmp_path: Path, tiny_gpt2) -> None:
+    docs = [[1, 2, 3, 4, 5, 6], [7, 8], [9, 10, 11, 12]]
+    store = _write_store(tmp_path / "store", docs)
+    model = tiny_gpt2(vocab_size=VOCAB, n_positions=32)
+
+    full_dir = tmp_path / "full"
+    write_teacher_topk(model, store, full_dir, top_k=5, max_seq_length=5, batch_size=2)
+    teacher = TeacherLogits(full_dir)
+    assert len(teacher) == 3
+    assert teacher.offsets.tolist() == [0, 5, 7, 11]  # first doc cut at max_seq_length
+
+    # rows hold the top-k of each document's own (unpadded) forward pass
+    with torch.no_grad():
+        logits = model(input_ids=torch.tensor([docs[2]])).logits[0]
+    values, ids = logits.topk(5, dim=-1)
+    stored_logits, stored_ids = teacher[2]
+    assert stored_ids.dtype == np.int32 and stored_logits.dtype == np.float16
+    np.testing.assert_array_equal(stored_ids, ids.numpy())
+    np.testing.assert_allclose(stored_logits, values.numpy(), atol=1e-2)
+
+    # an interrupted pass resumes and ends up byte-identical
+    forward = model.forward
+    calls = {"n": 0}
+
+    def flaky_forward(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise _Interrupt
+        return forward(*args, **kwargs)
+
+    model.forward = flaky_forward
+    resumed_dir = tmp_path / "resumed"
+    with pytest.raises(_Interrupt):
+        write_teacher_topk(model, store, resumed_dir, top_k=5, max_seq_length=5, batch_size=2)
+    with pytest.raises(ValueError, match="complete"):
+        TeacherLogits(resumed_dir)
+    write_teacher_topk(model, store, resumed_dir, top_k=5, max_seq_length=5, batch_size=2)
+    resumed = TeacherLogits(resumed_dir)
+    np.testing.assert_array_equal(resumed.ids, teacher.ids)
+    np.testing.assert_array_equal(resumed.logits, teacher.logits)
+
+
+def test_distill_dataset_collates_token_and_teacher_rows(tmp_path: Path, tiny_gpt2) -> None:
+    store = _write_store(tmp_path / "store", [[1, 2, 3, 4, 5, 6], [7, 8]])
+    write_teacher_topk(
+        tiny_gpt2(vocab_size=VOCAB, n_positions=32),
+        store,
+        tmp_path / "t",
+        top_k=3,
+        max_seq_length=5,
+    )
+    teacher = TeacherLogits(tmp_path / "t")
+
+    base = TokenStoreDataset(store, max_seq_length=4, pad_token_id=0, pad_to_max_length=False)
+    ds = DistillTokenStoreDataset(base, teacher)
+    batch = collate_distill([ds[0], ds[1]], pad_token_id=0)
+    assert batch["input_ids"].tolist() == [[1, 2, 3, 4], [7, 8, 0, 0]]
+    assert batch["labels"].tolist() == [[1, 2, 3, 4], [7, 8, IGNORE_INDEX, IGNORE_INDEX]]
+    assert batch["teacher_ids"].shape == (2, 4, 3)
+    assert batch["teacher_logits"].dtype == torch.float16
+    assert batch["teacher_ids"][1, 2:].abs().sum() == 0
+
+    too_long = TokenStoreDataset(store, max_seq_length=8, pad_token_id=0)
+    with pytest.raises(ValueError, match="new teacher pass"):
+        DistillTokenStoreDataset(too_long, teacher)
+    other = _write_store(tmp_path / "other", [[1, 2]])
+    other.manifest["params"]["fingerprint"] = "store-b"
+    with pytest.raises(ValueError, match="another store"):
+        DistillTokenStoreDataset(
+            TokenStoreDataset(other, max_seq_length=4, pad_token_id=0), teacher
+        )
+
+
+def test_topk_kd_loss() -> None:
+    torch.manual_seed(0)
+    logits = torch.randn(2, 5, VOCAB)
+    labels = torch.randint(0, VOCAB, (2, 5))
+
+    # full-vocab "top-k" of the student itself: KL is zero
+    values, ids = logits.topk(VOCAB, dim=-1)
+    assert float(topk_kd_loss(logits, values, ids, labels)) == pytest.approx(0.0, abs=1e-5)
+
+    # a different teacher: positive, and positions before a -100 label don't count
+    teacher = torch.randn(2, 5, VOCAB)
+    values, ids = teacher.topk(8, dim=-1)
+    loss = topk_kd_loss(logits, values, ids, labels, temperature=2.0)
+    assert float(loss) > 0
+    masked = labels.clone()
+    masked[:, 3:] = IGNORE_INDEX
+    changed = values.clone()
+    changed[:, 2:] = 0.0
+    assert float(topk_kd_loss(logits, values, ids, masked)) == pytest.approx(
+        float(topk_kd_loss(logits, changed, ids, masked))
+    )
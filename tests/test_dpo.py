@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import replace
+
+import numpy as np
+import pytest
+import torch
+
+from frontier_ml_stack.data.schema import PreferenceRecord
+from frontier_ml_stack.training.config import DPOConfig
+from frontier_ml_stack.training.dpo import run_dpo
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+from frontier_ml_stack.training.preference import (
+    PreferenceDataset,
+    collate_pairs,
+    disable_dropout,
+    dpo_loss,
+    sequence_logps,
+    tokenize_preference_pair,
+)
+from frontier_ml_stack.training.ref_logps import ReferenceLogpCache
+
+
+class _CharTokenizer:
+    eos_token_id = 1
+
+    def __call__(self, text: str, add_special_tokens: bool = True) -> dict[str, list[int]]:
+        return {"input_ids": [2 + ord(c) % 30 for c in text]}
+
+
+def _pairs(n: int) -> list[dict[str, list[int]]]:
+    tok = _CharTokenizer()
+    records = [
+        PreferenceRecord(id=str(i), prompt="q" * (i + 2), chosen="ab" * (i + 1), rejected="c" * 3)
+        for i in range(n)
+    ]
+    return [
+        tokenize_preference_pair(r, tok, max_seq_length=16, max_prompt_length=4) for r in records
+    ]
+
+
+def test_tokenize_pair_masks_prompt_and_truncates() -> None:
+    record = PreferenceRecord(id="a", prompt="abcdef", chosen="xy", rejected="z" * 20)
+    pair = tokenize_preference_pair(record, _CharTokenizer(), max_seq_length=8, max_prompt_length=3)
+
+    # prompt keeps its last 3 tokens, completions get EOS and are cut at max_seq_length
+    assert pair["chosen_labels"] == [IGNORE_INDEX] * 3 + pair["chosen_input_ids"][3:]
+    assert pair["chosen_input_ids"][-1] == _CharTokenizer.eos_token_id
+    assert len(pair["chosen_input_ids"]) == 6
+    assert len(pair["rejected_input_ids"]) == 8
+    assert pair["chosen_input_ids"][:3] == pair["rejected_input_ids"][:3]
+
+
+def test_sequence_logps_and_dpo_loss() -> None:
+    batch = collate_pairs(_pairs(2), pad_token_id=0)
+    assert batch["input_ids"].shape[0] == 4
+    logits = torch.randn(*batch["input_ids"].shape, 40)
+
+    expected = []
+    for row_logits, row_labels in zip(logits, batch["labels"], strict=True):
+        logp = row_logits[:-1].log_softmax(-1)
+        total = sum(logp[t, y] for t, y in enumerate(row_labels[1:].tolist()) if y != IGNORE_INDEX)
+        expected.append(float(total))
+    assert sequence_logps(logits, batch["labels"]).tolist() == pytest.approx(expected, rel=1e-5)
+
+    # policy == reference: zero rewards, loss log(2)
+    logps = torch.tensor([-3.0, -4.0, -5.0, -6.0])
+    loss, rewards = dpo_loss(logps, logps.clone(), beta=0.1)
+    assert float(loss) == pytest.approx(math.log(2))
+    assert rewards["margin"].tolist() == [0.0, 0.0]
+    loss, rewards = dpo_loss(logps, torch.tensor([-4.0, -4.0, -4.0, -4.0]), beta=0.5)
+    assert rewards["margin"].tolist() == pytest.approx([1.0, 1.0])
+    assert float(loss) < math.log(2)
+
+
+class _Interrupt(Exception):
+    pass
+
+
+def test_reference_cache_resumes_after_interruption(tmp_path, tiny_gpt2) -> None:
+    model = tiny_gpt2(vocab_size=40, n_positions=32, bos_token_id=1, eos_token_id=1)
+    pairs = _pairs(5)
+    params = {"dataset_sha256": "abc", "ref_model": {"name": "tiny"}}
+
+    full = ReferenceLogpCache(tmp_path / "full", params, len(pairs))
+    stats = full.fill(model, pairs, batch_size=2, pad_token_id=0)
+    assert stats["computed"] == 5 and full.complete
+
+    calls = {"n": 0}
+    forward = model.forward
+
+    def flaky_forward(*args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] == 2:
+            raise _Interrupt
+        return forward(*args, **kwargs)
+
+    cache = ReferenceLogpCache(tmp_path / "resumed", params, len(pairs))
+    assert cache.key == full.key
+    model.forward = flaky_forward
+    with pytest.raises(_Interrupt):
+        cache.fill(model, pairs, batch_size=2, pad_token_id=0)
+    assert cache.done() == 2 and not cache.complete
+    with pytest.raises(ValueError, match="incomplete"):
+        cache.load()
+
+    stats = cache.fill(model, pairs, batch_size=2, pad_token_id=0)
+    assert stats["reused"] == 2 and stats["computed"] == 3
+    np.testing.assert_allclose(cache.load(), full.load(), rtol=1e-6)
+
+    # padding in a batch must not change a pair's log-probs
+    single = collate_pairs([pairs[0]], pad_token_id=0)
+    with torch.no_grad():
+        logits = model(
+            input_ids=single["input_ids"], attention_mask=single["attention_mask"]
+        ).logits
+    logps = sequence_logps(logits, single["labels"])
+    np.testing.assert_allclose(full.load()[0], logps.numpy(), rtol=1e-5)
+
+    item = PreferenceDataset(pairs, full.load())[3]
+    assert item["ref_chosen_logp"] == pytest.approx(float(full.load()[3, 0]))
+
+
+def test_policy_without_dropout_matches_the_eval_mode_reference(tiny_gpt2) -> None:
+    policy = tiny_gpt2(vocab_size=40, n_positions=32, bos_token_id=1, eos_token_id=1)
+    batch = collate_pairs(_pairs(3), pad_token_id=0)
+    inputs = {"input_ids": batch["input_ids"], "attention_mask": batch["attention_mask"]}
+    with torch.no_grad():
+        ref = sequence_logps(policy(**inputs).logits, batch["labels"])
+        assert disable_dropout(policy) > 0 and policy.config.attn_pdrop == 0.0
+        policy.train()
+        logps = sequence_logps(policy(**inputs).logits, batch["labels"])
+    # at step 0 the policy is the reference: every log-ratio is exactly 0
+    assert torch.equal(logps, ref)
+
+
+def test_dpo_run_reuses_the_cached_reference_pass(tmp_path, tiny_model_dir) -> None:
+    records = tmp_path / "prefs.jsonl"
+    records.write_text(
+        "".join(
+            json.dumps({"id": str(i), "prompt": "ab " * (i + 1), "chosen": "cd", "rejected": "xyz"})
+            + "\n"
+            for i in range(4)
+        ),
+        encoding="utf-8",
+    )
+    cfg = DPOConfig(
+        run_name="dpo",
+        model_name=str(tiny_model_dir),
+        train_records=str(records),
+        output_dir=str(tmp_path / "runs"),
+        ref_cache_dir=str(tmp_path / "ref"),
+        max_steps=2,
+        max_seq_length=16,
+        max_prompt_length=8,
+        per_device_train_batch_size=2,
+        telemetry=False,
+    )
+    run_dir = run_dpo(cfg)
+
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["reference_pass"]["computed"] == 4
+    assert metrics["disabled_dropout_modules"] > 0
+    assert set(metrics["final_rewards"]) >= {"rewards/margin", "rewards/accuracy"}
+    assert (run_dir / "final_model" / "model.safetensors").is_file()
+
+    again = run_dpo(replace(cfg, run_name="dpo2"))
+    reused = json.loads((again / "metrics.json").read_text(encoding="utf-8"))["reference_pass"]
+    assert reused["reused"] == 4
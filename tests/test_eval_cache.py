@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import json
+import shutil
+
+from frontier_ml_stack.eval.cache import EvalCache
+from frontier_ml_stack.eval.config import BehaviorEvalConfig, EvalConfig, LossEvalConfig
+from frontier_ml_stack.eval.runner import run_eval
+from frontier_ml_stack.eval.suites.behavior_eval import eval_behavior
+from frontier_ml_stack.models.registry import ModelRegistry
+
+
+def _write_prompts(path, n: int) -> None:
+    path.write_text(
+        "".join(
+            json.dumps({"id": f"p{i}", "prompt": "ab " * (i + 1), "scorers": [{"type": "refusal"}]})
+            + "\n"
+            for i in range(n)
+        ),
+        encoding="utf-8",
+    )
+
+
+def test_unchanged_eval_is_served_from_cache(tmp_path, tiny_model_dir, save_tiny_model) -> None:
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(
+            json.dumps({"id": str(i), "text": "hello world " * (i + 1)}) + "\n" for i in range(4)
+        ),
+        encoding="utf-8",
+    )
+    prompts = tmp_path / "suite.jsonl"
+    _write_prompts(prompts, 3)
+    cfg = EvalConfig(
+        eval_name="e",
+        model_path=str(tiny_model_dir),
+        eval_records=str(records),
+        output_dir=str(tmp_path / "reports"),
+        cache_dir=str(tmp_path / "cache"),
+        loss=LossEvalConfig(max_eval_samples=4, max_seq_length=32),
+        behavior=BehaviorEvalConfig(max_prompts=0, max_new_tokens=3, prompts_path=str(prompts)),
+    )
+
+    def run(registry: ModelRegistry) -> dict:
+        out = run_eval(cfg, registry=registry)
+        return json.loads((out / "metrics.json").read_text(encoding="utf-8"))
+
+    first = run(ModelRegistry())
+    assert first["cache"]["loss"] == {"hits": 0, "misses": 1}
+    assert first["cache"]["behavior"] == {"hits": 0, "misses": 3}
+
+    registry = ModelRegistry()
+    second = run(registry)
+    assert registry.stats()["loads"] == 0  # nothing to compute, so the model is never loaded
+    assert second["cache"]["loss"] == {"hits": 1, "misses": 0}
+    assert second["cache"]["behavior"] == {"hits": 3, "misses": 0}
+    assert second["loss"]["avg_loss"] == first["loss"]["avg_loss"]
+    assert second["behavior"]["scores"] == first["behavior"]["scores"]
+
+    _write_prompts(prompts, 4)  # a grown suite only generates the new prompt
+    third = run(ModelRegistry())
+    assert third["cache"]["loss"] == {"hits": 1, "misses": 0}
+    assert third["cache"]["behavior"] == {"hits": 3, "misses": 1}
+
+    # a copy of the same weights is the same model; different weights are not
+    cache = EvalCache(tmp_path / "cache")
+    shutil.copytree(tiny_model_dir, tmp_path / "copy")
+    assert cache.model_digest(str(tmp_path / "copy")) == first["cache"]["model_digest"]
+    save_tiny_model(tmp_path / "other", seed=1)
+    assert cache.model_digest(str(tmp_path / "other")) != first["cache"]["model_digest"]
+
+
+def test_sampled_completions_are_reproduced_by_their_seed(tmp_path, tiny_model_dir) -> None:
+    prompts = tmp_path / "suite.jsonl"
+    _write_prompts(prompts, 4)
+
+    def sample(seed: int, cache_dir: str = "") -> list[str]:
+        result = eval_behavior(
+            model_path=str(tiny_model_dir),
+            max_prompts=0,
+            max_new_tokens=6,
+            temperature=1.0,
+            prompts_path=prompts,
+            registry=ModelRegistry(),
+            cache=EvalCache(tmp_path / cache_dir) if cache_dir else None,
+            seed=seed,
+        )
+        return [s.completion for s in result.samples]
+
+    # what the cache stores under a seed is what that seed samples afresh
+    assert sample(7, "cache") == sample(7) == sample(7, "cache")
+    assert sample(7) != sample(8)
+
+
+def test_sampled_suite_that_gains_prompts_matches_an_uncached_run(tmp_path, tiny_model_dir) -> None:
+    prompts = tmp_path / "suite.jsonl"
+
+    def sample(cache_dir: str = ""):
+        return eval_behavior(
+            model_path=str(tiny_model_dir),
+            max_prompts=0,
+            max_new_tokens=6,
+            temperature=1.0,
+            batch_size=2,
+            prompts_path=prompts,
+            registry=ModelRegistry(),
+            cache=EvalCache(tmp_path / cache_dir) if cache_dir else None,
+            seed=3,
+        )
+
+    _write_prompts(prompts, 3)
+    sample("cache")
+    assert sample("cache").cached == 3
+
+    # the new prompt shifts the batches and the RNG stream, so nothing cached is reused
+    _write_prompts(prompts, 4)
+    grown = sample("cache")
+    assert grown.cached == 0
+    assert [s.completion for s in grown.samples] == [s.completion for s in sample().samples]
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import replace
+
+import pytest
+import torch.multiprocessing as mp
+
+from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.dist import (
+    all_gather_objects,
+    all_reduce_sum,
+    broadcast_object,
+)
+from frontier_ml_stack.training.launch import launch_sft, scaling_report, threads_per_process
+
+
+def test_threads_per_process_splits_cores() -> None:
+    assert threads_per_process(4, cores=16) == 4
+    assert threads_per_process(3, cores=8) == 2
+    assert threads_per_process(8, cores=4) == 1
+
+
+def test_scaling_report() -> None:
+    report = scaling_report(
+        {"train_samples_per_second": 100.0},
+        {"train_samples_per_second": 300.0, "world_size": 4},
+    )
+    assert report["speedup"] == pytest.approx(3.0)
+    assert report["efficiency"] == pytest.approx(0.75)
+
+
+def test_dist_helpers_are_identity_without_process_group() -> None:
+    assert all_reduce_sum(7) == 7
+    assert all_gather_objects({"a": 1}) == [{"a": 1}]
+    assert broadcast_object("x") == "x"
+
+
+def test_launch_rejects_bad_layout() -> None:
+    cfg = SFTConfig(run_name="r", model_name="m", train_records="a.jsonl")
+    with pytest.raises(ValueError):
+        launch_sft(cfg, nproc=2, nnodes=2, node_rank=2)
+    with pytest.raises(ValueError, match="master_port"):
+        launch_sft(cfg, nproc=2, nnodes=2, node_rank=1)
+
+
+def test_launch_restores_omp_num_threads(tmp_path, tiny_model_dir) -> None:
+    before = os.environ.get("OMP_NUM_THREADS")
+    cfg = SFTConfig(
+        run_name="r",
+        model_name=str(tiny_model_dir),
+        train_records=str(tmp_path / "missing.jsonl"),
+        output_dir=str(tmp_path),
+    )
+    with pytest.raises(mp.ProcessRaisedException):  # the rank fails, the setting is undone
+        launch_sft(cfg, nproc=1, threads=3)
+    assert os.environ.get("OMP_NUM_THREADS") == before
+
+
+def _write_records(path, n: int = 8) -> None:
+    path.write_text(
+        "".join(
+            json.dumps({"id": str(i), "text": "abc de " * (i % 3 + 1)}) + "\n" for i in range(n)
+        ),
+        encoding="utf-8",
+    )
+
+
+def test_two_ranks_train_and_resume_from_rank_0s_checkpoint(tmp_path, tiny_model_dir) -> None:
+    records = tmp_path / "records.jsonl"
+    _write_records(records)
+    cfg = SFTConfig(
+        run_name="ddp",
+        model_name=str(tiny_model_dir),
+        train_records=str(records),
+        output_dir=str(tmp_path / "runs"),
+        max_steps=2,
+        save_steps=1,
+        save_total_limit=0,
+        max_seq_length=16,
+        per_device_train_batch_size=2,
+        telemetry=False,
+    )
+    run_dir = launch_sft(cfg, nproc=2, threads=1)
+
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["world_size"] == 2
+    assert (run_dir / "final_model" / "model.safetensors").is_file()
+    ckpt = run_dir / "checkpoints" / "checkpoint-1"
+    assert sorted(p.name for p in ckpt.glob("rng_state_*.pth")) == [
+        "rng_state_0.pth",
+        "rng_state_1.pth",
+    ]
+
+    # every rank resumes from the checkpoint rank 0 picked
+    shutil.rmtree(run_dir / "checkpoints" / "checkpoint-2")
+    launch_sft(replace(cfg, resume=True), nproc=2, threads=1)
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["resumed_from"].endswith("checkpoint-1")
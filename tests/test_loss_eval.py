@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import torch
+
+from frontier_ml_stack.eval.suites.loss_eval import (
+    collate_windows,
+    eval_loss,
+    length_sorted_batches,
+    loss_windows,
+    token_nll,
+)
+from frontier_ml_stack.models.loading import LoadedModel, LoadStats
+from frontier_ml_stack.models.registry import ModelRegistry
+from frontier_ml_stack.training.packing import IGNORE_INDEX
+
+
+def test_sliding_windows_score_every_token_once() -> None:
+    ids = list(range(100, 123))
+    windows = loss_windows(ids, max_seq_length=8, stride=3)
+    assert all(len(w) <= 8 for w, _ in windows)
+    assert windows[-1][0][-1] == ids[-1]
+    scored = [y for _, labels in windows for y in labels if y != IGNORE_INDEX]
+    assert scored == ids
+    # every window but the first keeps max_seq_length - stride tokens of context (until the end)
+    assert windows[1][1][:5] == [IGNORE_INDEX] * 5
+
+    assert loss_windows(ids, max_seq_length=8) == [(ids[:8], ids[:8])]
+    assert loss_windows(ids[:5], max_seq_length=8, stride=3) == [(ids[:5], ids[:5])]
+
+
+def test_length_sorted_batches() -> None:
+    batches = length_sorted_batches([3, 9, 1, 7, 5], batch_size=2)
+    assert batches == [[1, 3], [4, 0], [2]]
+
+
+def test_batched_token_nll_matches_unpadded_per_window(tiny_gpt2) -> None:
+    model = tiny_gpt2(vocab_size=40, n_positions=32, bos_token_id=1, eos_token_id=1)
+    docs = [[5, 6, 7, 8, 9, 10, 11], [12, 13, 14], [15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25]]
+    windows = [w for d in docs for w in loss_windows(d, max_seq_length=6, stride=4)]
+
+    with torch.no_grad():
+        batch = collate_windows(windows, pad_token_id=0)
+        assert (batch["labels"][batch["attention_mask"] == 0] == IGNORE_INDEX).all()
+        nll, n = token_nll(
+            model(**{k: batch[k] for k in ("input_ids", "attention_mask")}).logits, batch["labels"]
+        )
+
+        ref_nll, ref_n = 0.0, 0
+        for ids, labels in windows:
+            logits = model(torch.tensor([ids])).logits
+            one, k = token_nll(logits, torch.tensor([labels]))
+            ref_nll += one
+            ref_n += k
+
+    # every token after the first of each document is scored once, padding never is
+    assert n == ref_n == sum(len(d) - 1 for d in docs)
+    assert nll == pytest.approx(ref_nll, rel=1e-5)
+
+
+class _CharTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, texts: list[str]) -> dict[str, list[list[int]]]:
+        return {"input_ids": [[2 + ord(c) % 30 for c in t] for t in texts]}
+
+
+def test_eval_loss_windows_long_records(tmp_path, tiny_gpt2) -> None:
+    model = tiny_gpt2(vocab_size=40, n_positions=32, bos_token_id=1, eos_token_id=1)
+
+    def load(model_path: str, *, dtype=None) -> LoadedModel:
+        stats = LoadStats(weights_format="hub", load_s=0.0, peak_rss_mb=0.0)
+        return LoadedModel(model_path, _CharTokenizer(), model, stats)
+
+    records = tmp_path / "records.jsonl"
+    texts = ["a short one", "x" * 50, "the quick brown fox jumps over the lazy dog"]
+    records.write_text(
+        "".join(json.dumps({"id": str(i), "text": t}) + "\n" for i, t in enumerate(texts)),
+        encoding="utf-8",
+    )
+    kwargs = {"model_path": "tiny", "records_path": records, "max_eval_samples": 0}
+    registry = ModelRegistry(loader=load)
+
+    truncated = eval_loss(**kwargs, max_seq_length=16, registry=registry)
+    assert truncated.n_samples == 3 and truncated.n_windows == 3
+    assert truncated.n_tokens == sum(min(len(t), 16) - 1 for t in texts)
+
+    full = eval_loss(**kwargs, max_seq_length=16, stride=8, batch_size=2, registry=registry)
+    assert full.n_tokens == sum(len(t) - 1 for t in texts)
+    assert full.n_windows > 3
+    with pytest.raises(ValueError, match="stride"):
+        eval_loss(**kwargs, max_seq_length=16, stride=16, registry=registry)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import torch
+from torch import nn
+from transformers.pytorch_utils import Conv1D
+
+from frontier_ml_stack.training.low_precision import (
+    BASE_DTYPES,
+    LowPrecisionLinear,
+    dequantize_linears,
+    quantize_frozen_linears,
+    restore_conv1d,
+)
+from frontier_ml_stack.training.sft import run_sft
+
+
+class _Block(nn.Module):
+    def __init__(self) -> None:
+        super().__init__()
+        torch.manual_seed(0)
+        self.emb = nn.Embedding(16, 32)
+        self.proj = nn.Linear(32, 64)
+        self.c_fc = Conv1D(32, 64)  # GPT-2 style: weight (in=64, out=32)
+        self.lm_head = nn.Linear(32, 16, bias=False)
+
+    def forward(self, ids: torch.Tensor) -> torch.Tensor:
+        return self.lm_head(self.c_fc(self.proj(self.emb(ids))))
+
+
+@pytest.mark.parametrize(("base_dtype", "tol"), [("bf16", 2e-2), ("int8", 5e-2)])
+def test_quantized_forward_and_backward_track_fp32(base_dtype: str, tol: float) -> None:
+    ref = _Block()
+    model = _Block()
+    assert quantize_frozen_linears(model, base_dtype) == 2
+    assert isinstance(model.proj, LowPrecisionLinear)
+    assert isinstance(model.lm_head, nn.Linear) and not isinstance(
+        model.lm_head, LowPrecisionLinear
+    )
+    assert model.emb.weight.dtype == torch.float32
+
+    ids = torch.arange(8).unsqueeze(0)
+    x_ref = ref.emb(ids).detach().requires_grad_()
+    x = x_ref.detach().clone().requires_grad_()
+    y_ref = ref.c_fc(ref.proj(x_ref))
+    y = model.c_fc(model.proj(x))
+    assert torch.allclose(y, y_ref, atol=tol, rtol=tol)
+
+    y_ref.sum().backward()
+    y.sum().backward()
+    assert torch.allclose(x.grad, x_ref.grad, atol=tol, rtol=tol)
+    assert model.proj.weight.grad is None
+
+
+def test_int8_storage_and_restore_roundtrip() -> None:
+    model = _Block()
+    conv_weight = model.c_fc.weight.detach().clone()
+    quantize_frozen_linears(model, "int8")
+    assert model.proj.weight.dtype == torch.int8
+    assert model.proj.weight_scale.shape == (64,)
+
+    assert dequantize_linears(model) == 2
+    assert restore_conv1d(model) == 1
+    assert isinstance(model.c_fc, Conv1D)
+    assert model.c_fc.weight.shape == conv_weight.shape
+    assert torch.allclose(model.c_fc.weight, conv_weight, atol=conv_weight.abs().max() / 127)
+
+
+def test_quantize_rejects_unknown_dtype() -> None:
+    with pytest.raises(ValueError):
+        quantize_frozen_linears(_Block(), "fp8")
+
+
+@pytest.mark.parametrize("base_dtype", BASE_DTYPES)
+def test_lora_sft_run_saves_adapter_and_merged_model(tiny_sft_config, base_dtype: str) -> None:
+    cfg = tiny_sft_config(use_lora=True, lora_r=2, lora_alpha=4, lora_base_dtype=base_dtype)
+    run_dir = run_sft(cfg)
+
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["train_loss"] > 0
+    lora = json.loads((run_dir / "lora.json").read_text(encoding="utf-8"))
+    assert lora["base_dtype"] == base_dtype
+    assert (run_dir / "lora_adapter" / "adapter_model.safetensors").is_file()
+    assert (run_dir / "final_model_merged" / "model.safetensors").is_file()
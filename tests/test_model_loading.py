@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import pytest
+import torch
+
+from frontier_ml_stack.models.loading import load_causal_lm, weights_format
+
+
+def test_load_prefers_safetensors_and_still_reads_pickle(tmp_path, tiny_gpt2) -> None:
+    model = tiny_gpt2(n_positions=16)
+    st_dir = tmp_path / "st"
+    model.save_pretrained(str(st_dir), safe_serialization=True)
+    assert weights_format(str(st_dir)) == "safetensors"
+
+    pickle_dir = tmp_path / "pickle"
+    model.config.save_pretrained(str(pickle_dir))
+    torch.save(model.state_dict(), pickle_dir / "pytorch_model.bin")
+    assert weights_format(str(pickle_dir)) == "pickle"
+
+    ids = torch.tensor([[1, 5, 7, 9]])
+    with torch.no_grad():
+        expected = model(ids).logits
+        for path in (st_dir, pickle_dir):
+            loaded = load_causal_lm(str(path)).eval()
+            torch.testing.assert_close(loaded(ids).logits, expected)
+
+    assert weights_format("org/some-hub-model") == "hub"
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(FileNotFoundError):
+        weights_format(str(tmp_path / "empty"))
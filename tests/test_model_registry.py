@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import threading
+
+import torch
+
+from frontier_ml_stack.eval.config import BehaviorEvalConfig, EvalConfig, LossEvalConfig
+from frontier_ml_stack.eval.runner import run_eval
+from frontier_ml_stack.models.loading import LoadedModel, LoadStats
+from frontier_ml_stack.models.registry import ModelRegistry, model_size_mb
+
+
+def _fake_loader(calls: list[str]):
+    def load(model_path: str, *, dtype=None) -> LoadedModel:
+        calls.append(model_path)
+        # 1 MiB of fp32 weights per model
+        model = torch.nn.Linear(512, 512, bias=False)
+        stats = LoadStats(weights_format="safetensors", load_s=0.0, peak_rss_mb=0.0)
+        return LoadedModel(model_path=model_path, tokenizer=None, model=model, stats=stats)
+
+    return load
+
+
+def test_registry_shares_pinned_models_and_evicts_lru_over_budget() -> None:
+    calls: list[str] = []
+    reg = ModelRegistry(budget_mb=2.0, loader=_fake_loader(calls))
+
+    with reg.acquire("a") as a1, reg.acquire("a") as a2:
+        assert a1 is a2
+    assert calls == ["a"] and reg.stats()["hits"] == 1
+
+    with reg.acquire("b"):
+        pass
+    with reg.acquire("a"):  # a becomes most recently used
+        pass
+    with reg.acquire("c"):
+        pass
+    # 3 MiB cached > 2 MiB budget: b (least recently used) goes
+    assert [e["model_path"] for e in reg.stats()["cached"]] == ["a", "c"]
+    assert reg.stats()["evictions"] == 1
+
+    # pinned models stay, whatever the budget
+    reg.budget_mb = 0.0
+    with reg.acquire("c"):
+        with reg.acquire("d"):
+            pass
+        assert [e["model_path"] for e in reg.stats()["cached"]] == ["c"]
+    assert reg.stats()["cached"] == [] and reg.resident_mb() == 0.0
+    assert calls == ["a", "b", "c", "d"]
+
+
+def test_concurrent_acquire_loads_once() -> None:
+    calls: list[str] = []
+    reg = ModelRegistry(budget_mb=10.0, loader=_fake_loader(calls))
+    barrier = threading.Barrier(4)
+    seen = []
+
+    def worker() -> None:
+        barrier.wait()
+        with reg.acquire("m") as lm:
+            seen.append(lm)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == ["m"] and all(lm is seen[0] for lm in seen)
+    assert model_size_mb(seen[0].model) == 1.0
+    reg.clear()
+    assert reg.stats()["cached"] == []
+
+
+def test_model_cache_mb_shares_the_model_across_evals(tmp_path, tiny_model_dir) -> None:
+    records = tmp_path / "records.jsonl"
+    records.write_text(json.dumps({"id": "0", "text": "abc abc"}) + "\n", encoding="utf-8")
+    reg = ModelRegistry()  # budget 0, like the process registry
+    for name, cache_mb in (("first", 0.0), ("second", 100.0), ("third", 100.0)):
+        cfg = EvalConfig(
+            eval_name=name,
+            model_path=str(tiny_model_dir),
+            eval_records=str(records),
+            output_dir=str(tmp_path / "reports"),
+            cache_dir="",
+            model_cache_mb=cache_mb,
+            loss=LossEvalConfig(max_seq_length=16),
+            behavior=BehaviorEvalConfig(max_prompts=1, max_new_tokens=2),
+        )
+        run_eval(cfg, registry=reg)
+    # freed after the first eval; kept after the second, so the third is a cache hit
+    assert reg.stats()["loads"] == 2 and reg.budget_mb == 100.0
+    assert [e["model_path"] for e in reg.stats()["cached"]] == [str(tiny_model_dir)]
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+import torch
+from safetensors.torch import load_file
+
+from frontier_ml_stack.data.token_store import (
+    MANIFEST_FILE,
+    TokenStore,
+    TokenStoreWriter,
+    token_dtype,
+)
+from frontier_ml_stack.training.packing import (
+    IGNORE_INDEX,
+    PackedTokenStoreDataset,
+    isolate_packed_documents,
+    pack_documents,
+    padding_stats,
+)
+from frontier_ml_stack.training.sft import run_sft
+
+DOCS = [[1, 2, 3], [4, 5], [6, 7, 8, 9, 10, 11], [12]]
+EOS = 0
+PAD = 99
+
+
+def _write_store(out_dir: Path, docs: list[list[int]]) -> TokenStore:
+    dtype = token_dtype(1000)
+    writer = TokenStoreWriter(out_dir, dtype)
+    for ids in docs:
+        writer.add(ids)
+    writer.close()
+    (out_dir / MANIFEST_FILE).write_text(
+        json.dumps({"params": {"dtype": dtype.name}, "counts": {}}), encoding="utf-8"
+    )
+    return TokenStore(out_dir)
+
+
+def test_pack_documents_fills_blocks_with_eos_separators() -> None:
+    blocks = list(pack_documents(DOCS, block_size=5, eos_token_id=EOS, pad_token_id=PAD))
+
+    assert [b["input_ids"] for b in blocks] == [
+        [1, 2, 3, 0, 4],
+        [5, 0, 6, 7, 8],
+        [9, 10, 11, 0, 12],
+        [0, PAD, PAD, PAD, PAD],
+    ]
+    assert blocks[-1]["attention_mask"] == [1, 0, 0, 0, 0]
+    assert blocks[-1]["labels"] == [0, IGNORE_INDEX, IGNORE_INDEX, IGNORE_INDEX, IGNORE_INDEX]
+    assert "position_ids" not in blocks[0]
+
+
+def test_pack_documents_reset_boundaries_restarts_positions() -> None:
+    blocks = list(
+        pack_documents(
+            DOCS, block_size=5, eos_token_id=EOS, pad_token_id=PAD, reset_boundaries=True
+        )
+    )
+
+    assert blocks[0]["position_ids"] == [0, 1, 2, 3, 0]
+    assert blocks[1]["position_ids"] == [0, 1, 0, 1, 2]
+    # first token of every document piece is not a prediction target
+    assert blocks[0]["labels"] == [IGNORE_INDEX, 2, 3, 0, IGNORE_INDEX]
+    assert "attention_mask" not in blocks[0]
+
+
+@pytest.mark.parametrize("reset", [False, True])
+def test_packed_token_store_matches_pack_documents(tmp_path: Path, reset: bool) -> None:
+    store = _write_store(tmp_path, DOCS)
+    ds = PackedTokenStoreDataset(
+        store, block_size=5, eos_token_id=EOS, pad_token_id=PAD, reset_boundaries=reset
+    )
+    expected = list(
+        pack_documents(
+            DOCS, block_size=5, eos_token_id=EOS, pad_token_id=PAD, reset_boundaries=reset
+        )
+    )
+
+    assert len(ds) == len(expected)
+    assert [ds[i] for i in range(len(ds))] == expected
+
+
+def test_padding_stats() -> None:
+    stats = padding_stats([2, 6], block_size=4)
+
+    # max_length: [2 real + 2 pad], [4 real (2 truncated)]
+    assert stats["padding_fraction_max_length"] == pytest.approx(2 / 8)
+    assert stats["truncated_tokens_max_length"] == 2
+    # packed: 2 + 6 + 2 EOS = 10 tokens in 3 blocks of 4
+    assert stats["padding_fraction_packed"] == pytest.approx(2 / 12)
+
+
+@pytest.mark.parametrize("train", [False, True])
+def test_reset_boundaries_isolate_documents_in_the_model(tiny_gpt2, train: bool) -> None:
+    no_dropout = {"resid_pdrop": 0.0, "embd_pdrop": 0.0, "attn_pdrop": 0.0}
+    model = tiny_gpt2(n_layer=2, **no_dropout).train(train)
+    assert isolate_packed_documents(model) is True
+    first, second = [1, 2, 3, 4], [5, 6, 7]
+    block = next(
+        pack_documents(
+            [first, second],
+            block_size=10,
+            eos_token_id=EOS,
+            pad_token_id=EOS,
+            reset_boundaries=True,
+        )
+    )
+    with torch.no_grad():
+        packed = model(
+            input_ids=torch.tensor([block["input_ids"]]),
+            position_ids=torch.tensor([block["position_ids"]]),
+        ).logits[0]
+        alone = model(input_ids=torch.tensor([second])).logits[0]
+    start = len(first) + 1  # after the first document's EOS
+    assert torch.equal(packed[start : start + len(second)], alone)
+
+
+def test_packed_sft_run_trains_and_saves_a_cache_enabled_model(
+    tiny_sft_config, tiny_model_dir
+) -> None:
+    run_dir = run_sft(tiny_sft_config(packing=True, packing_reset_boundaries=True))
+
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["padding_fraction"] == metrics["padding_fraction_packed"]
+    assert metrics["train_loss"] > 0
+    final = run_dir / "final_model"
+    config = json.loads((final / "config.json").read_text(encoding="utf-8"))
+    assert config["use_cache"] is True  # the KV cache is only off while training
+    weights, base = (
+        load_file(final / "model.safetensors"),
+        load_file(tiny_model_dir / "model.safetensors"),
+    )
+    assert any(not torch.equal(weights[k], base[k]) for k in base)
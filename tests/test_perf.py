@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pytest
+import torch
+
+from frontier_ml_stack.training.perf import (
+    DEFAULT_PROFILES,
+    apply_thread_settings,
+    fused_adamw_available,
+    parse_profiles,
+    perf_table,
+)
+from frontier_ml_stack.training.sweep import parse_assignments
+
+
+def test_parse_profiles_coerces_overrides() -> None:
+    profiles = parse_profiles(["fast:bf16_autocast=true,intra_op_threads=2", "plain:"])
+    assert profiles == {"fast": {"bf16_autocast": True, "intra_op_threads": 2}, "plain": {}}
+    with pytest.raises(ValueError, match="name:"):
+        parse_profiles(["bf16_autocast=true"])
+    with pytest.raises(ValueError, match="unknown"):
+        parse_profiles(["x:bf16=true"])
+    # built-in profiles only use real SFTConfig fields
+    for overrides in DEFAULT_PROFILES.values():
+        parse_assignments([f"{k}={str(v).lower()}" for k, v in overrides.items()])
+
+
+def test_perf_table_reports_speedup_vs_first_ok_profile() -> None:
+    ok = {"status": "ok", "step_time_s_median": 1.0, "first_step_s": 2.0, "train_loss": 3.0}
+    rows = [
+        {"profile": "broken", "status": "failed"},
+        {**ok, "profile": "baseline", "tokens_per_second": 100.0, "peak_rss_mb": 500.0},
+        {**ok, "profile": "bf16", "tokens_per_second": 150.0, "peak_rss_mb": 450.0},
+    ]
+    lines = perf_table(rows).splitlines()
+    assert lines[2].startswith("| broken | failed")
+    assert "| 1.00x |" in lines[3]
+    assert "| 1.50x |" in lines[4]
+
+
+def test_thread_settings_and_fused_optimizer_probe() -> None:
+    before = torch.get_num_threads()
+    try:
+        settings = apply_thread_settings(intra_op=1)
+        assert settings["intra_op_threads"] == 1
+        assert settings["inter_op_threads"] == torch.get_num_interop_threads()
+        assert apply_thread_settings() == settings
+    finally:
+        torch.set_num_threads(before)
+    assert isinstance(fused_adamw_available(), bool)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import httpx
+import pytest
+import uvicorn
+
+from frontier_ml_stack.eval.suites.behavior_eval import eval_behavior
+from frontier_ml_stack.eval.suites.loss_eval import eval_loss
+from frontier_ml_stack.inference.client import AsyncInferenceClient, pipelined
+from frontier_ml_stack.inference.server import create_app
+from frontier_ml_stack.inference.types import GenerateRequest
+from frontier_ml_stack.models.registry import ModelRegistry
+
+
+@pytest.fixture
+def served_model(tiny_model_dir):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(str(tiny_model_dir)), host="127.0.0.1", port=port, log_level="error"
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.05)
+    yield str(tiny_model_dir), f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=10)
+
+
+def test_remote_suites_match_in_process(served_model, tmp_path) -> None:
+    model_dir, url = served_model
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(json.dumps({"id": str(i), "text": "abc " * (3 + i)}) + "\n" for i in range(10)),
+        encoding="utf-8",
+    )
+    loss_kwargs = {
+        "model_path": model_dir,
+        "records_path": records,
+        "max_eval_samples": 0,
+        "max_seq_length": 16,
+        "stride": 8,
+        "batch_size": 3,
+    }
+    local = eval_loss(**loss_kwargs, registry=ModelRegistry())
+    remote = eval_loss(**loss_kwargs, server_url=url, concurrency=4)
+    assert remote.n_tokens == local.n_tokens and remote.n_windows == local.n_windows
+    assert remote.avg_loss == pytest.approx(local.avg_loss, rel=1e-5)
+
+    prompts = tmp_path / "suite.jsonl"
+    prompts.write_text(
+        "".join(
+            json.dumps({"id": f"p{i}", "prompt": "ab " * (i + 1), "scorers": [{"type": "refusal"}]})
+            + "\n"
+            for i in range(6)
+        ),
+        encoding="utf-8",
+    )
+    gen_kwargs = {
+        "model_path": model_dir,
+        "max_prompts": 0,
+        "max_new_tokens": 4,
+        "temperature": 0.0,
+        "prompts_path": prompts,
+    }
+    in_process = eval_behavior(**gen_kwargs, registry=ModelRegistry())
+    served = eval_behavior(**gen_kwargs, server_url=url, concurrency=3)
+    assert [s.completion for s in served.samples] == [s.completion for s in in_process.samples]
+    assert served.scores == in_process.scores
+
+
+def test_client_retries_overload_then_gives_up() -> None:
+    calls = {"n": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        if calls["n"] <= 2:
+            return httpx.Response(503)
+        return httpx.Response(
+            200,
+            json={
+                "completion": "ok",
+                "model_path": "m",
+                "elapsed_ms": 1.0,
+                "prompt_tokens": 1,
+                "completion_tokens": 1,
+            },
+        )
+
+    async def run(retries: int):
+        async with AsyncInferenceClient(
+            "http://test", retries=retries, backoff_s=0.0, transport=httpx.MockTransport(handler)
+        ) as client:
+            resp = await client.generate(GenerateRequest(prompt="hi"))
+            return resp, client.retried
+
+    resp, retried = asyncio.run(run(retries=3))
+    assert resp.completion == "ok" and retried == 2
+
+    calls["n"] = 0
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run(retries=1))
+
+
+def test_pipelined_bounds_concurrency_and_stops() -> None:
+    state = {"active": 0, "peak": 0}
+    results: list[int] = []
+
+    async def call(i: int) -> int:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.001 * (i % 3))
+        state["active"] -= 1
+        return i * i
+
+    asyncio.run(pipelined(range(20), call, concurrency=3, on_result=lambda i, r: results.append(r)))
+    assert sorted(results) == [i * i for i in range(20)] and state["peak"] == 3
+
+    results.clear()
+    asyncio.run(
+        pipelined(
+            range(100),
+            call,
+            concurrency=2,
+            on_result=lambda i, r: results.append(r),
+            stop=lambda: len(results) >= 5,
+        )
+    )
+    assert 5 <= len(results) < 8  # in-flight requests finish, nothing new starts
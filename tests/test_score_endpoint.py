@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+import torch
+from fastapi.testclient import TestClient
+from transformers import GPT2LMHeadModel
+
+from frontier_ml_stack.inference.batching import ScoreBatcher, token_budget_batches
+from frontier_ml_stack.inference.server import create_app
+
+
+@torch.no_grad()
+def _logprobs(model, ids: list[int], n_scored: int) -> list[float]:
+    logits = model(input_ids=torch.tensor([ids])).logits[0, :-1].float()
+    lp = torch.log_softmax(logits, dim=-1).gather(1, torch.tensor(ids[1:])[:, None])[:, 0]
+    return lp[-n_scored:].tolist()
+
+
+def test_pairs_score_the_continuation_given_the_prompt(tiny_model_dir) -> None:
+    model = GPT2LMHeadModel.from_pretrained(str(tiny_model_dir)).eval()
+    enc = {c: c - 96 for c in range(97, 123)}
+
+    def ids(text: str) -> list[int]:
+        return [27 if ch == " " else enc[ord(ch)] for ch in text]
+
+    with TestClient(create_app(str(tiny_model_dir))) as client:
+        pairs = [{"prompt": "ab ab", "continuation": " cd"}, {"prompt": "x", "continuation": "yzy"}]
+        r = client.post("/score", json={"pairs": pairs})
+        assert r.status_code == 200
+        results = r.json()["results"]
+        for pair, res in zip(pairs, results, strict=True):
+            want = _logprobs(
+                model, ids(pair["prompt"] + pair["continuation"]), len(pair["continuation"])
+            )
+            assert res["tokens"] == len(pair["continuation"]) and not res["truncated"]
+            assert res["token_logprobs"] == pytest.approx(want, abs=1e-5)
+            assert res["nll"] == pytest.approx(-sum(want), abs=1e-5)
+
+        # too long: the prompt loses its oldest tokens, the continuation is kept
+        r = client.post(
+            "/score",
+            json={"pairs": [{"prompt": "abcdefgh", "continuation": "ij"}], "max_seq_length": 4},
+        )
+        res = r.json()["results"][0]
+        assert res["truncated"] and res["tokens"] == 2
+        assert res["token_logprobs"] == pytest.approx(_logprobs(model, ids("ghij"), 2), abs=1e-5)
+
+        both = {"texts": ["ab"], "pairs": [{"prompt": "a", "continuation": "b"}]}
+        assert client.post("/score", json=both).status_code == 422
+        assert client.post("/score", json={}).status_code == 422
+        assert client.get("/health").json()["score_batching"]["requests"] == 2
+
+
+def test_concurrent_requests_share_forward_passes(tiny_gpt2) -> None:
+    model = tiny_gpt2()
+    batcher = ScoreBatcher(model, pad_token_id=0, max_batch_tokens=4096, max_wait_ms=200.0)
+    # rows of different lengths, so shared batches need padding
+    requests = [
+        [([1 + i, 2, 3, 5][:n], [-100, 2, 3, 5][:n]) for n in (2 + i % 3, 4)] for i in range(6)
+    ]
+    alone = ScoreBatcher(model, pad_token_id=0, max_wait_ms=0.0)
+    expected = [alone.score(rows) for rows in requests]
+    alone.close()
+
+    results: dict[int, list[list[float]]] = {}
+    threads = [
+        threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.score(requests[i])))
+        for i in range(len(requests))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    for i, want in enumerate(expected):
+        for got_row, want_row in zip(results[i], want, strict=True):
+            assert got_row == pytest.approx(want_row, abs=1e-5)
+    stats = batcher.stats()
+    assert stats["requests"] == 6 and stats["rows"] == 12
+    assert stats["forwards"] < 6  # requests were coalesced
+
+
+def test_token_budget_batches() -> None:
+    assert token_budget_batches([3, 10, 4, 9], max_tokens=20) == [[1, 3], [2, 0]]
+    assert token_budget_batches([30, 2], max_tokens=20) == [[0], [1]]
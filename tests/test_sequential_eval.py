@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+import torch
+
+from frontier_ml_stack.eval.config import GateConfig
+from frontier_ml_stack.eval.runner import gate_thresholds
+from frontier_ml_stack.eval.sequential import (
+    decide,
+    gate_passed,
+    proportion_interval,
+    ratio_interval,
+)
+from frontier_ml_stack.eval.suites.behavior_eval import eval_behavior
+from frontier_ml_stack.eval.suites.loss_eval import eval_loss
+from frontier_ml_stack.models.loading import LoadedModel, LoadStats
+from frontier_ml_stack.models.registry import ModelRegistry
+
+
+def test_intervals_shrink_to_the_estimate_over_the_whole_population() -> None:
+    sums, counts = [4.0, 6.0, 5.0, 9.0], [2, 3, 2, 4]
+    partial = ratio_interval(sums, counts, population=100, confidence=0.95)
+    assert partial.estimate == pytest.approx(24 / 11)
+    assert partial.low < partial.estimate < partial.high
+    full = ratio_interval(sums, counts, population=4, confidence=0.95)
+    assert full.low == full.high == full.estimate
+
+    rate = proportion_interval(0, 8, population=100, confidence=0.95)
+    assert rate.low == 0.0 and 0.0 < rate.high < 0.5
+    assert proportion_interval(3, 10, population=10, confidence=0.95).high == pytest.approx(0.3)
+
+    assert decide(partial, 10.0, higher_is_better=False) == "pass"
+    assert decide(partial, 1.0, higher_is_better=False) == "fail"
+    assert decide(partial, partial.estimate, higher_is_better=False) == "undecided"
+    assert decide(rate, 0.9, higher_is_better=True) == "fail"
+    assert gate_passed(["pass", "undecided"]) is None
+    assert gate_passed(["pass", "fail"]) is False
+    assert gate_passed(["pass", "pass"]) is True
+
+
+class _CharTokenizer:
+    pad_token_id = 0
+    eos_token_id = 1
+
+    def __call__(self, texts: list[str]) -> dict[str, list[list[int]]]:
+        return {"input_ids": [[2 + ord(c) % 30 for c in t] for t in texts]}
+
+    def batch_decode(self, rows: torch.Tensor, skip_special_tokens: bool = True) -> list[str]:
+        special = {self.pad_token_id, self.eos_token_id}
+        return [" ".join(str(t) for t in row.tolist() if t not in special) for row in rows]
+
+
+def _registry(tiny_gpt2) -> ModelRegistry:
+    model = tiny_gpt2(vocab_size=40, bos_token_id=1, eos_token_id=1)
+
+    def load(model_path: str, *, dtype=None) -> LoadedModel:
+        stats = LoadStats(weights_format="hub", load_s=0.0, peak_rss_mb=0.0)
+        return LoadedModel(model_path, _CharTokenizer(), model, stats)
+
+    return ModelRegistry(loader=load)
+
+
+def test_gated_loss_stops_once_the_threshold_is_clear(tmp_path, tiny_gpt2) -> None:
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(
+            json.dumps({"id": str(i), "text": "some eval text " * (1 + i % 3)}) + "\n"
+            for i in range(64)
+        ),
+        encoding="utf-8",
+    )
+    kwargs = {
+        "model_path": "tiny",
+        "records_path": records,
+        "max_eval_samples": 0,
+        "max_seq_length": 32,
+        "batch_size": 4,
+        "registry": _registry(tiny_gpt2),
+    }
+    full = eval_loss(**kwargs)
+
+    clear = eval_loss(**kwargs, max_loss=full.avg_loss + 1.0, min_samples=8)
+    assert clear.gate["decision"] == "pass"
+    assert clear.gate["samples_used"] < 64 and clear.gate["compute_saved"] > 0.5
+    assert clear.gate["low"] <= full.avg_loss <= clear.gate["high"]
+
+    # a threshold on the true loss can only be settled by scoring everything
+    tight = eval_loss(**kwargs, max_loss=full.avg_loss, min_samples=8)
+    assert tight.gate["samples_used"] == 64 and tight.gate["compute_saved"] == 0.0
+    assert tight.avg_loss == pytest.approx(full.avg_loss)
+
+
+def test_gated_behavior_fails_early(tmp_path, tiny_gpt2) -> None:
+    prompts = tmp_path / "suite.jsonl"
+    prompts.write_text(
+        "".join(
+            json.dumps(
+                {"id": f"p{i}", "prompt": "say no " * (1 + i % 4), "scorers": [{"type": "refusal"}]}
+            )
+            + "\n"
+            for i in range(40)
+        ),
+        encoding="utf-8",
+    )
+    result = eval_behavior(
+        model_path="tiny",
+        max_prompts=0,
+        max_new_tokens=2,
+        temperature=0.0,
+        batch_size=4,
+        prompts_path=prompts,
+        registry=_registry(tiny_gpt2),
+        min_rates={"refusal": 0.9},
+        min_samples=8,
+    )
+    # an untrained model never refuses, so 8 prompts already rule out a 90% refusal rate
+    assert result.gate["decision"] == "fail"
+    assert result.n_prompts == result.gate["samples_used"] == 8
+    assert result.gate["metrics"]["refusal"]["high"] < 0.9
+
+    with pytest.raises(ValueError, match="json_object"):
+        eval_behavior(
+            model_path="tiny",
+            max_prompts=0,
+            max_new_tokens=2,
+            temperature=0.0,
+            prompts_path=prompts,
+            registry=_registry(tiny_gpt2),
+            min_rates={"json_object": 0.5},
+        )
+
+
+def test_gate_thresholds_from_baseline(tmp_path) -> None:
+    baseline = tmp_path / "metrics.json"
+    baseline.write_text(
+        json.dumps({"loss": {"avg_loss": 2.0}, "behavior": {"scores": {"refusal": {"rate": 0.8}}}}),
+        encoding="utf-8",
+    )
+    cfg = GateConfig(
+        enabled=True, baseline_metrics=str(baseline), loss_margin=0.1, rate_margin=0.05
+    )
+    max_loss, min_rates = gate_thresholds(cfg)
+    assert max_loss == pytest.approx(2.1) and min_rates == {"refusal": pytest.approx(0.75)}
+    explicit = GateConfig(enabled=True, max_loss=3.0, min_rates="refusal=0.5, json_object=0.9")
+    assert gate_thresholds(explicit) == (3.0, {"refusal": 0.5, "json_object": 0.9})
+    with pytest.raises(ValueError, match="gate needs"):
+        gate_thresholds(GateConfig(enabled=True))
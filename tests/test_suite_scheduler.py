@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import pytest
+import torch
+
+from frontier_ml_stack.eval.config import BehaviorEvalConfig, EvalConfig, LossEvalConfig
+from frontier_ml_stack.eval.runner import run_eval
+from frontier_ml_stack.eval.scheduler import SuiteTask, run_suites
+from frontier_ml_stack.models.registry import ModelRegistry
+
+
+def test_threads_report_each_suite_as_it_finishes() -> None:
+    fast_done = threading.Event()
+
+    def slow() -> str:
+        # only finishes once the fast suite has been reported, so they must overlap
+        assert fast_done.wait(timeout=10)
+        return "slow"
+
+    order = []
+
+    def on_done(name: str, result: str, wall_s: float) -> None:
+        order.append(name)
+        if name == "fast":
+            fast_done.set()
+
+    tasks = [SuiteTask("slow", slow), SuiteTask("fast", lambda: time.sleep(0.01) or "fast")]
+    threads = torch.get_num_threads()
+    done = run_suites(tasks, mode="threads", threads_per_suite=1, on_done=on_done)
+    assert order == ["fast", "slow"]
+    assert {name: result for name, (result, _) in done.items()} == {"slow": "slow", "fast": "fast"}
+    assert torch.get_num_threads() == threads
+
+    with pytest.raises(ValueError, match="unknown suite mode"):
+        run_suites(tasks, mode="fibers")
+
+
+def test_processes_return_results_and_surface_failures() -> None:
+    tasks = [
+        SuiteTask("a", json.dumps, {"obj": [1, 2]}),
+        SuiteTask("b", json.dumps, {"obj": {"x": 1}}),
+    ]
+    done = run_suites(tasks, mode="processes", threads_per_suite=1)
+    assert done["a"][0] == "[1, 2]" and done["b"][0] == '{"x": 1}'
+
+    bad = [SuiteTask("a", json.dumps, {"obj": 1}), SuiteTask("b", json.loads, {"s": "{"})]
+    with pytest.raises(RuntimeError, match="suite 'b' failed"):
+        run_suites(bad, mode="processes", threads_per_suite=1)
+
+
+def test_concurrent_suites_share_the_model_and_match_sequential(tmp_path, tiny_model_dir) -> None:
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(json.dumps({"id": str(i), "text": "abc " * (i + 2)}) + "\n" for i in range(6)),
+        encoding="utf-8",
+    )
+    prompts = tmp_path / "suite.jsonl"
+    prompts.write_text(
+        "".join(
+            json.dumps({"id": f"p{i}", "prompt": "ab " * (i + 1), "scorers": [{"type": "refusal"}]})
+            + "\n"
+            for i in range(4)
+        ),
+        encoding="utf-8",
+    )
+
+    def run(mode: str, registry: ModelRegistry) -> dict:
+        cfg = EvalConfig(
+            eval_name=mode,
+            model_path=str(tiny_model_dir),
+            eval_records=str(records),
+            output_dir=str(tmp_path / "reports"),
+            cache_dir="",
+            suite_mode=mode,
+            threads_per_suite=1,
+            loss=LossEvalConfig(max_eval_samples=0, max_seq_length=32),
+            behavior=BehaviorEvalConfig(max_prompts=0, max_new_tokens=3, prompts_path=str(prompts)),
+        )
+        out = run_eval(cfg, registry=registry)
+        for suite in ("loss", "behavior"):
+            assert (out / suite / "report.md").is_file()
+            assert json.loads((out / suite / "metrics.json").read_text(encoding="utf-8"))["wall_s"]
+        return json.loads((out / "metrics.json").read_text(encoding="utf-8"))
+
+    sequential = run("sequential", ModelRegistry())
+    registry = ModelRegistry()
+    threads = run("threads", registry)
+    assert registry.stats()["loads"] == 1  # both suites used the pinned model
+    assert threads["suites"]["mode"] == "threads"
+    assert set(threads["suites"]["wall_s"]) == {"loss", "behavior"}
+    assert threads["loss"]["avg_loss"] == pytest.approx(sequential["loss"]["avg_loss"])
+    assert threads["behavior"]["scores"] == sequential["behavior"]["scores"]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+
+import pytest
+
+from frontier_ml_stack.training import sweep
+from frontier_ml_stack.training.config import SFTConfig
+from frontier_ml_stack.training.sweep import (
+    expand_grid,
+    load_override_list,
+    parse_assignments,
+    parse_grid,
+    run_sweep,
+    sweep_table,
+)
+
+
+def test_parse_grid_coerces_field_types_and_expands_product() -> None:
+    grid = parse_grid(["learning_rate=1e-4,5e-5", "lora_r=4,8", "use_lora=true"])
+    assert grid == {"learning_rate": [1e-4, 5e-5], "lora_r": [4, 8], "use_lora": [True]}
+
+    runs = expand_grid(grid)
+    assert len(runs) == 4
+    assert runs[0] == {"learning_rate": 1e-4, "lora_r": 4, "use_lora": True}
+    assert runs[1]["lora_r"] == 8
+    assert expand_grid({}) == []
+
+
+def test_overrides_reject_unknown_reserved_and_malformed(tmp_path) -> None:
+    assert parse_assignments(["padding=dynamic", "max_steps=3"]) == {
+        "padding": "dynamic",
+        "max_steps": 3,
+    }
+    with pytest.raises(ValueError, match="unknown"):
+        parse_assignments(["lr=1e-4"])
+    with pytest.raises(ValueError, match="sweep runner"):
+        parse_grid(["run_name=a,b"])
+    with pytest.raises(ValueError, match="bool"):
+        parse_assignments(["use_lora=yes"])
+    with pytest.raises(ValueError, match="key=value"):
+        parse_assignments(["use_lora"])
+
+    path = tmp_path / "runs.json"
+    path.write_text(json.dumps([{"lora_r": 4}, {"lora_r": "16"}]), encoding="utf-8")
+    assert load_override_list(path) == [{"lora_r": 4}, {"lora_r": 16}]
+
+
+def test_sweep_table_sorts_by_loss_with_failures_last() -> None:
+    rows = [
+        {"run_name": "run-000", "overrides": {"lora_r": 4}, "status": "failed", "wall_s": 0.1},
+        {"run_name": "run-001", "overrides": {"lora_r": 8}, "status": "ok", "train_loss": 2.5},
+        {"run_name": "run-002", "overrides": {"lora_r": 16}, "status": "ok", "train_loss": 1.5},
+    ]
+    lines = sweep_table(rows).splitlines()
+    assert lines[0].startswith("| run | lora_r | train_loss")
+    assert [line.split(" | ")[0] for line in lines[2:]] == ["| run-002", "| run-001", "| run-000"]
+    assert "failed" in lines[-1]
+
+
+def test_sweep_runs_every_config_and_records_invalid_ones(tmp_path, tiny_model_dir) -> None:
+    records = tmp_path / "records.jsonl"
+    records.write_text(
+        "".join(json.dumps({"id": str(i), "text": "abc " * (i + 2)}) + "\n" for i in range(8)),
+        encoding="utf-8",
+    )
+    base = SFTConfig(
+        run_name="unused",
+        model_name=str(tiny_model_dir),
+        train_records=str(records),
+        output_dir=str(tmp_path / "runs"),
+        max_steps=2,
+        max_seq_length=16,
+        telemetry=False,
+    )
+    # group_by_length needs padding="dynamic": that config fails before any run starts
+    grid = expand_grid(parse_grid(["group_by_length=true,false"]))
+    sweep_dir = run_sweep(base, grid, sweep_name="s", max_procs=2)
+
+    rows = json.loads((sweep_dir / "sweep.json").read_text(encoding="utf-8"))["runs"]
+    assert [r["status"] for r in rows] == ["failed", "ok"]
+    assert "group_by_length" in rows[0]["error"]
+    assert rows[1]["train_loss"] > 0 and rows[1]["shared_model"] and rows[1]["shared_data"]
+    assert (sweep_dir / "run-001" / "final_model").is_dir()
+    assert not (sweep_dir / "run-000").exists()
+
+
+def _late_row_child(index: int, job: tuple, results) -> None:
+    if index == 0:
+        os._exit(3)  # dies without reporting; the pool marks it failed
+    time.sleep(2.5)  # past the pool's 1s poll, so run 0 is marked failed first
+    results.put((0, {"run_name": "a", "overrides": {}, "status": "ok"}))  # run 0's late row
+    results.put((index, {"run_name": "b", "overrides": {}, "status": "ok"}))
+
+
+def test_pool_accepts_a_row_that_arrives_after_its_child_was_marked_dead(monkeypatch) -> None:
+    monkeypatch.setattr(sweep, "_child", _late_row_child)
+    jobs = [(SFTConfig(run_name=n, model_name="m", train_records="a.jsonl"), {}, 1) for n in "ab"]
+
+    rows = sweep._run_pool(jobs, procs=2)
+
+    assert [r["run_name"] for r in rows] == ["a", "b"]
+    assert rows[1]["status"] == "ok"
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+
+import torch
+
+from frontier_ml_stack.training.telemetry import StepTelemetryCallback, count_real_tokens
+
+
+def test_count_real_tokens_prefers_attention_mask() -> None:
+    mask = torch.tensor([[1, 1, 1, 0], [1, 1, 0, 0]])
+    labels = torch.tensor([[5, 6, -100, -100], [-100, 7, -100, -100]])
+    assert count_real_tokens({"input_ids": mask, "attention_mask": mask, "labels": labels}) == 5
+    assert count_real_tokens({"input_ids": mask, "labels": labels}) == 3
+
+
+def test_step_telemetry_streams_records_and_summarizes(tmp_path) -> None:
+    out = tmp_path / "step_metrics.jsonl"
+    cb = StepTelemetryCallback(out)
+    state = SimpleNamespace(global_step=0)
+
+    cb.on_train_begin(None, state, None)
+    for step in range(1, 4):
+        cb.on_step_begin(None, state, None)
+        cb.record_batch({"attention_mask": torch.ones(2, 4, dtype=torch.long)})
+        cb.on_pre_optimizer_step(None, state, None)
+        cb.on_optimizer_step(None, state, None)
+        state.global_step = step
+        cb.on_step_end(None, state, None)
+    cb.on_train_end(None, state, None)
+
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["step"] for r in rows] == [1, 2, 3]
+    assert all(r["tokens"] == 8 for r in rows)
+    for r in rows:
+        parts = r["data_wait_s"] + r["compute_s"] + r["optimizer_s"]
+        assert parts <= r["wall_s"] + 1e-9
+
+    summary = cb.summary()
+    assert summary["steps"] == 2
+    assert summary["warmup_steps_excluded"] == 1
+    assert summary["tokens_per_second"] > 0
+    assert summary["peak_rss_mb"] > 0
+
+
+def test_step_telemetry_drops_redone_steps_on_resume(tmp_path) -> None:
+    out = tmp_path / "step_metrics.jsonl"
+    rows = "".join(json.dumps({"step": s}) + "\n" for s in range(1, 8))
+    out.write_text(rows + '{"step": 8, "wal', encoding="utf-8")  # torn by a crash
+
+    cb = StepTelemetryCallback(out)
+    cb.on_train_begin(None, SimpleNamespace(global_step=5), None)
+    cb.on_train_end(None, SimpleNamespace(global_step=5), None)
+
+    assert [json.loads(line)["step"] for line in out.read_text().splitlines()] == [1, 2, 3, 4, 5]
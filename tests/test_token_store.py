@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from frontier_ml_stack.data.token_store import (
+    MANIFEST_FILE,
+    TokenStore,
+    TokenStoreWriter,
+    token_dtype,
+)
+from frontier_ml_stack.training.data import TokenStoreDataset
+
+
+def _write_store(out_dir: Path, docs: list[list[int]]) -> TokenStore:
+    dtype = token_dtype(50_000)
+    writer = TokenStoreWriter(out_dir, dtype)
+    for ids in docs:
+        writer.add(ids)
+    writer.close()
+    (out_dir / MANIFEST_FILE).write_text(
+        json.dumps(
+            {
+                "params": {
+                    "dtype": dtype.name,
+                    "tokenizer_name": "t",
+                    "tokenizer_revision": None,
+                },
+                "counts": {"docs": writer.num_docs, "tokens": writer.num_tokens},
+            }
+        ),
+        encoding="utf-8",
+    )
+    return TokenStore(out_dir)
+
+
+def test_token_dtype_picks_smallest_width() -> None:
+    assert token_dtype(50_257) == np.uint16
+    assert token_dtype(151_936) == np.uint32
+
+
+def test_token_store_roundtrip(tmp_path: Path) -> None:
+    store = _write_store(tmp_path, [[1, 2, 3], [4], [5, 6]])
+
+    assert len(store) == 3
+    assert store.num_tokens == 6
+    assert store[0].tolist() == [1, 2, 3]
+    assert store[-1].tolist() == [5, 6]
+    assert store.doc_lengths().tolist() == [3, 1, 2]
+    # slices are views into the memmap, not copies
+    assert isinstance(store[1].base, np.memmap) or isinstance(store[1], np.memmap)
+
+
+def test_token_store_dataset_truncates_and_pads(tmp_path: Path) -> None:
+    store = _write_store(tmp_path, [[1, 2, 3, 4, 5], [7]])
+    ds = TokenStoreDataset(store, max_seq_length=3, pad_token_id=0)
+
+    assert ds[0] == {"input_ids": [1, 2, 3], "attention_mask": [1, 1, 1]}
+    assert ds[1] == {"input_ids": [7, 0, 0], "attention_mask": [1, 0, 0]}
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 
 import pytest
+import torch
+from safetensors.torch import load_file
 
-from frontier_ml_stack.training.data import load_records_as_dataset
+from frontier_ml_stack.training.data import (
+    _byte_ranges,
+    _iter_records_in_ranges,
+    load_records_as_dataset,
+    load_records_as_iterable_dataset,
+)
+from frontier_ml_stack.training.sft import run_sft
 
 
 def test_load_records_as_dataset(tmp_path: Path) -> None:
@@ -30,3 +39,33 @@ def test_load_records_as_dataset_empty_raises(tmp_path: Path) -> None:
     p.write_text("", encoding="utf-8")
     with pytest.raises(ValueError):
         load_records_as_dataset(p)
+
+
+@pytest.mark.parametrize("num_shards", [1, 3, 7, 1000])
+def test_iterable_dataset_byte_shards_cover_every_record_once(
+    tmp_path: Path, num_shards: int
+) -> None:
+    p = tmp_path / "records.jsonl"
+    p.write_text(
+        "\n".join(f'{{"id":"{i}","text":"record number {i}","source":"x"}}' for i in range(25))
+        + "\n\n",
+        encoding="utf-8",
+    )
+
+    ranges = _byte_ranges(p, num_shards)
+    texts = [r["text"] for r in _iter_records_in_ranges(str(p), ranges)]
+    assert texts == [f"record number {i}" for i in range(25)]
+
+    ds = load_records_as_iterable_dataset(p, num_shards=num_shards)
+    assert ds.num_shards == len(ranges)
+    assert sorted(r["text"] for r in ds) == sorted(texts)
+
+
+def test_streaming_sft_run_trains(tiny_sft_config, tiny_model_dir) -> None:
+    run_dir = run_sft(tiny_sft_config(streaming=True))
+
+    metrics = json.loads((run_dir / "metrics.json").read_text(encoding="utf-8"))
+    assert metrics["train_loss"] > 0
+    weights = load_file(run_dir / "final_model" / "model.safetensors")
+    base = load_file(tiny_model_dir / "model.safetensors")
+    assert any(not torch.equal(weights[k], base[k]) for k in base)
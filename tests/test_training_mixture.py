@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from frontier_ml_stack.training.mixture import (
+    MixtureSource,
+    iter_mixture,
+    parse_mixture_spec,
+)
+
+
+def _write_records(path: Path, prefix: str, n: int) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    lines = [json.dumps({"id": f"{prefix}{i}", "text": f"{prefix}-{i}"}) for i in range(n)]
+    (path / "records.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+def test_parse_mixture_spec() -> None:
+    sources = parse_mixture_spec("a:0.7, b:0.3:inf,c:1:2")
+    assert sources == [
+        MixtureSource(path="a", weight=0.7, epochs=1),
+        MixtureSource(path="b", weight=0.3, epochs=None),
+        MixtureSource(path="c", weight=1.0, epochs=2),
+    ]
+    with pytest.raises(ValueError):
+        parse_mixture_spec("a")
+    with pytest.raises(ValueError):
+        parse_mixture_spec("a:0")
+    # paths may contain ":"
+    assert parse_mixture_spec("C:/data/a:0.5,s3://b/c:1:inf") == [
+        MixtureSource(path="C:/data/a", weight=0.5, epochs=1),
+        MixtureSource(path="s3://b/c", weight=1.0, epochs=None),
+    ]
+    with pytest.raises(ValueError, match="epochs"):
+        parse_mixture_spec("a:1:x2")
+
+
+def test_mixture_is_deterministic_and_respects_epochs(tmp_path: Path) -> None:
+    a = _write_records(tmp_path / "a", "a", 20)
+    b = _write_records(tmp_path / "b", "b", 5)
+    sources = [
+        MixtureSource(path=str(a), weight=0.5, epochs=1),
+        MixtureSource(path=str(b / "records.jsonl"), weight=0.5, epochs=3),
+    ]
+
+    run1 = [r["text"] for r in iter_mixture(sources, seed=1, shuffle_buffer=8)]
+    run2 = [r["text"] for r in iter_mixture(sources, seed=1, shuffle_buffer=8)]
+    run3 = [r["text"] for r in iter_mixture(sources, seed=2, shuffle_buffer=8)]
+
+    assert run1 == run2
+    assert run1 != run3
+    assert sum(t.startswith("a-") for t in run1) == 20
+    assert sum(t.startswith("b-") for t in run1) == 15
+
+
+def test_mixture_upsampled_source_stops_with_finite_sources(tmp_path: Path) -> None:
+    a = _write_records(tmp_path / "a", "a", 30)
+    b = _write_records(tmp_path / "b", "b", 2)
+    sources = [
+        MixtureSource(path=str(a), weight=0.5, epochs=1),
+        MixtureSource(path=str(b), weight=0.5, epochs=None),
+    ]
+
+    texts = [r["text"] for r in iter_mixture(sources, seed=0, shuffle_buffer=4)]
+    assert sum(t.startswith("a-") for t in texts) == 30
+    # the tiny source is cycled to keep pace with the large one
+    assert sum(t.startswith("b-") for t in texts) > 2